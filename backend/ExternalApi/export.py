@@ -0,0 +1,102 @@
+import base64
+import csv
+import json
+from datetime import datetime, time
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from registers.serializers import FoodRegisterSerializer
+
+CSV_COLUMNS = [
+    'id', 'user', 'created_at', 'updated_at', 'status', 'description', 'ai_description',
+    'ai_confidence', 'estimated_weight', 'total_calories', 'total_protein', 'total_carbs',
+    'total_fat', 'total_fiber', 'total_sugar', 'total_sodium', 'food_items', 'image_url',
+    'sync_cursor',
+]
+
+
+def encode_cursor(register):
+    """Posición de un registro en el orden (updated_at, id) de la exportación"""
+    raw = f'{register.updated_at.isoformat()}|{register.id}'
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        updated_at, pk = base64.urlsafe_b64decode(padded).decode().split('|')
+        return datetime.fromisoformat(updated_at), int(pk)
+    except (ValueError, UnicodeDecodeError):
+        raise ValueError("Cursor inválido")
+
+
+def parse_since(value):
+    """Fecha o fecha y hora ISO; sin zona horaria se asume la del servidor"""
+    moment = parse_datetime(value)
+    if moment is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValueError("Fecha inválida en since, use ISO 8601")
+        moment = datetime.combine(day, time.min)
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+def filter_export(queryset, since=None, cursor=None):
+    """
+    Orden estable (updated_at, id) para la sincronización incremental: un registro
+    que se completa o corrige después vuelve a aparecer con su nuevo updated_at.
+    """
+    if since:
+        queryset = queryset.filter(updated_at__gte=since)
+    if cursor:
+        updated_at, pk = cursor
+        queryset = queryset.filter(Q(updated_at__gt=updated_at) | Q(updated_at=updated_at, id__gt=pk))
+    return queryset.order_by('updated_at', 'id')
+
+
+def _chunks(queryset, size):
+    """Recorre la consulta por bloques sin cargar la tabla completa"""
+    chunk = []
+    for register in queryset.iterator(chunk_size=size):
+        chunk.append(register)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _serialized(queryset, request):
+    size = settings.EXTERNAL_EXPORT_CHUNK_SIZE
+    for chunk in _chunks(queryset, size):
+        serializer = FoodRegisterSerializer(chunk, many=True, context={'request': request})
+        for register, row in zip(chunk, serializer.data):
+            # Permite retomar la descarga desde cualquier fila
+            row['sync_cursor'] = encode_cursor(register)
+            yield row
+
+
+def ndjson_rows(queryset, request):
+    for row in _serialized(queryset, request):
+        yield json.dumps(row, cls=DjangoJSONEncoder, ensure_ascii=False) + '\n'
+
+
+class _Echo:
+    """Buffer de una línea para csv.writer (patrón de streaming de Django)"""
+
+    def write(self, value):
+        return value
+
+
+def csv_rows(queryset, request):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(CSV_COLUMNS)
+    for row in _serialized(queryset, request):
+        row['food_items'] = '; '.join(item['name'] for item in row['food_items'])
+        yield writer.writerow([row.get(column) for column in CSV_COLUMNS])
@@ -0,0 +1,40 @@
+from functools import reduce
+from operator import and_, or_
+
+from django.db.models import Q
+from django.db.models.functions import Lower
+from rest_framework.filters import SearchFilter
+
+# Mayor punto de código: cota superior de todo texto que empieza por el prefijo
+PREFIX_UPPER_BOUND = '\U0010ffff'
+
+
+class PrefixSearchFilter(SearchFilter):
+    """
+    ?search= por prefijo sin distinguir mayúsculas sobre search_fields.
+
+    A diferencia de icontains (que recorre la tabla completa), compara
+    LOWER(campo) contra un rango [término, término + U+10FFFF) que resuelven
+    los índices funcionales Lower(campo); cada palabra debe coincidir en
+    algún campo.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        search_fields = self.get_search_fields(view, request)
+        terms = [term.lower() for term in self.get_search_terms(request)]
+        if not search_fields or not terms:
+            return queryset
+
+        queryset = queryset.alias(**{f'{field}_lower': Lower(field) for field in search_fields})
+        conditions = []
+        for term in terms:
+            conditions.append(reduce(or_, (
+                Q(**{
+                    f'{field}_lower__gte': term,
+                    f'{field}_lower__lt': term + PREFIX_UPPER_BOUND,
+                    # Con collations lingüísticas el rango puede incluir de más
+                    f'{field}_lower__startswith': term,
+                })
+                for field in search_fields
+            )))
+        return queryset.filter(reduce(and_, conditions))
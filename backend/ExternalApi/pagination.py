@@ -0,0 +1,9 @@
+from rest_framework.pagination import CursorPagination
+
+
+class UserCursorPagination(CursorPagination):
+    """Paginación por cursor sobre id: sin COUNT(*) ni OFFSET sobre toda la tabla"""
+    ordering = ('id',)
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
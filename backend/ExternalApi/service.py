@@ -0,0 +1,159 @@
+import logging
+import threading
+import time
+
+import requests
+from django.conf import settings
+from django.core.cache import cache
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+CACHE_KEY = 'external:productos'
+REFRESH_LOCK_KEY = 'external:productos:refreshing'
+BREAKER_FAILURES_KEY = 'external:productos:breaker:failures'
+BREAKER_OPEN_UNTIL_KEY = 'external:productos:breaker:open_until'
+BREAKER_PROBE_KEY = 'external:productos:breaker:probe'
+
+
+class UpstreamUnavailable(Exception):
+    """El catálogo remoto no responde y no hay una copia guardada"""
+
+
+def _build_session():
+    # Conexiones keep-alive reutilizadas; sin reintentos (el breaker decide)
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=settings.PRODUCTS_API_MAX_CONNECTIONS, max_retries=0)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+_session = _build_session()
+
+
+class CircuitBreaker:
+    """
+    Estado guardado en la caché de Django: tras PRODUCTS_BREAKER_FAILURES fallos
+    seguidos se abre durante PRODUCTS_BREAKER_RESET_SECONDS; luego deja pasar
+    una sola petición de prueba (semiabierto) y se cierra si tiene éxito.
+
+    Solo se comparte entre workers con una caché compartida (Redis, Memcached).
+    Con LocMemCache, la opción por defecto, cada proceso tiene su propio
+    circuito y el remoto recibe hasta PRODUCTS_BREAKER_FAILURES fallos por
+    worker antes de que todos se abran.
+    """
+
+    def allow_request(self):
+        open_until = cache.get(BREAKER_OPEN_UNTIL_KEY)
+        if open_until is None:
+            return True
+        if time.time() < open_until:
+            return False
+        # Semiabierto: solo el primero en tomar la marca prueba al remoto
+        return cache.add(BREAKER_PROBE_KEY, True, settings.PRODUCTS_BREAKER_RESET_SECONDS)
+
+    def record_success(self):
+        cache.delete_many([BREAKER_FAILURES_KEY, BREAKER_OPEN_UNTIL_KEY, BREAKER_PROBE_KEY])
+
+    def record_failure(self):
+        cache.add(BREAKER_FAILURES_KEY, 0, None)
+        failures = cache.incr(BREAKER_FAILURES_KEY)
+        if failures >= settings.PRODUCTS_BREAKER_FAILURES:
+            cache.set(BREAKER_OPEN_UNTIL_KEY, time.time() + settings.PRODUCTS_BREAKER_RESET_SECONDS, None)
+            cache.delete(BREAKER_PROBE_KEY)
+            logger.warning("Catálogo de productos: circuito abierto tras %s fallos", failures)
+
+
+breaker = CircuitBreaker()
+
+
+def _store(entry):
+    # Sin expiración: la última copia buena respalda las caídas del remoto
+    cache.set(CACHE_KEY, entry, None)
+
+
+def _fetch(entry=None):
+    """
+    Consulta el catálogo remoto revalidando con ETag / Last-Modified si ya hay
+    una copia. Retorna la entrada actualizada o lanza requests.RequestException.
+    """
+    headers = {'Accept': 'application/json'}
+    if entry:
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+
+    try:
+        response = _session.get(
+            settings.PRODUCTS_API_URL,
+            headers=headers,
+            timeout=(settings.PRODUCTS_API_CONNECT_TIMEOUT, settings.PRODUCTS_API_READ_TIMEOUT),
+        )
+        if entry and response.status_code == 304:
+            entry = {**entry, 'fetched_at': time.time()}
+        else:
+            response.raise_for_status()
+            entry = {
+                'data': response.json(),
+                'etag': response.headers.get('ETag'),
+                'last_modified': response.headers.get('Last-Modified'),
+                'fetched_at': time.time(),
+            }
+    except (requests.RequestException, ValueError) as e:
+        breaker.record_failure()
+        raise requests.RequestException(f"Catálogo de productos no disponible: {e}") from e
+
+    breaker.record_success()
+    _store(entry)
+    return entry
+
+
+def _refresh_in_background(entry):
+    # Un solo refresco a la vez; el lock expira por si el hilo muere
+    if not cache.add(REFRESH_LOCK_KEY, True, settings.PRODUCTS_API_READ_TIMEOUT * 2):
+        return
+
+    def run():
+        try:
+            _fetch(entry)
+        except requests.RequestException as e:
+            logger.warning("%s (se sigue sirviendo la copia guardada)", e)
+        finally:
+            cache.delete(REFRESH_LOCK_KEY)
+
+    threading.Thread(target=run, daemon=True).start()
+
+
+def get_products():
+    """
+    Retorna (data, estado) donde estado es HIT, MISS, STALE o FALLBACK.
+
+    Dentro del TTL se sirve la caché; vencida pero dentro de la ventana
+    stale-while-revalidate se sirve la copia y se refresca en segundo plano.
+    Si el remoto falla o el circuito está abierto se sirve la última copia buena.
+    """
+    entry = cache.get(CACHE_KEY)
+    age = time.time() - entry['fetched_at'] if entry else None
+
+    if entry and age < settings.PRODUCTS_CACHE_TTL_SECONDS:
+        return entry['data'], 'HIT'
+
+    if entry and age < settings.PRODUCTS_CACHE_TTL_SECONDS + settings.PRODUCTS_CACHE_STALE_SECONDS:
+        if breaker.allow_request():
+            _refresh_in_background(entry)
+        return entry['data'], 'STALE'
+
+    if breaker.allow_request():
+        try:
+            return _fetch(entry)['data'], 'MISS'
+        except requests.RequestException as e:
+            if not entry:
+                logger.error("%s", e)
+                raise UpstreamUnavailable(str(e)) from e
+            logger.warning("%s (se sirve la última copia guardada)", e)
+    elif not entry:
+        raise UpstreamUnavailable("Catálogo de productos no disponible (circuito abierto)")
+
+    return entry['data'], 'FALLBACK'
@@ -0,0 +1,151 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from django.core.cache import cache
+from django.test import SimpleTestCase, override_settings
+
+from . import service
+
+ETAG = '"v1"'
+
+
+class StubCatalog(BaseHTTPRequestHandler):
+    """Catálogo falso: mode = ok | down | slow; cuenta las peticiones recibidas"""
+
+    mode = 'ok'
+    hits = 0
+    not_modified = 0
+
+    def do_GET(self):
+        StubCatalog.hits += 1
+        if self.mode == 'down':
+            self.send_response(503)
+            self.end_headers()
+            return
+        if self.mode == 'slow':
+            time.sleep(2)
+        if self.headers.get('If-None-Match') == ETAG:
+            StubCatalog.not_modified += 1
+            self.send_response(304)
+            self.end_headers()
+            return
+        body = json.dumps({'results': [{'id': 1, 'name': 'Manzana'}]}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('ETag', ETAG)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def _clear():
+    cache.delete_many([
+        service.CACHE_KEY, service.REFRESH_LOCK_KEY, service.BREAKER_FAILURES_KEY,
+        service.BREAKER_OPEN_UNTIL_KEY, service.BREAKER_PROBE_KEY,
+    ])
+
+
+def _age_cache(seconds):
+    entry = cache.get(service.CACHE_KEY)
+    entry['fetched_at'] -= seconds
+    cache.set(service.CACHE_KEY, entry, None)
+
+
+class ProductsProxyTests(SimpleTestCase):
+    """Caché, revalidación, timeouts y circuit breaker contra un catálogo local"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        server = ThreadingHTTPServer(('127.0.0.1', 0), StubCatalog)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        cls.addClassCleanup(server.server_close)
+        cls.addClassCleanup(server.shutdown)
+
+        overrides = override_settings(
+            PRODUCTS_API_URL=f'http://127.0.0.1:{server.server_address[1]}/products/',
+            PRODUCTS_API_READ_TIMEOUT=0.5, PRODUCTS_CACHE_TTL_SECONDS=60, PRODUCTS_CACHE_STALE_SECONDS=60,
+            PRODUCTS_BREAKER_FAILURES=2, PRODUCTS_BREAKER_RESET_SECONDS=1,
+        )
+        overrides.enable()
+        cls.addClassCleanup(overrides.disable)
+
+    def setUp(self):
+        _clear()
+        self.addCleanup(_clear)
+        StubCatalog.mode = 'ok'
+
+    def fail_upstream(self, times):
+        StubCatalog.mode = 'down'
+        with self.assertLogs(service.logger, 'WARNING'):
+            for _ in range(times):
+                try:
+                    service.get_products()
+                except service.UpstreamUnavailable:
+                    pass
+
+    def test_miss_then_hit(self):
+        data, state = service.get_products()
+        self.assertEqual(state, 'MISS')
+        self.assertEqual(data['results'][0]['id'], 1)
+
+        hits = StubCatalog.hits
+        _, state = service.get_products()
+        self.assertEqual(state, 'HIT')
+        self.assertEqual(StubCatalog.hits, hits)
+
+    def test_stale_copy_is_served_and_revalidated_with_304(self):
+        service.get_products()
+        _age_cache(90)
+        not_modified = StubCatalog.not_modified
+
+        _, state = service.get_products()
+        self.assertEqual(state, 'STALE')
+        # La revalidación corre en segundo plano
+        deadline = time.monotonic() + 2
+        while cache.get(service.REFRESH_LOCK_KEY) and time.monotonic() < deadline:
+            time.sleep(0.05)
+        self.assertEqual(StubCatalog.not_modified, not_modified + 1)
+        self.assertLess(time.time() - cache.get(service.CACHE_KEY)['fetched_at'], 5)
+
+    def test_slow_upstream_times_out_to_last_good_copy(self):
+        service.get_products()
+        _age_cache(200)
+        StubCatalog.mode = 'slow'
+
+        started = time.monotonic()
+        with self.assertLogs(service.logger, 'WARNING'):
+            _, state = service.get_products()
+        self.assertEqual(state, 'FALLBACK')
+        self.assertLess(time.monotonic() - started, 1.5)
+
+    def test_open_breaker_does_not_call_upstream(self):
+        service.get_products()
+        _age_cache(200)
+        self.fail_upstream(2)
+
+        hits = StubCatalog.hits
+        _, state = service.get_products()
+        self.assertEqual(state, 'FALLBACK')
+        self.assertEqual(StubCatalog.hits, hits)
+
+    def test_no_copy_and_upstream_down_raises(self):
+        StubCatalog.mode = 'down'
+        with self.assertRaises(service.UpstreamUnavailable), self.assertLogs(service.logger, 'ERROR'):
+            service.get_products()
+
+    def test_half_open_probe_closes_breaker(self):
+        self.fail_upstream(2)
+        self.assertFalse(service.breaker.allow_request())
+
+        # Tras PRODUCTS_BREAKER_RESET_SECONDS pasa a semiabierto
+        time.sleep(1.1)
+        StubCatalog.mode = 'ok'
+        _, state = service.get_products()
+        self.assertEqual(state, 'MISS')
+        self.assertTrue(service.breaker.allow_request())
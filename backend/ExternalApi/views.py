@@ -1,34 +1,71 @@
-import requests
-from django.http import JsonResponse
+from django.http import JsonResponse, StreamingHttpResponse
 from rest_framework import generics, permissions
 from django.contrib.auth import get_user_model
 from .serializers import UserListSerializer
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny
+from rest_framework import status
 from registers.models import FoodRegister
-from registers.serializers import FoodRegisterSerializer
+from .filters import PrefixSearchFilter
+from .pagination import UserCursorPagination
+from .service import UpstreamUnavailable, get_products
+from .export import csv_rows, decode_cursor, filter_export, ndjson_rows, parse_since
 
 def productos(request):
-    response = requests.get("https://comercia-1.onrender.com/es/api/products/")
-    data = response.json()
-    return JsonResponse(data)
+    try:
+        data, cache_status = get_products()
+    except UpstreamUnavailable:
+        return JsonResponse({'error': 'Catálogo de productos no disponible'}, status=503)
+    response = JsonResponse(data, safe=False)
+    response['X-Cache'] = cache_status
+    return response
 
 User = get_user_model()
 
 class UserListView(generics.ListAPIView):
 
-    queryset = User.objects.all()
+    # Solo las columnas que serializa la lista
+    queryset = User.objects.only(*UserListSerializer.Meta.fields)
     serializer_class = UserListSerializer
     permission_classes = [permissions.AllowAny]
+    filter_backends = [PrefixSearchFilter]
     search_fields = ['username', 'email', 'first_name', 'last_name']
+    pagination_class = UserCursorPagination
 
 @api_view(['GET'])
 @permission_classes([AllowAny])
 def external_food_registers(request):
-    registers = FoodRegister.objects.filter(status='completed').order_by('-created_at')
-    serializer = FoodRegisterSerializer(registers, many=True, context={'request': request})
-    return Response({
-        'count': len(serializer.data),
-        'results': serializer.data
-    })
\ No newline at end of file
+    """
+    Exporta los registros completados como NDJSON (por defecto) o CSV (?export=csv),
+    transmitiendo fila a fila. Sincronización incremental con ?since=<fecha ISO>
+    o ?cursor=<sync_cursor de la última fila recibida>; ?limit= acota la descarga.
+    """
+    export_format = request.query_params.get('export', 'ndjson')
+    if export_format not in ('ndjson', 'csv'):
+        return Response({'error': 'Formato inválido. Use: ndjson, csv'},
+                        status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        since = request.query_params.get('since')
+        cursor = request.query_params.get('cursor')
+        limit = request.query_params.get('limit')
+        registers = filter_export(
+            FoodRegister.objects.filter(status='completed').prefetch_related('food_items'),
+            since=parse_since(since) if since else None,
+            cursor=decode_cursor(cursor) if cursor else None,
+        )
+        if limit:
+            limit = int(limit)
+            if limit < 1:
+                raise ValueError("limit debe ser mayor a 0")
+            registers = registers[:limit]
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    if export_format == 'csv':
+        response = StreamingHttpResponse(csv_rows(registers, request), content_type='text/csv; charset=utf-8')
+        response['Content-Disposition'] = 'attachment; filename="food_registers.csv"'
+    else:
+        response = StreamingHttpResponse(ndjson_rows(registers, request), content_type='application/x-ndjson')
+    return response
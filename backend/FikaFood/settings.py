@@ -52,6 +52,7 @@ INSTALLED_APPS = [
     'progress',
     'admin_panel',
     'ExternalApi',
+    'ai_services',
 ]
 
 MIDDLEWARE = [
@@ -140,6 +141,106 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Cola de análisis de imágenes (python manage.py run_analysis_worker)
+ANALYSIS_WORKER_CONCURRENCY = int(os.environ.get('ANALYSIS_WORKER_CONCURRENCY', '2'))
+ANALYSIS_WORKER_POLL_INTERVAL = float(os.environ.get('ANALYSIS_WORKER_POLL_INTERVAL', '1.0'))
+ANALYSIS_MAX_ATTEMPTS = int(os.environ.get('ANALYSIS_MAX_ATTEMPTS', '3'))
+ANALYSIS_RETRY_BACKOFF_SECONDS = float(os.environ.get('ANALYSIS_RETRY_BACKOFF_SECONDS', '10'))
+ANALYSIS_JOB_TIMEOUT_SECONDS = int(os.environ.get('ANALYSIS_JOB_TIMEOUT_SECONDS', '300'))
+
+# Creación de registros por lotes (POST /api/registers/batch-create/)
+REGISTERS_BATCH_MAX_IMAGES = int(os.environ.get('REGISTERS_BATCH_MAX_IMAGES', '10'))
+
+# Backend de modelos de IA: 'gemini' (real) o 'fake' (respuestas locales para pruebas de carga)
+AI_BACKEND = os.environ.get('AI_BACKEND', 'gemini')
+AI_FAKE_LATENCY_MS = float(os.environ.get('AI_FAKE_LATENCY_MS', '800'))
+AI_FAKE_LATENCY_JITTER_MS = float(os.environ.get('AI_FAKE_LATENCY_JITTER_MS', '200'))
+AI_FAKE_FAILURE_RATE = float(os.environ.get('AI_FAKE_FAILURE_RATE', '0'))
+AI_FAKE_SEED = int(os.environ.get('AI_FAKE_SEED', '42'))
+
+# Cliente compartido de Gemini (ai_services.clients)
+GEMINI_REQUEST_TIMEOUT_MS = int(os.environ.get('GEMINI_REQUEST_TIMEOUT_MS', '60000'))
+GEMINI_MAX_CONNECTIONS = int(os.environ.get('GEMINI_MAX_CONNECTIONS', '20'))
+GEMINI_MAX_CONCURRENCY = int(os.environ.get('GEMINI_MAX_CONCURRENCY', '8'))
+GEMINI_SLOT_TIMEOUT_SECONDS = float(os.environ.get('GEMINI_SLOT_TIMEOUT_SECONDS', '30'))
+# Duración máxima de una respuesta en stream (el cupo del modelo se retiene mientras tanto)
+GEMINI_STREAM_TIMEOUT_SECONDS = float(os.environ.get('GEMINI_STREAM_TIMEOUT_SECONDS', '120'))
+# Límite por modelo, p. ej. "gemini-2.0-flash-exp=4,gemini-2.5-flash-lite=8"
+GEMINI_MODEL_CONCURRENCY = {
+    name.strip(): int(limit)
+    for name, limit in (
+        item.split('=') for item in os.environ.get('GEMINI_MODEL_CONCURRENCY', '').split(',') if '=' in item
+    )
+}
+
+# Preprocesado de imágenes antes de enviarlas a Gemini
+GEMINI_IMAGE_MAX_SIDE = int(os.environ.get('GEMINI_IMAGE_MAX_SIDE', '1024'))
+GEMINI_IMAGE_FORMAT = os.environ.get('GEMINI_IMAGE_FORMAT', 'JPEG')
+GEMINI_IMAGE_QUALITY = int(os.environ.get('GEMINI_IMAGE_QUALITY', '85'))
+
+# Derivados WEBP de las fotos de registros (miniatura para listas y tamaño medio)
+IMAGE_THUMBNAIL_MAX_SIDE = int(os.environ.get('IMAGE_THUMBNAIL_MAX_SIDE', '256'))
+IMAGE_MEDIUM_MAX_SIDE = int(os.environ.get('IMAGE_MEDIUM_MAX_SIDE', '960'))
+IMAGE_DERIVATIVE_QUALITY = int(os.environ.get('IMAGE_DERIVATIVE_QUALITY', '75'))
+# Fotos por contenido: al borrar un registro no se elimina un archivo escrito o
+# reutilizado hace menos de esto (puede pertenecer a una subida en curso)
+MEDIA_DELETE_GRACE_SECONDS = int(os.environ.get('MEDIA_DELETE_GRACE_SECONDS', '3600'))
+
+# Caché persistente de análisis de Gemini
+ANALYSIS_CACHE_ENABLED = os.environ.get('ANALYSIS_CACHE_ENABLED', 'True') == 'True'
+ANALYSIS_CACHE_TTL_SECONDS = int(os.environ.get('ANALYSIS_CACHE_TTL_SECONDS', str(30 * 24 * 3600)))
+ANALYSIS_CACHE_MAX_ENTRIES = int(os.environ.get('ANALYSIS_CACHE_MAX_ENTRIES', '10000'))
+# El worker de análisis borra vencidas y excedentes cada tanto (no en cada escritura)
+ANALYSIS_CACHE_EVICT_INTERVAL_SECONDS = int(os.environ.get('ANALYSIS_CACHE_EVICT_INTERVAL_SECONDS', '600'))
+# Coincidencia por imagen parecida (recodificada): desactivada por defecto
+ANALYSIS_CACHE_PERCEPTUAL_MATCH = os.environ.get('ANALYSIS_CACHE_PERCEPTUAL_MATCH', 'False') == 'True'
+ANALYSIS_CACHE_PERCEPTUAL_MAX_DISTANCE = int(os.environ.get('ANALYSIS_CACHE_PERCEPTUAL_MAX_DISTANCE', '4'))
+ANALYSIS_CACHE_COLOR_TOLERANCE = int(os.environ.get('ANALYSIS_CACHE_COLOR_TOLERANCE', '16'))
+ANALYSIS_CACHE_PERCEPTUAL_CANDIDATES = int(os.environ.get('ANALYSIS_CACHE_PERCEPTUAL_CANDIDATES', '200'))
+
+# Caché de respuestas (p. ej. CACHE_BACKEND=django.core.cache.backends.redis.RedisCache
+# y CACHE_LOCATION=redis://localhost:6379/1 para compartirla entre procesos)
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('CACHE_LOCATION', 'fikafood'),
+    }
+}
+# LocMemCache es por proceso: lo que un worker invalida no lo ven los demás
+CACHE_IS_SHARED = not CACHES['default']['BACKEND'].endswith(('.LocMemCache', '.DummyCache'))
+
+# Listados de registros de períodos cerrados (ayer, semana pasada, mes pasado).
+# Se invalidan con una versión guardada en la caché, así que solo se activan
+# por defecto con una caché compartida (Redis, Memcached, base de datos)
+REGISTERS_LIST_CACHE_ENABLED = os.environ.get('REGISTERS_LIST_CACHE_ENABLED', str(CACHE_IS_SHARED)) == 'True'
+REGISTERS_LIST_CACHE_TTL_SECONDS = int(os.environ.get('REGISTERS_LIST_CACHE_TTL_SECONDS', '3600'))
+
+# Exportación externa: filas leídas y serializadas por bloque
+EXTERNAL_EXPORT_CHUNK_SIZE = int(os.environ.get('EXTERNAL_EXPORT_CHUNK_SIZE', '500'))
+
+# Catálogo de productos remoto (proxy con caché y circuit breaker). La copia y el
+# estado del circuito viven en CACHES: sin una caché compartida son por worker
+PRODUCTS_API_URL = os.environ.get('PRODUCTS_API_URL', 'https://comercia-1.onrender.com/es/api/products/')
+PRODUCTS_API_CONNECT_TIMEOUT = float(os.environ.get('PRODUCTS_API_CONNECT_TIMEOUT', '3'))
+PRODUCTS_API_READ_TIMEOUT = float(os.environ.get('PRODUCTS_API_READ_TIMEOUT', '10'))
+PRODUCTS_API_MAX_CONNECTIONS = int(os.environ.get('PRODUCTS_API_MAX_CONNECTIONS', '10'))
+PRODUCTS_CACHE_TTL_SECONDS = int(os.environ.get('PRODUCTS_CACHE_TTL_SECONDS', '300'))
+PRODUCTS_CACHE_STALE_SECONDS = int(os.environ.get('PRODUCTS_CACHE_STALE_SECONDS', '3600'))
+PRODUCTS_BREAKER_FAILURES = int(os.environ.get('PRODUCTS_BREAKER_FAILURES', '5'))
+PRODUCTS_BREAKER_RESET_SECONDS = int(os.environ.get('PRODUCTS_BREAKER_RESET_SECONDS', '30'))
+
+# Dashboard de administración: caché corta y, opcionalmente, lectura de los
+# contadores diarios (la migración los rellena y las señales los mantienen;
+# rebuild_daily_counters los recalcula)
+ADMIN_STATS_CACHE_TTL_SECONDS = int(os.environ.get('ADMIN_STATS_CACHE_TTL_SECONDS', '60'))
+ADMIN_DAILY_COUNTERS_ENABLED = os.environ.get('ADMIN_DAILY_COUNTERS_ENABLED', 'False') == 'True'
+ADMIN_ANALYTICS_MAX_BUCKETS = int(os.environ.get('ADMIN_ANALYTICS_MAX_BUCKETS', '400'))
+# Listas del panel: tamaño máximo de página y tope del conteo aproximado
+ADMIN_MAX_PAGE_SIZE = int(os.environ.get('ADMIN_MAX_PAGE_SIZE', '100'))
+ADMIN_COUNT_CAP = int(os.environ.get('ADMIN_COUNT_CAP', '10000'))
+# Búsqueda de texto completo del panel: resultados ordenados por relevancia
+ADMIN_SEARCH_MAX_RESULTS = int(os.environ.get('ADMIN_SEARCH_MAX_RESULTS', '500'))
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
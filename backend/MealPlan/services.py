@@ -1,19 +1,15 @@
-from google import genai
+from contextlib import closing
 from google.genai import types
+from ai_services.backends import get_backend
 from datetime import datetime, timedelta
 import re
 from django.conf import settings
 from .models import MealPlan
-import os
 
 
 class MealPlanService:
     def __init__(self):
-        self.api_key = os.environ.get("GEMINI_API_KEY")
-        if not self.api_key:
-            raise Exception("GEMINI_API_KEY no encontrada")
-
-        self.client = genai.Client(api_key=self.api_key)
+        self.backend = get_backend()
         self.model = "gemini-2.0-flash-exp"
 
     def get_user_context(self, user):
@@ -122,14 +118,16 @@ Cena: ...
             max_output_tokens=1500,
         )
 
+        # closing() libera el cupo del modelo aunque la lectura se interrumpa
         response_text = ""
-        for chunk in self.client.models.generate_content_stream(
-            model=self.model,
-            contents=contents,
+        with closing(self.backend.generate_stream(
+            self.model,
+            contents,
             config=config,
-        ):
-            if hasattr(chunk, "text") and chunk.text:
-                response_text += chunk.text
+            task="meal_plan",
+        )) as stream:
+            for text in stream:
+                response_text += text
 
         # Parsear y guardar en BD
         parsed_plan = self.parse_plan(response_text)
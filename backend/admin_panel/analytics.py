@@ -0,0 +1,129 @@
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncMonth, TruncWeek
+
+from registers.rollups import local_date
+from .models import DailyActiveUser, DailyCounter
+from .stats import counted_models
+
+# Serie -> métrica de DailyCounter
+SERIES = {
+    'signups': 'users',
+    'registers': 'registers',
+    'meal_plans': 'meal_plans',
+    'conversations': 'conversations',
+    'messages': 'messages',
+    'active_users': 'active_users',
+}
+
+INTERVALS = {
+    'day': None,
+    'week': TruncWeek,
+    'month': TruncMonth,
+}
+
+# Rango por defecto de cada intervalo (en buckets)
+DEFAULT_BUCKETS = {'day': 30, 'week': 12, 'month': 12}
+
+
+def bucket_start(day, interval):
+    if interval == 'week':
+        return day - timedelta(days=day.weekday())
+    if interval == 'month':
+        return day.replace(day=1)
+    return day
+
+
+def next_bucket(day, interval):
+    if interval == 'week':
+        return day + timedelta(days=7)
+    if interval == 'month':
+        return date(day.year + day.month // 12, day.month % 12 + 1, 1)
+    return day + timedelta(days=1)
+
+
+def buckets(start, end, interval):
+    """Inicio de cada bucket entre start y end (inclusive)"""
+    current = bucket_start(start, interval)
+    while current <= end:
+        yield current
+        current = next_bucket(current, interval)
+
+
+def default_start(end, interval):
+    start = bucket_start(end, interval)
+    for _ in range(DEFAULT_BUCKETS[interval] - 1):
+        start = bucket_start(start - timedelta(days=1), interval)
+    return start
+
+
+def _as_date(value):
+    return value.date() if hasattr(value, 'date') else value
+
+
+def _counter_series(metrics, start, end, interval):
+    """Suma de los contadores diarios por bucket: una consulta para todas las métricas"""
+    rows = DailyCounter.objects.filter(metric__in=metrics, date__gte=start, date__lte=end).order_by()
+    trunc = INTERVALS[interval]
+    if trunc:
+        rows = rows.annotate(period=trunc('date')).values('metric', 'period').annotate(value=Sum('value'))
+    else:
+        rows = rows.values('metric', 'value', period=F('date'))
+    return {(row['metric'], _as_date(row['period'])): row['value'] for row in rows}
+
+
+def _distinct_active_users(start, end, interval):
+    """Usuarios distintos por semana o mes (no es la suma de los activos diarios)"""
+    rows = (
+        DailyActiveUser.objects.filter(date__gte=start, date__lte=end)
+        .annotate(period=INTERVALS[interval]('date'))
+        .order_by()
+        .values('period')
+        .annotate(value=Count('user', distinct=True))
+    )
+    return {('active_users', _as_date(row['period'])): row['value'] for row in rows}
+
+
+def time_series(series=None, interval='day', start=None, end=None):
+    """
+    Series temporales del panel con buckets vacíos en 0. Lanza ValueError si
+    los parámetros son inválidos o el rango supera ADMIN_ANALYTICS_MAX_BUCKETS.
+    """
+    if interval not in INTERVALS:
+        raise ValueError(f"Intervalo inválido. Use: {', '.join(INTERVALS)}")
+
+    available = [name for name, metric in SERIES.items()
+                 if metric == 'active_users' or metric in counted_models()]
+    series = series or available
+    unknown = [name for name in series if name not in available]
+    if unknown:
+        raise ValueError(f"Series inválidas: {', '.join(unknown)}. Use: {', '.join(available)}")
+
+    end = end or local_date()
+    start = bucket_start(start or default_start(end, interval), interval)
+    if start > end:
+        raise ValueError("start debe ser anterior a end")
+    periods = list(buckets(start, end, interval))
+    if len(periods) > settings.ADMIN_ANALYTICS_MAX_BUCKETS:
+        raise ValueError(f"Máximo {settings.ADMIN_ANALYTICS_MAX_BUCKETS} periodos por consulta")
+
+    metrics = [SERIES[name] for name in series]
+    summed = [metric for metric in metrics if not (metric == 'active_users' and interval != 'day')]
+    values = _counter_series(summed, start, end, interval) if summed else {}
+    if 'active_users' in metrics and interval != 'day':
+        values.update(_distinct_active_users(start, end, interval))
+
+    return {
+        'interval': interval,
+        'start': start,
+        'end': end,
+        'series': {
+            name: [
+                {'period': period, 'value': values.get((SERIES[name], period), 0)}
+                for period in periods
+            ]
+            for name in series
+        },
+    }
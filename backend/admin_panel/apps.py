@@ -4,3 +4,8 @@ class AdminPanelConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'admin_panel'
     verbose_name = 'Panel de Administración'
+
+    def ready(self):
+        from .signals import connect_search_signals, connect_stats_signals
+        connect_stats_signals()
+        connect_search_signals()
@@ -0,0 +1,17 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from admin_panel.stats import rebuild_daily_counters
+
+
+class Command(BaseCommand):
+    help = (
+        "Recalcula los contadores diarios y los usuarios activos desde las tablas. Ejecutar "
+        "una vez tras el despliegue y tras importaciones masivas (luego las señales los mantienen)"
+    )
+
+    def handle(self, *args, **options):
+        total = rebuild_daily_counters()
+        self.stdout.write(self.style.SUCCESS(f"{total} contadores diarios recalculados"))
+        if not settings.ADMIN_DAILY_COUNTERS_ENABLED:
+            self.stdout.write("ADMIN_DAILY_COUNTERS_ENABLED está desactivado: el dashboard sigue leyendo las tablas")
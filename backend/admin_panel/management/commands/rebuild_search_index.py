@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from admin_panel.search import INDEXES, rebuild_index, search_supported
+
+
+class Command(BaseCommand):
+    help = (
+        "Reconstruye el índice de texto completo del panel (registros y usuarios). "
+        "La migración 0005 lo llena y las señales lo mantienen; usar si queda desalineado"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--only', choices=list(INDEXES), help="Reconstruir solo un índice")
+        parser.add_argument('--batch-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        if not search_supported():
+            raise CommandError("El motor de base de datos no tiene índice de búsqueda (se usa icontains)")
+
+        for kind in [options['only']] if options['only'] else INDEXES:
+            total = rebuild_index(kind, options['batch_size'])
+            self.stdout.write(self.style.SUCCESS(f"{kind}: {total} documentos indexados"))
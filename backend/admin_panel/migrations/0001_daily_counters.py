@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('metric', models.CharField(choices=[('users', 'Usuarios'), ('meal_plans', 'Planes de comida'), ('registers', 'Registros'), ('conversations', 'Conversaciones')], max_length=20)),
+                ('date', models.DateField()),
+                ('value', models.IntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Contador Diario',
+                'verbose_name_plural': 'Contadores Diarios',
+                'ordering': ['date'],
+                'constraints': [models.UniqueConstraint(fields=('metric', 'date'), name='admin_counter_metric_date_uniq')],
+            },
+        ),
+    ]
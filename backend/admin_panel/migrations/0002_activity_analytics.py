@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:39
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('admin_panel', '0001_daily_counters'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='dailycounter',
+            name='metric',
+            field=models.CharField(choices=[('users', 'Usuarios'), ('meal_plans', 'Planes de comida'), ('registers', 'Registros'), ('conversations', 'Conversaciones'), ('messages', 'Mensajes'), ('active_users', 'Usuarios activos')], max_length=20),
+        ),
+        migrations.CreateModel(
+            name='DailyActiveUser',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='activity_days', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Usuario Activo Diario',
+                'verbose_name_plural': 'Usuarios Activos Diarios',
+                'ordering': ['date'],
+                'constraints': [models.UniqueConstraint(fields=('date', 'user'), name='admin_active_user_date_uniq')],
+            },
+        ),
+    ]
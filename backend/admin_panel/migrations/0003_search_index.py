@@ -0,0 +1,46 @@
+from django.db import migrations
+
+# Mismas tablas que admin_panel/search.py: INDEXES
+TABLES = {
+    'admin_register_search': ['description', 'ai_description', 'food_items'],
+    'admin_user_search': ['username', 'email', 'first_name', 'last_name'],
+}
+
+
+def create_search_tables(apps, schema_editor):
+    """FTS5 en SQLite, tsvector + pg_trgm en PostgreSQL; otros motores usan icontains"""
+    vendor = schema_editor.connection.vendor
+    for table, columns in TABLES.items():
+        if vendor == 'sqlite':
+            schema_editor.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {table} USING fts5("
+                f"{', '.join(columns)}, tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+            )
+        elif vendor == 'postgresql':
+            schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+            schema_editor.execute(
+                f"CREATE TABLE IF NOT EXISTS {table} ("
+                f"object_id bigint PRIMARY KEY, content text NOT NULL, document tsvector NOT NULL)"
+            )
+            schema_editor.execute(f"CREATE INDEX IF NOT EXISTS {table}_document_idx ON {table} USING gin (document)")
+            schema_editor.execute(
+                f"CREATE INDEX IF NOT EXISTS {table}_trgm_idx ON {table} USING gin (content gin_trgm_ops)"
+            )
+
+
+def drop_search_tables(apps, schema_editor):
+    if schema_editor.connection.vendor in ('sqlite', 'postgresql'):
+        for table in TABLES:
+            schema_editor.execute(f"DROP TABLE IF EXISTS {table}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('admin_panel', '0002_activity_analytics'),
+    ]
+
+    operations = [
+        # El índice empieza vacío: lo llena la migración 0005
+        migrations.RunPython(create_search_tables, drop_search_tables),
+    ]
@@ -0,0 +1,22 @@
+from django.db import migrations
+
+
+def backfill_daily_counters(apps, schema_editor):
+    from admin_panel.stats import rebuild_daily_counters
+
+    rebuild_daily_counters(apps)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('admin_panel', '0003_search_index'),
+        ('chatbot', '0001_initial'),
+        ('MealPlan', '0002_remove_mealplan_breakfast_remove_mealplan_dinner_and_more'),
+        ('registers', '0010_analysis_cache_color_signature'),
+        ('users', '0006_user_search_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_daily_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,19 @@
+from django.db import migrations
+
+
+def populate_search_index(apps, schema_editor):
+    from admin_panel.search import INDEXES, rebuild_index
+
+    for kind in INDEXES:
+        rebuild_index(kind, apps=apps)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('admin_panel', '0004_backfill_daily_counters'),
+    ]
+
+    operations = [
+        migrations.RunPython(populate_search_index, migrations.RunPython.noop),
+    ]
@@ -1,3 +1,51 @@
+from django.conf import settings
 from django.db import models
 
-# No necesitamos modelos específicos, usaremos los existentes
+
+class DailyCounter(models.Model):
+    """
+    Altas por día y métrica (día en la zona horaria del servidor), mantenidas
+    por señales. Respaldan las series de analytics y, con
+    ADMIN_DAILY_COUNTERS_ENABLED, las comparaciones mensuales del dashboard.
+    """
+
+    METRIC_CHOICES = [
+        ('users', 'Usuarios'),
+        ('meal_plans', 'Planes de comida'),
+        ('registers', 'Registros'),
+        ('conversations', 'Conversaciones'),
+        ('messages', 'Mensajes'),
+        ('active_users', 'Usuarios activos'),
+    ]
+    metric = models.CharField(max_length=20, choices=METRIC_CHOICES)
+    date = models.DateField()
+    value = models.IntegerField(default=0)
+
+    class Meta:
+        ordering = ['date']
+        constraints = [
+            models.UniqueConstraint(fields=['metric', 'date'], name='admin_counter_metric_date_uniq'),
+        ]
+        verbose_name = "Contador Diario"
+        verbose_name_plural = "Contadores Diarios"
+
+    def __str__(self):
+        return f"{self.metric} {self.date}: {self.value}"
+
+
+class DailyActiveUser(models.Model):
+    """Un usuario activo en un día (creó un registro, un plan o escribió al chatbot)"""
+
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='activity_days')
+    date = models.DateField()
+
+    class Meta:
+        ordering = ['date']
+        constraints = [
+            models.UniqueConstraint(fields=['date', 'user'], name='admin_active_user_date_uniq'),
+        ]
+        verbose_name = "Usuario Activo Diario"
+        verbose_name_plural = "Usuarios Activos Diarios"
+
+    def __str__(self):
+        return f"{self.user_id} {self.date}"
@@ -0,0 +1,170 @@
+import base64
+import json
+from functools import reduce
+from operator import or_
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+
+
+def _positive_int(value, default):
+    try:
+        number = int(value)
+    except (TypeError, ValueError):
+        return default
+    return number if number > 0 else default
+
+
+class AdminPagination:
+    """
+    Paginación común de las listas del panel.
+
+    - ?cursor= (keyset): la página siguiente se filtra a partir de la última fila
+      (WHERE id < ...), así el costo no crece con la profundidad. Cada respuesta
+      trae next_cursor.
+    - ?page= (compatibilidad con paginadores numerados): OFFSET clásico.
+    - ?page_size= acotado por ADMIN_MAX_PAGE_SIZE.
+    - ?count=exact|approx|none: approx (por defecto) cuenta hasta
+      ADMIN_COUNT_CAP filas y en PostgreSQL usa la estimación del planner
+      para tablas sin filtro.
+    """
+
+    default_page_size = 20
+
+    def __init__(self, request, ordering=('-id',)):
+        self.request = request
+        self.ordering = ordering
+        params = request.query_params
+        self.page_size = min(
+            _positive_int(params.get('page_size'), self.default_page_size),
+            settings.ADMIN_MAX_PAGE_SIZE,
+        )
+        self.page = _positive_int(params.get('page'), 1)
+        self.cursor = params.get('cursor')
+        self.count_mode = params.get('count', 'approx')
+        if self.count_mode not in ('exact', 'approx', 'none'):
+            raise ValueError("count inválido. Use: exact, approx, none")
+
+    # ===== CURSOR =====
+
+    def _fields(self):
+        return [(field.lstrip('-'), field.startswith('-')) for field in self.ordering]
+
+    def _encode(self, payload):
+        raw = json.dumps(payload)
+        return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+    def _decode(self):
+        try:
+            padded = self.cursor + '=' * (-len(self.cursor) % 4)
+            return json.loads(base64.urlsafe_b64decode(padded))
+        except (ValueError, UnicodeDecodeError):
+            raise ValueError("Cursor inválido")
+
+    def _encode_cursor(self, obj):
+        values = [getattr(obj, name) for name, _ in self._fields()]
+        return self._encode([value.isoformat() if hasattr(value, 'isoformat') else value for value in values])
+
+    def _decode_cursor(self):
+        values = self._decode()
+        if not isinstance(values, list) or len(values) != len(self.ordering):
+            raise ValueError("Cursor inválido")
+        return values
+
+    def _after_cursor(self, queryset):
+        """(a, b) < (va, vb) en el orden de la lista, expandido en OR para usar el índice"""
+        values = self._decode_cursor()
+        conditions = []
+        for index, (name, descending) in enumerate(self._fields()):
+            equal = {field: value for (field, _), value in zip(self._fields()[:index], values)}
+            lookup = f"{name}__{'lt' if descending else 'gt'}"
+            conditions.append(Q(**equal, **{lookup: values[index]}))
+        return queryset.filter(reduce(or_, conditions))
+
+    # ===== CONTEO =====
+
+    def _estimated_rows(self, queryset):
+        """Filas según las estadísticas de PostgreSQL (None si no aplica)"""
+        if connection.vendor != 'postgresql' or queryset.query.where:
+            return None
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT reltuples::bigint FROM pg_class WHERE relname = %s',
+                           [queryset.model._meta.db_table])
+            row = cursor.fetchone()
+        return row[0] if row and row[0] > settings.ADMIN_COUNT_CAP else None
+
+    def _count(self, queryset):
+        if self.count_mode == 'none':
+            return None, False
+        if self.count_mode == 'exact':
+            return queryset.count(), True
+
+        estimated = self._estimated_rows(queryset)
+        if estimated is not None:
+            return estimated, False
+        # COUNT sobre un LIMIT: deja de leer al llegar al tope
+        capped = queryset.order_by()[:settings.ADMIN_COUNT_CAP + 1].count()
+        if capped > settings.ADMIN_COUNT_CAP:
+            return settings.ADMIN_COUNT_CAP, False
+        return capped, True
+
+    # ===== PÁGINA =====
+
+    def paginate(self, queryset, prepare=None):
+        """
+        Retorna las filas de la página pedida. prepare(queryset) se aplica solo a
+        la consulta de la página (anotaciones, select_related), no al conteo.
+        """
+        self.count, self.count_exact = self._count(queryset)
+
+        queryset = queryset.order_by(*self.ordering)
+        if prepare:
+            queryset = prepare(queryset)
+        if self.cursor:
+            queryset = self._after_cursor(queryset)
+            rows = list(queryset[:self.page_size + 1])
+        else:
+            start = (self.page - 1) * self.page_size
+            rows = list(queryset[start:start + self.page_size + 1])
+
+        has_next = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        self.next_cursor = self._encode_cursor(rows[-1]) if has_next and rows else None
+        return rows
+
+    def paginate_ranked(self, ids, fetch):
+        """
+        Pagina una lista de ids ya ordenada por relevancia (búsqueda de texto).
+        El cursor guarda la posición en la lista; fetch(ids) trae las filas.
+        """
+        if self.cursor:
+            position = self._decode()
+            if not isinstance(position, dict) or not isinstance(position.get('offset'), int):
+                raise ValueError("Cursor inválido")
+            start = max(position['offset'], 0)
+        else:
+            start = (self.page - 1) * self.page_size
+
+        capped = len(ids) >= settings.ADMIN_SEARCH_MAX_RESULTS
+        self.count, self.count_exact = (None, False) if self.count_mode == 'none' else (len(ids), not capped)
+
+        page_ids = ids[start:start + self.page_size]
+        rows_by_id = {row.pk: row for row in fetch(page_ids)} if page_ids else {}
+        end = start + self.page_size
+        self.next_cursor = self._encode({'offset': end}) if end < len(ids) else None
+        return [rows_by_id[pk] for pk in page_ids if pk in rows_by_id]
+
+    def response_data(self, results):
+        data = {
+            'results': results,
+            'count': self.count,
+            'count_exact': self.count_exact,
+            'page_size': self.page_size,
+            'next_cursor': self.next_cursor,
+        }
+        if not self.cursor:
+            data['page'] = self.page
+            if self.count is not None:
+                data['total_pages'] = (self.count + self.page_size - 1) // self.page_size
+        return data
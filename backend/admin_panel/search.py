@@ -0,0 +1,194 @@
+"""
+Índice de búsqueda de texto completo del panel (registros y usuarios).
+
+Según el motor configurado:
+- SQLite: tablas virtuales FTS5 con rowid = id del objeto, ranking bm25.
+- PostgreSQL: tablas con tsvector (GIN) y trigramas (pg_trgm) para
+  coincidencias aproximadas, ranking ts_rank + similarity.
+- Otros motores: sin índice; las vistas usan icontains.
+
+Las tablas las crea la migración 0003_search_index y la 0005 las llena con
+los datos existentes. Las señales mantienen el índice al guardar o borrar (al
+confirmar la transacción); rebuild_search_index lo reconstruye completo.
+Mientras el índice esté vacío las vistas siguen usando icontains.
+"""
+import re
+
+from django.apps import apps as global_apps
+from django.conf import settings
+from django.db import connection, transaction
+
+# Índice -> tabla y columnas de texto (las tablas las crea la migración)
+INDEXES = {
+    'registers': {
+        'table': 'admin_register_search',
+        'columns': ['description', 'ai_description', 'food_items'],
+    },
+    'users': {
+        'table': 'admin_user_search',
+        'columns': ['username', 'email', 'first_name', 'last_name'],
+    },
+}
+
+WORD = re.compile(r'\w+', re.UNICODE)
+
+
+def search_supported():
+    return connection.vendor in ('sqlite', 'postgresql')
+
+
+# ===== DOCUMENTOS =====
+
+def _register_documents(register_ids, apps=global_apps):
+    """id -> [description, ai_description, nombres de alimentos]"""
+    FoodRegister = apps.get_model('registers', 'FoodRegister')
+    FoodItem = apps.get_model('registers', 'FoodItem')
+    documents = {
+        register_id: [description or '', ai_description or '', []]
+        for register_id, description, ai_description in FoodRegister.objects.filter(
+            id__in=register_ids
+        ).values_list('id', 'description', 'ai_description')
+    }
+    items = FoodItem.objects.filter(food_register_id__in=documents).values_list('food_register_id', 'name')
+    for register_id, name in items:
+        documents[register_id][2].append(name)
+    return {
+        register_id: [description, ai_description, ' '.join(names)]
+        for register_id, (description, ai_description, names) in documents.items()
+    }
+
+
+def _user_documents(user_ids, apps=global_apps):
+    User = apps.get_model(settings.AUTH_USER_MODEL)
+    return {
+        row[0]: [value or '' for value in row[1:]]
+        for row in User.objects.filter(id__in=user_ids).values_list(
+            'id', 'username', 'email', 'first_name', 'last_name'
+        )
+    }
+
+
+DOCUMENT_BUILDERS = {
+    'registers': _register_documents,
+    'users': _user_documents,
+}
+
+
+# ===== ACTUALIZACIÓN =====
+
+def _write(kind, documents):
+    table = INDEXES[kind]['table']
+    columns = INDEXES[kind]['columns']
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            # FTS5 no tiene UPSERT: se reemplaza la fila por rowid
+            cursor.executemany(
+                f"INSERT OR REPLACE INTO {table} (rowid, {', '.join(columns)}) "
+                f"VALUES (%s{', %s' * len(columns)})",
+                [[object_id, *values] for object_id, values in documents.items()],
+            )
+        else:
+            cursor.executemany(
+                f"INSERT INTO {table} (object_id, content, document) "
+                f"VALUES (%s, %s, to_tsvector('simple', %s)) "
+                f"ON CONFLICT (object_id) DO UPDATE SET content = EXCLUDED.content, document = EXCLUDED.document",
+                [[object_id, ' '.join(values).lower(), ' '.join(values)] for object_id, values in documents.items()],
+            )
+
+
+def remove_from_index(kind, object_ids):
+    if not search_supported() or not object_ids:
+        return
+    table = INDEXES[kind]['table']
+    key = 'rowid' if connection.vendor == 'sqlite' else 'object_id'
+    with connection.cursor() as cursor:
+        cursor.executemany(f"DELETE FROM {table} WHERE {key} = %s", [[object_id] for object_id in object_ids])
+
+
+def update_index(kind, object_ids):
+    """Reindexa los objetos indicados (los que ya no existen se quitan del índice)"""
+    if not search_supported() or not object_ids:
+        return
+    documents = DOCUMENT_BUILDERS[kind](object_ids)
+    _write(kind, documents)
+    remove_from_index(kind, [object_id for object_id in object_ids if object_id not in documents])
+
+
+def _index_model(kind, apps=global_apps):
+    if kind == 'registers':
+        return apps.get_model('registers', 'FoodRegister')
+    return apps.get_model(settings.AUTH_USER_MODEL)
+
+
+@transaction.atomic
+def rebuild_index(kind, batch_size=2000, apps=global_apps):
+    """
+    Vacía y reconstruye el índice recorriendo la tabla por bloques de ids.
+    En una transacción: las búsquedas no ven el índice a medio llenar.
+    """
+    if not search_supported():
+        return 0
+    model = _index_model(kind, apps)
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {INDEXES[kind]['table']}")
+
+    total = 0
+    last_id = 0
+    while True:
+        ids = list(model.objects.filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[:batch_size])
+        if not ids:
+            return total
+        _write(kind, DOCUMENT_BUILDERS[kind](ids, apps))
+        total += len(ids)
+        last_id = ids[-1]
+
+
+# ===== CONSULTA =====
+
+def _terms(query):
+    return [term.lower() for term in WORD.findall(query)][:10]
+
+
+def _index_populated(table):
+    with connection.cursor() as cursor:
+        cursor.execute(f"SELECT 1 FROM {table} LIMIT 1")
+        return cursor.fetchone() is not None
+
+
+def search_ids(kind, query, limit=None):
+    """
+    Ids que coinciden con todas las palabras de query (por prefijo), de mayor
+    a menor relevancia. None si el motor no tiene índice o si aún está vacío
+    (usar icontains).
+    """
+    if not search_supported():
+        return None
+    terms = _terms(query)
+    if not terms:
+        return []
+    limit = limit or settings.ADMIN_SEARCH_MAX_RESULTS
+    table = INDEXES[kind]['table']
+
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            match = ' '.join(f'"{term}"*' for term in terms)
+            cursor.execute(
+                f"SELECT rowid FROM {table} WHERE {table} MATCH %s ORDER BY bm25({table}) LIMIT %s",
+                [match, limit],
+            )
+        else:
+            tsquery = ' & '.join(f'{term}:*' for term in terms)
+            plain = ' '.join(terms)
+            cursor.execute(
+                f"SELECT object_id FROM {table} "
+                f"WHERE document @@ to_tsquery('simple', %s) OR content %% %s "
+                f"ORDER BY ts_rank(document, to_tsquery('simple', %s)) DESC, similarity(content, %s) DESC "
+                f"LIMIT %s",
+                [tsquery, plain, tsquery, plain, limit],
+            )
+        ids = [row[0] for row in cursor.fetchall()]
+
+    # Sin resultados: solo entonces se comprueba que el índice esté construido
+    if not ids and not _index_populated(table):
+        return None
+    return ids
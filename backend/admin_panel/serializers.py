@@ -5,16 +5,17 @@ from registers.models import FoodRegister, FoodItem
 User = get_user_model()
 
 class AdminUserListSerializer(serializers.ModelSerializer):
-    total_registers = serializers.SerializerMethodField()
+    # Anotados en la consulta con annotate_user_counts (sin consultas por fila)
+    total_registers = serializers.IntegerField(read_only=True)
+    total_meal_plans = serializers.IntegerField(read_only=True)
+    total_conversations = serializers.IntegerField(read_only=True)
     profile_info = serializers.SerializerMethodField()
     
     class Meta:
         model = User
         fields = ['id', 'username', 'email', 'first_name', 'last_name', 
-                 'date_joined', 'last_login', 'is_active', 'is_superuser', 'total_registers', 'profile_info']
-    
-    def get_total_registers(self, obj):
-        return FoodRegister.objects.filter(user=obj).count()
+                 'date_joined', 'last_login', 'is_active', 'is_superuser', 'total_registers', 'total_meal_plans',
+                 'total_conversations', 'profile_info']
     
     def get_profile_info(self, obj):
         try:
@@ -0,0 +1,74 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+
+from registers.models import FoodItem, FoodRegister
+from .search import remove_from_index, update_index
+from .stats import (
+    DASHBOARD_METRICS, activity_sources, add_to_daily_counter, counted_models, invalidate_dashboard_stats,
+    record_activity,
+)
+
+
+def _connect(metric, model, field):
+    def on_save(sender, instance, created, **kwargs):
+        if created:
+            add_to_daily_counter(metric, getattr(instance, field), 1)
+        if metric in DASHBOARD_METRICS:
+            invalidate_dashboard_stats()
+
+    def on_delete(sender, instance, **kwargs):
+        add_to_daily_counter(metric, getattr(instance, field), -1)
+        if metric in DASHBOARD_METRICS:
+            invalidate_dashboard_stats()
+
+    post_save.connect(on_save, sender=model, weak=False, dispatch_uid=f'admin_stats_save_{metric}')
+    post_delete.connect(on_delete, sender=model, weak=False, dispatch_uid=f'admin_stats_delete_{metric}')
+
+
+def _connect_activity(model, user_field, date_field, condition):
+    lookups = dict(condition.children)
+
+    def on_create(sender, instance, created, **kwargs):
+        if not created or any(getattr(instance, name) != value for name, value in lookups.items()):
+            return
+        # conversation__user_id -> instance.conversation.user_id
+        owner = instance
+        for part in user_field.split('__'):
+            owner = getattr(owner, part)
+        record_activity(owner, getattr(instance, date_field))
+
+    post_save.connect(on_create, sender=model, weak=False, dispatch_uid=f'admin_activity_{model.__name__}')
+
+
+def _connect_search(kind, model, object_id):
+    """Reindexa al confirmar la transacción (los alimentos se crean después del registro)"""
+    def on_save(sender, instance, **kwargs):
+        ids = [object_id(instance)]
+        transaction.on_commit(lambda: update_index(kind, ids))
+
+    def on_delete(sender, instance, **kwargs):
+        ids = [object_id(instance)]
+        if model is FoodItem:
+            transaction.on_commit(lambda: update_index(kind, ids))
+        else:
+            transaction.on_commit(lambda: remove_from_index(kind, ids))
+
+    uid = f'admin_search_{model.__name__}'
+    post_save.connect(on_save, sender=model, weak=False, dispatch_uid=f'{uid}_save')
+    post_delete.connect(on_delete, sender=model, weak=False, dispatch_uid=f'{uid}_delete')
+
+
+def connect_stats_signals():
+    """Altas y bajas actualizan los contadores diarios, la actividad e invalidan el dashboard"""
+    for metric, (model, field) in counted_models().items():
+        _connect(metric, model, field)
+    for source in activity_sources():
+        _connect_activity(*source)
+
+
+def connect_search_signals():
+    """Mantiene el índice de texto completo de registros y usuarios"""
+    _connect_search('registers', FoodRegister, lambda register: register.pk)
+    _connect_search('registers', FoodItem, lambda item: item.food_register_id)
+    _connect_search('users', get_user_model(), lambda user: user.pk)
@@ -0,0 +1,232 @@
+from datetime import timedelta
+
+from django.apps import apps as global_apps
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from registers.rollups import day_bounds, local_date
+from .models import DailyActiveUser, DailyCounter
+
+CONVERSATION_AVAILABLE = global_apps.is_installed('chatbot')
+
+User = get_user_model()
+
+DASHBOARD_CACHE_KEY = 'admin:dashboard_stats:{day}'
+ACTIVE_USER_CACHE_KEY = 'admin:active:{user_id}:{day}'
+
+# Métricas que muestra el dashboard
+DASHBOARD_METRICS = ['users', 'meal_plans', 'registers', 'conversations']
+
+
+def counted_models(apps=global_apps):
+    """
+    Métrica de DailyCounter -> (modelo, campo de fecha de alta). apps permite
+    usar los modelos históricos desde una migración.
+    """
+    models = {
+        'users': (apps.get_model(settings.AUTH_USER_MODEL), 'date_joined'),
+        'meal_plans': (apps.get_model('MealPlan', 'MealPlan'), 'created_at'),
+        'registers': (apps.get_model('registers', 'FoodRegister'), 'created_at'),
+    }
+    if CONVERSATION_AVAILABLE:
+        models['conversations'] = (apps.get_model('chatbot', 'Conversation'), 'created_at')
+        models['messages'] = (apps.get_model('chatbot', 'Message'), 'timestamp')
+    return models
+
+
+def activity_sources(apps=global_apps):
+    """Acciones que cuentan como actividad: (modelo, campo del usuario, campo de fecha, filtro)"""
+    sources = [
+        (apps.get_model('registers', 'FoodRegister'), 'user_id', 'created_at', Q()),
+        (apps.get_model('MealPlan', 'MealPlan'), 'user_id', 'created_at', Q()),
+    ]
+    if CONVERSATION_AVAILABLE:
+        sources.append((apps.get_model('chatbot', 'Message'), 'conversation__user_id', 'timestamp', Q(role='user')))
+    return sources
+
+
+def calculate_percentage_change(current, previous):
+    if previous == 0:
+        return 100 if current > 0 else 0
+    return round(((current - previous) / previous) * 100, 1)
+
+
+def _periods(today):
+    """Inicio (datetime) del mes, de la semana y del día en la zona del servidor"""
+    return {
+        'month_start': day_bounds(today.replace(day=1))[0],
+        'week_start': day_bounds(today - timedelta(days=7))[0],
+        'today_start': day_bounds(today)[0],
+        'today_end': day_bounds(today)[1],
+    }
+
+
+def _counts_from_tables(today):
+    """Una agregación condicional por tabla: total, antes del mes, semana y hoy"""
+    periods = _periods(today)
+    counts = {}
+    for metric, (model, field) in counted_models().items():
+        if metric not in DASHBOARD_METRICS:
+            continue
+        counts[metric] = model.objects.aggregate(
+            total=Count('pk'),
+            before_month=Count('pk', filter=Q(**{f'{field}__lt': periods['month_start']})),
+            week=Count('pk', filter=Q(**{f'{field}__gte': periods['week_start']})),
+            today=Count('pk', filter=Q(**{
+                f'{field}__gte': periods['today_start'],
+                f'{field}__lt': periods['today_end'],
+            })),
+        )
+    return counts
+
+
+def _counts_from_daily_counters(today):
+    """Las mismas cifras en una sola consulta sobre los contadores precalculados"""
+    rows = DailyCounter.objects.filter(metric__in=DASHBOARD_METRICS).values('metric').annotate(
+        total=Sum('value'),
+        before_month=Sum('value', filter=Q(date__lt=today.replace(day=1))),
+        week=Sum('value', filter=Q(date__gte=today - timedelta(days=7))),
+        today=Sum('value', filter=Q(date=today)),
+    )
+    counts = {
+        metric: dict.fromkeys(['total', 'before_month', 'week', 'today'], 0)
+        for metric in DASHBOARD_METRICS if metric in counted_models()
+    }
+    for row in rows:
+        if row['metric'] in counts:
+            counts[row.pop('metric')] = {key: value or 0 for key, value in row.items()}
+    return counts
+
+
+def compute_dashboard_stats(today=None):
+    today = today or local_date()
+    if settings.ADMIN_DAILY_COUNTERS_ENABLED:
+        counts = _counts_from_daily_counters(today)
+    else:
+        counts = _counts_from_tables(today)
+    conversations = counts.get('conversations', {'total': 0, 'before_month': 0})
+
+    recent_users = User.objects.filter(
+        last_login__isnull=False
+    ).only('email', 'last_login').order_by('-last_login')[:5]
+
+    return {
+        'total_users': counts['users']['total'],
+        'total_meal_plans': counts['meal_plans']['total'],
+        'registers_today': counts['registers']['today'],
+        'total_conversations': conversations['total'],
+        'users_change': calculate_percentage_change(counts['users']['total'], counts['users']['before_month']),
+        'meal_plans_change': calculate_percentage_change(
+            counts['meal_plans']['total'], counts['meal_plans']['before_month']
+        ),
+        'registers_change': calculate_percentage_change(
+            counts['registers']['today'], counts['registers']['before_month']
+        ),
+        'conversations_change': calculate_percentage_change(
+            conversations['total'], conversations['before_month']
+        ),
+        'recent_users': [
+            {
+                'email': user.email,
+                'last_login': user.last_login.strftime('%d/%m %H:%M') if user.last_login else 'Nunca'
+            } for user in recent_users
+        ],
+        'new_users_week': counts['users']['week'],
+        'meal_plans_today': counts['meal_plans']['today'],
+    }
+
+
+def dashboard_stats(today=None):
+    """Estadísticas del dashboard con caché corta; las altas y bajas la invalidan"""
+    today = today or local_date()
+    key = DASHBOARD_CACHE_KEY.format(day=today.isoformat())
+    stats = cache.get(key)
+    if stats is None:
+        stats = compute_dashboard_stats(today)
+        cache.set(key, stats, settings.ADMIN_STATS_CACHE_TTL_SECONDS)
+    return stats
+
+
+def invalidate_dashboard_stats():
+    cache.delete(DASHBOARD_CACHE_KEY.format(day=local_date().isoformat()))
+
+
+def add_to_daily_counter(metric, moment, delta):
+    """Suma delta al contador del día de moment (alta: +1, baja: -1)"""
+    day = local_date(moment, timezone.get_default_timezone())
+    updated = DailyCounter.objects.filter(metric=metric, date=day).update(value=F('value') + delta)
+    if not updated:
+        counter, created = DailyCounter.objects.get_or_create(
+            metric=metric, date=day, defaults={'value': delta}
+        )
+        if not created:
+            DailyCounter.objects.filter(pk=counter.pk).update(value=F('value') + delta)
+
+
+def record_activity(user_id, moment):
+    """Marca al usuario como activo en el día de moment (una fila por usuario y día)"""
+    day = local_date(moment, timezone.get_default_timezone())
+    # La caché evita ir a la base en cada acción del mismo usuario el mismo día
+    if not cache.add(ACTIVE_USER_CACHE_KEY.format(user_id=user_id, day=day.isoformat()), True, 24 * 3600):
+        return
+    _, created = DailyActiveUser.objects.get_or_create(user_id=user_id, date=day)
+    if created:
+        add_to_daily_counter('active_users', moment, 1)
+
+
+def _rebuild_active_users(tz, apps):
+    DailyActiveUser = apps.get_model('admin_panel', 'DailyActiveUser')
+    DailyCounter = apps.get_model('admin_panel', 'DailyCounter')
+    active = set()
+    for model, user_field, date_field, condition in activity_sources(apps):
+        rows = (
+            model.objects.filter(condition).order_by()
+            .annotate(day=TruncDate(date_field, tzinfo=tz))
+            .values_list(user_field, 'day')
+            .distinct()
+        )
+        active.update(rows.iterator(chunk_size=5000))
+
+    per_day = {}
+    for _, day in active:
+        per_day[day] = per_day.get(day, 0) + 1
+    return (
+        [DailyActiveUser(user_id=user_id, date=day) for user_id, day in active],
+        [DailyCounter(metric='active_users', date=day, value=value) for day, value in per_day.items()],
+    )
+
+
+def rebuild_daily_counters(apps=global_apps):
+    """
+    Recalcula todos los contadores desde las tablas (un GROUP BY por métrica).
+    La migración 0004 lo ejecuta con los modelos históricos para rellenar los
+    datos anteriores a los contadores.
+    """
+    DailyActiveUser = apps.get_model('admin_panel', 'DailyActiveUser')
+    DailyCounter = apps.get_model('admin_panel', 'DailyCounter')
+    tz = timezone.get_default_timezone()
+    counters = []
+    for metric, (model, field) in counted_models(apps).items():
+        rows = (
+            model.objects.order_by()
+            .annotate(day=TruncDate(field, tzinfo=tz))
+            .values('day')
+            .annotate(value=Count('pk'))
+        )
+        counters.extend(DailyCounter(metric=metric, date=row['day'], value=row['value']) for row in rows)
+
+    active_users, active_counters = _rebuild_active_users(tz, apps)
+    counters.extend(active_counters)
+
+    with transaction.atomic():
+        DailyCounter.objects.all().delete()
+        DailyCounter.objects.bulk_create(counters, batch_size=1000)
+        DailyActiveUser.objects.all().delete()
+        DailyActiveUser.objects.bulk_create(active_users, batch_size=1000)
+    invalidate_dashboard_stats()
+    return len(counters)
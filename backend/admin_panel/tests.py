@@ -1,3 +1,122 @@
+from datetime import date
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db.models import Sum
 from django.test import TestCase
+from rest_framework.test import APIClient
+
+from chatbot.models import Conversation, Message
+from MealPlan.models import MealPlan
+from registers.models import FoodRegister
+from .models import DailyActiveUser, DailyCounter
+from .search import rebuild_index, search_supported
+from .stats import invalidate_dashboard_stats, rebuild_daily_counters
+
+User = get_user_model()
+
+
+def seed_users(count, prefix='budget'):
+    """Usuarios con dos registros, un plan y una conversación cada uno"""
+    users = User.objects.bulk_create([
+        User(username=f'{prefix}_{i}', email=f'{prefix}_{i}@example.com', first_name='Budget', last_name=str(i))
+        for i in range(count)
+    ])
+    registers = FoodRegister.objects.bulk_create([
+        FoodRegister(user=user, image='food_images/check.jpg', description='Ensalada budget',
+                     ai_confidence=0.9, total_calories=400, total_protein=20, total_carbs=50, total_fat=10,
+                     estimated_weight=300, status='completed')
+        for user in users
+        for _ in range(2)
+    ])
+    MealPlan.objects.bulk_create([
+        MealPlan(user=user, start_date=date(2026, 1, 5), end_date=date(2026, 1, 11)) for user in users
+    ])
+    conversations = Conversation.objects.bulk_create([Conversation(user=user) for user in users])
+    Message.objects.bulk_create([
+        Message(conversation=conversation, role='user', content='Hola') for conversation in conversations
+    ])
+    return users, registers
+
+
+class AdminQueryCountTests(TestCase):
+    """Cada lista del panel hace un número constante de consultas por página"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='x', first_name='Admin', last_name='Budget',
+        )
+        seed_users(30)
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def assertQueries(self, expected, url, params=None):
+        with self.assertNumQueries(expected):
+            response = self.client.get(url, params or {})
+        self.assertEqual(response.status_code, 200, response.data)
+        return response
+
+    def test_users_list(self):
+        response = self.assertQueries(2, '/api/admin/users/', {'page_size': 50})
+        self.assertEqual(response.data['results'][0]['total_registers'], 2)
+
+    def test_meal_plans_list(self):
+        self.assertQueries(2, '/api/admin/meal-plans/', {'page_size': 50})
+
+    def test_registers_list(self):
+        self.assertQueries(2, '/api/admin/registers/', {'page_size': 100})
+
+    def test_conversations_list(self):
+        response = self.assertQueries(2, '/api/admin/conversations/', {'page_size': 50})
+        self.assertEqual(response.data['results'][0]['last_message'], 'Hola')
+
+    def test_dashboard_stats(self):
+        # bulk_create no emite señales: se invalida a mano para medir el cálculo
+        invalidate_dashboard_stats()
+        self.assertQueries(5, '/api/admin/dashboard-stats/')
+        self.assertQueries(0, '/api/admin/dashboard-stats/')
+
+    def test_search_lists(self):
+        if not search_supported():
+            self.skipTest("El motor no tiene índice de búsqueda")
+        rebuild_index('users')
+        rebuild_index('registers')
+        response = self.assertQueries(2, '/api/admin/users/', {'search': 'budget', 'page_size': 50})
+        self.assertEqual(response.data['count'], 31)  # Incluye al admin (apellido Budget)
+        response = self.assertQueries(2, '/api/admin/registers/', {'search': 'ensalada', 'page_size': 100})
+        self.assertEqual(response.data['count'], 60)
+
+    def test_analytics(self):
+        self.assertQueries(1, '/api/admin/analytics/')
+        self.assertQueries(2, '/api/admin/analytics/', {'interval': 'month'})
+
+
+class DailyCounterBackfillTests(TestCase):
+    def test_rebuild_counts_rows_created_without_signals(self):
+        seed_users(3)
+        rebuild_daily_counters()
+        totals = dict(DailyCounter.objects.values_list('metric').annotate(total=Sum('value')))
+        self.assertEqual(totals['users'], 3)
+        self.assertEqual(totals['registers'], 6)
+        self.assertEqual(totals['messages'], 3)
+        self.assertEqual(totals['active_users'], 3)
+        self.assertEqual(DailyActiveUser.objects.count(), 3)
+
+
+class AdminSearchFallbackTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_superuser(username='admin', email='admin@example.com', password='x')
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+        # bulk_create no emite señales: el índice queda vacío, como antes de llenarlo
+        seed_users(12)
 
-# Create your tests here.
+    def test_empty_index_falls_back_to_icontains(self):
+        response = self.client.get('/api/admin/users/', {'search': 'budget_1'})
+        self.assertEqual(response.data['count'], 3)
+        response = self.client.get('/api/admin/registers/', {'search': 'ensalada'})
+        self.assertEqual(response.data['count'], 24)
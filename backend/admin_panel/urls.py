@@ -3,6 +3,8 @@ from . import views
 
 urlpatterns = [
     path('dashboard-stats/', views.dashboard_stats, name='admin-dashboard-stats'),
+    path('analytics/', views.analytics, name='admin-analytics'),
+    path('analysis-cache-stats/', views.analysis_cache_stats, name='admin-analysis-cache-stats'),
     path('users/', views.users_list, name='admin-users-list'),
     path('users/<int:user_id>/', views.delete_user, name='admin-delete-user'),
     path('meal-plans/', views.meal_plans_list, name='admin-meal-plans-list'),
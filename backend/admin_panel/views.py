@@ -4,25 +4,75 @@ from rest_framework.decorators import api_view, permission_classes, action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from django.contrib.auth import get_user_model
-from django.db.models import Count, Q
+from django.db.models import Count, IntegerField, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce, Substr
 from django.utils import timezone
 from datetime import datetime, timedelta
 from registers.models import FoodRegister
+from registers.cache import AnalysisCache
 from MealPlan.models import MealPlan
 try:
-    from chatbot.models import Conversation
+    from chatbot.models import Conversation, Message
     CONVERSATION_AVAILABLE = True
 except ImportError:
     CONVERSATION_AVAILABLE = False
+from .analytics import time_series
+from .pagination import AdminPagination
+from .search import search_ids
+from .stats import dashboard_stats as dashboard_stats_data
 from .serializers import (
     AdminUserListSerializer, AdminRegisterListSerializer, DashboardStatsSerializer
 )
 
 User = get_user_model()
 
+# Caracteres del último mensaje que muestra la lista de conversaciones
+LAST_MESSAGE_PREVIEW_LENGTH = 120
+
 def is_admin_user(user):
     return user.is_authenticated and user.is_superuser
 
+def _count_subquery(model, field='user'):
+    """COUNT(*) agrupado por usuario como subconsulta correlacionada (0 si no hay filas)"""
+    counts = (
+        model.objects.filter(**{field: OuterRef('pk')})
+        .order_by()
+        .values(field)
+        .annotate(total=Count('pk'))
+        .values('total')
+    )
+    return Coalesce(Subquery(counts, output_field=IntegerField()), Value(0))
+
+def annotate_user_counts(queryset):
+    """Totales de registros, planes y conversaciones en la misma consulta de usuarios"""
+    return queryset.annotate(
+        total_registers=_count_subquery(FoodRegister),
+        total_meal_plans=_count_subquery(MealPlan),
+        total_conversations=(
+            _count_subquery(Conversation) if CONVERSATION_AVAILABLE else Value(0)
+        ),
+    )
+
+def _paginated_response(request, queryset, serialize, prepare=None, ranked_ids=None):
+    """
+    Pagina con AdminPagination y serializa solo las filas de la página.
+    Con ranked_ids (resultado de la búsqueda) se respeta el orden por relevancia.
+    """
+    try:
+        paginator = AdminPagination(request)
+        if ranked_ids is None:
+            rows = paginator.paginate(queryset, prepare)
+        else:
+            if queryset.query.where:
+                # Los demás filtros de la vista se aplican sobre los candidatos
+                allowed = set(queryset.filter(id__in=ranked_ids).values_list('id', flat=True))
+                ranked_ids = [pk for pk in ranked_ids if pk in allowed]
+            prepare = prepare or (lambda page: page)
+            rows = paginator.paginate_ranked(ranked_ids, lambda ids: prepare(queryset.filter(id__in=ids)))
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    return Response(paginator.response_data(serialize(rows)))
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def dashboard_stats(request):
@@ -30,62 +80,42 @@ def dashboard_stats(request):
         return Response({'error': 'No tienes permisos de administrador'}, 
                        status=status.HTTP_403_FORBIDDEN)
     
-    # Fechas para cálculos
-    today = timezone.now().date()
-    first_day_of_month = today.replace(day=1)
-    last_month = (first_day_of_month - timedelta(days=1)).replace(day=1)
-    week_ago = today - timedelta(days=7)
-    
-    # Estadísticas generales
-    total_users = User.objects.count()
-    total_meal_plans = MealPlan.objects.count()
-    registers_today = FoodRegister.objects.filter(created_at__date=today).count()
-    total_conversations = Conversation.objects.count() if CONVERSATION_AVAILABLE else 0
-    
-    # Estadísticas del mes pasado para comparar
-    users_last_month = User.objects.filter(date_joined__lt=first_day_of_month).count()
-    meal_plans_last_month = MealPlan.objects.filter(created_at__lt=first_day_of_month).count()
-    registers_last_month = FoodRegister.objects.filter(created_at__date__lt=first_day_of_month).count()
-    
-    # Calcular cambios porcentuales
-    users_change = calculate_percentage_change(total_users, users_last_month)
-    meal_plans_change = calculate_percentage_change(total_meal_plans, meal_plans_last_month)
-    registers_change = calculate_percentage_change(registers_today, registers_last_month)
-    
-    # Usuarios recientes
-    recent_users = User.objects.filter(
-        last_login__isnull=False
-    ).order_by('-last_login')[:5]
-    
-    # Estadísticas adicionales
-    new_users_week = User.objects.filter(date_joined__gte=week_ago).count()
-    meal_plans_today = MealPlan.objects.filter(created_at__date=today).count()
+    return Response(dashboard_stats_data())
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def analytics(request):
+    """Series temporales: ?interval=day|week|month&start=&end=&series=signups,registers,..."""
+    if not is_admin_user(request.user):
+        return Response({'error': 'No autorizado'}, status=status.HTTP_403_FORBIDDEN)
     
-    stats = {
-        'total_users': total_users,
-        'total_meal_plans': total_meal_plans,
-        'registers_today': registers_today,
-        'total_conversations': total_conversations,
-        'users_change': users_change,
-        'meal_plans_change': meal_plans_change,
-        'registers_change': registers_change,
-        'conversations_change': 0,  # Por ahora
-        'recent_users': [
-            {
-                'email': user.email,
-                'last_login': user.last_login.strftime('%d/%m %H:%M') if user.last_login else 'Nunca'
-            } for user in recent_users
-        ],
-        'new_users_week': new_users_week,
-        'meal_plans_today': meal_plans_today,
-    }
+    try:
+        dates = {}
+        for param in ('start', 'end'):
+            value = request.query_params.get(param)
+            if value:
+                try:
+                    dates[param] = datetime.strptime(value, '%Y-%m-%d').date()
+                except ValueError:
+                    raise ValueError(f"Fecha inválida en {param}, use YYYY-MM-DD")
+        series = request.query_params.get('series')
+        data = time_series(
+            series=[name.strip() for name in series.split(',') if name.strip()] if series else None,
+            interval=request.query_params.get('interval', 'day'),
+            **dates,
+        )
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
     
-    return Response(stats)
+    return Response(data)
 
-def calculate_percentage_change(current, previous):
-    if previous == 0:
-        return 100 if current > 0 else 0
-    return round(((current - previous) / previous) * 100, 1)
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def analysis_cache_stats(request):
+    if not is_admin_user(request.user):
+        return Response({'error': 'No autorizado'}, status=status.HTTP_403_FORBIDDEN)
+    
+    return Response(AnalysisCache.stats())
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
@@ -93,11 +123,12 @@ def users_list(request):
     if not is_admin_user(request.user):
         return Response({'error': 'No autorizado'}, status=status.HTTP_403_FORBIDDEN)
     
-    queryset = User.objects.all().order_by('-date_joined')
+    queryset = User.objects.all()
     
-    # Filtros
+    # Filtros: índice de texto completo, ordenado por relevancia
     search = request.query_params.get('search', None)
-    if search:
+    ranked_ids = search_ids('users', search) if search else None
+    if search and ranked_ids is None:
         queryset = queryset.filter(
             Q(username__icontains=search) |
             Q(email__icontains=search) |
@@ -105,24 +136,13 @@ def users_list(request):
             Q(last_name__icontains=search)
         )
     
-    # Paginación simple
-    page = int(request.query_params.get('page', 1))
-    page_size = int(request.query_params.get('page_size', 20))
-    start = (page - 1) * page_size
-    end = start + page_size
-    
-    users = queryset[start:end]
-    total = queryset.count()
-    
-    serializer = AdminUserListSerializer(users, many=True)
-    
-    return Response({
-        'results': serializer.data,
-        'count': total,
-        'page': page,
-        'page_size': page_size,
-        'total_pages': (total + page_size - 1) // page_size
-    })
+    # Los conteos se anotan solo en la página (el COUNT total no los necesita)
+    return _paginated_response(
+        request, queryset,
+        lambda users: AdminUserListSerializer(users, many=True).data,
+        prepare=annotate_user_counts,
+        ranked_ids=ranked_ids,
+    )
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
@@ -130,33 +150,29 @@ def meal_plans_list(request):
     if not is_admin_user(request.user):
         return Response({'error': 'No autorizado'}, status=status.HTTP_403_FORBIDDEN)
     
-    queryset = MealPlan.objects.all().order_by('-created_at')
-    
-    # Paginación
-    page = int(request.query_params.get('page', 1))
-    page_size = int(request.query_params.get('page_size', 20))
-    start = (page - 1) * page_size
-    end = start + page_size
+    queryset = MealPlan.objects.all()
     
-    meal_plans = queryset[start:end]
-    total = queryset.count()
+    def prepare(page):
+        # El JSON del plan no se devuelve: solo las columnas de la lista
+        return page.select_related('user').only(
+            'id', 'created_at', 'start_date', 'end_date', 'user__email'
+        )
     
     # Serializar manualmente
-    results = []
-    for plan in meal_plans:
-        results.append({
-            'id': plan.id,
-            'user_email': plan.user.email if plan.user else 'N/A',
-            'created_at': plan.created_at,
-            'start_date': plan.start_date,
-            'end_date': plan.end_date,
-            'days': (plan.end_date - plan.start_date).days + 1,
-        })
+    def serialize(meal_plans):
+        results = []
+        for plan in meal_plans:
+            results.append({
+                'id': plan.id,
+                'user_email': plan.user.email if plan.user else 'N/A',
+                'created_at': plan.created_at,
+                'start_date': plan.start_date,
+                'end_date': plan.end_date,
+                'days': (plan.end_date - plan.start_date).days + 1,
+            })
+        return results
     
-    return Response({
-        'results': results,
-        'count': total,
-    })
+    return _paginated_response(request, queryset, serialize, prepare=prepare)
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
@@ -164,35 +180,29 @@ def registers_list(request):
     if not is_admin_user(request.user):
         return Response({'error': 'No autorizado'}, status=status.HTTP_403_FORBIDDEN)
     
-    queryset = FoodRegister.objects.all().order_by('-created_at')
+    queryset = FoodRegister.objects.all()
     
     # Filtros
     user_id = request.query_params.get('user_id', None)
     if user_id:
         queryset = queryset.filter(user_id=user_id)
     
+    # Descripción, descripción de la IA y nombres de alimentos
     search = request.query_params.get('search', None)
-    if search:
+    ranked_ids = search_ids('registers', search) if search else None
+    if search and ranked_ids is None:
         queryset = queryset.filter(description__icontains=search)
     
-    # Paginación
-    page = int(request.query_params.get('page', 1))
-    page_size = int(request.query_params.get('page_size', 20))
-    start = (page - 1) * page_size
-    end = start + page_size
-    
-    registers = queryset[start:end]
-    total = queryset.count()
-    
-    serializer = AdminRegisterListSerializer(registers, many=True)
+    def prepare(page):
+        return page.select_related('user').only(
+            'id', 'ai_description', 'description', 'total_calories', 'total_protein', 'total_carbs',
+            'total_fat', 'estimated_weight', 'created_at', 'user__email',
+        )
     
-    return Response({
-        'results': serializer.data,
-        'count': total,
-        'page': page,
-        'page_size': page_size,
-        'total_pages': (total + page_size - 1) // page_size
-    })
+    return _paginated_response(
+        request, queryset, lambda registers: AdminRegisterListSerializer(registers, many=True).data,
+        prepare=prepare, ranked_ids=ranked_ids,
+    )
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
@@ -206,39 +216,35 @@ def conversations_list(request):
             'count': 0,
         })
     
-    try:
-        queryset = Conversation.objects.all().order_by('-created_at')
-        
-        # Paginación
-        page = int(request.query_params.get('page', 1))
-        page_size = int(request.query_params.get('page_size', 20))
-        start = (page - 1) * page_size
-        end = start + page_size
-        
-        conversations = queryset[start:end]
-        total = queryset.count()
-        
-        # Serializar manualmente
+    queryset = Conversation.objects.all()
+    
+    def prepare(page):
+        last_message = (
+            Message.objects.filter(conversation=OuterRef('pk'))
+            .order_by('-timestamp', '-id')
+            .annotate(preview=Substr('content', 1, LAST_MESSAGE_PREVIEW_LENGTH))
+            .values('preview')[:1]
+        )
+        return (
+            page.select_related('user')
+            .only('id', 'created_at', 'user__email')
+            .annotate(messages_count=Count('messages'), last_message=Subquery(last_message))
+        )
+    
+    # Serializar manualmente
+    def serialize(conversations):
         results = []
         for conv in conversations:
             results.append({
                 'id': conv.id,
                 'user_email': conv.user.email if conv.user else 'N/A',
                 'created_at': conv.created_at,
-                'messages_count': conv.messages.count() if hasattr(conv, 'messages') else 0,
-                'last_message': 'Ver conversación',  # Placeholder
+                'messages_count': conv.messages_count,
+                'last_message': conv.last_message or '',
             })
-        
-        return Response({
-            'results': results,
-            'count': total,
-        })
-    except Exception as e:
-        return Response({
-            'results': [],
-            'count': 0,
-            'error': str(e)
-        })
+        return results
+    
+    return _paginated_response(request, queryset, serialize, prepare=prepare)
 
 @api_view(['DELETE'])
 @permission_classes([IsAuthenticated])
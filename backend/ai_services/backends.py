@@ -0,0 +1,205 @@
+import hashlib
+import json
+import random
+import threading
+import time
+
+from django.conf import settings
+
+from .clients import get_client, model_slot
+
+_lock = threading.Lock()
+_backends = {}
+
+
+class ModelBackend:
+    """Interfaz común de los servicios que generan texto con un modelo"""
+
+    def generate(self, model, contents, config=None, task=None):
+        """Retorna el texto completo de la respuesta"""
+        raise NotImplementedError
+
+    def generate_stream(self, model, contents, config=None, task=None):
+        """Genera la respuesta en fragmentos de texto"""
+        raise NotImplementedError
+
+
+class GeminiBackend(ModelBackend):
+    """Backend real: cliente compartido de Gemini con límite por modelo"""
+
+    def __init__(self):
+        self.client = get_client()
+
+    def generate(self, model, contents, config=None, task=None):
+        with model_slot(model):
+            response = self.client.models.generate_content(
+                model=model,
+                contents=contents,
+                config=config,
+            )
+        return response.text
+
+    def generate_stream(self, model, contents, config=None, task=None):
+        # El cupo se mantiene durante todo el stream para respetar el límite por
+        # modelo; se libera al terminar, al fallar o al cerrar el generador
+        # (GeneratorExit). El plazo total acota a un consumidor lento.
+        deadline = time.monotonic() + settings.GEMINI_STREAM_TIMEOUT_SECONDS
+        with model_slot(model):
+            stream = self.client.models.generate_content_stream(
+                model=model,
+                contents=contents,
+                config=config,
+            )
+            try:
+                for chunk in stream:
+                    if time.monotonic() > deadline:
+                        raise TimeoutError(f"El stream del modelo {model} superó el tiempo máximo")
+                    if hasattr(chunk, 'text') and chunk.text:
+                        yield chunk.text
+            finally:
+                if hasattr(stream, 'close'):
+                    stream.close()
+
+
+def _prompt_text(contents):
+    """Extrae el texto de los contenidos (str, Part o Content de google-genai)"""
+    texts = []
+    for item in contents if isinstance(contents, (list, tuple)) else [contents]:
+        if isinstance(item, str):
+            texts.append(item)
+        elif getattr(item, 'parts', None):
+            texts.extend(part.text for part in item.parts if getattr(part, 'text', None))
+        elif getattr(item, 'text', None):
+            texts.append(item.text)
+    return '\n'.join(texts)
+
+
+class FakeBackend(ModelBackend):
+    """
+    Backend local para pruebas de carga: respuestas fijas que cumplen el
+    formato que esperan los servicios, con latencia y tasa de error configurables.
+    """
+
+    def __init__(self, latency_ms=None, jitter_ms=None, failure_rate=None, seed=None):
+        self.latency_ms = settings.AI_FAKE_LATENCY_MS if latency_ms is None else latency_ms
+        self.jitter_ms = settings.AI_FAKE_LATENCY_JITTER_MS if jitter_ms is None else jitter_ms
+        self.failure_rate = settings.AI_FAKE_FAILURE_RATE if failure_rate is None else failure_rate
+        self._random = random.Random(settings.AI_FAKE_SEED if seed is None else seed)
+        self._random_lock = threading.Lock()
+
+    def generate(self, model, contents, config=None, task=None):
+        self._simulate_call(model)
+        return self._respond(task, _prompt_text(contents))
+
+    def generate_stream(self, model, contents, config=None, task=None):
+        self._simulate_call(model)
+        text = self._respond(task, _prompt_text(contents))
+        for start in range(0, len(text), 64):
+            yield text[start:start + 64]
+
+    def _simulate_call(self, model):
+        with self._random_lock:
+            jitter = self._random.uniform(-self.jitter_ms, self.jitter_ms)
+            fails = self._random.random() < self.failure_rate
+        with model_slot(model):
+            time.sleep(max(0, self.latency_ms + jitter) / 1000)
+        if fails:
+            raise RuntimeError("Fallo simulado del backend fake")
+
+    def _respond(self, task, prompt):
+        if task == 'food_analysis':
+            return json.dumps(self._food_analysis(prompt))
+        if task == 'meal_plan':
+            return self._meal_plan(english='Breakfast:' in prompt)
+        return self._chat(prompt)
+
+    def _food_analysis(self, prompt):
+        # La misma entrada produce siempre la misma respuesta
+        seed = int(hashlib.sha256(prompt.encode('utf-8')).hexdigest()[:8], 16)
+        grams = 150 + seed % 200
+        calories = round(grams * 1.6, 1)
+        return {
+            'ai_description': "Plato de prueba generado por el backend fake",
+            'ai_confidence': 0.85,
+            'estimated_weight': grams,
+            'total_calories': calories,
+            'total_protein': round(grams * 0.12, 1),
+            'total_carbs': round(grams * 0.2, 1),
+            'total_fat': round(grams * 0.05, 1),
+            'total_fiber': 4.0,
+            'total_sugar': 3.0,
+            'total_sodium': 420,
+            'food_items': [
+                {
+                    'name': "Arroz blanco",
+                    'category': "Carbohidrato",
+                    'estimated_quantity': grams - 100,
+                    'quantity_unit': "gramos",
+                    'calories': round(calories - 165, 1),
+                    'protein': 3.0,
+                    'carbs': round(grams * 0.2, 1),
+                    'fat': 0.5,
+                    'fiber': 1.0,
+                    'sugar': 0,
+                    'sodium': 5,
+                    'confidence': 0.8,
+                },
+                {
+                    'name': "Pollo a la plancha",
+                    'category': "Proteína",
+                    'estimated_quantity': 100,
+                    'quantity_unit': "gramos",
+                    'calories': 165,
+                    'protein': 31.0,
+                    'carbs': 0,
+                    'fat': 3.6,
+                    'fiber': 0,
+                    'sugar': 0,
+                    'sodium': 74,
+                    'confidence': 0.9,
+                },
+            ],
+        }
+
+    def _meal_plan(self, english):
+        if english:
+            day, meals = 'Day', ('Breakfast', 'Lunch', 'Dinner')
+        else:
+            day, meals = 'Día', ('Desayuno', 'Almuerzo', 'Cena')
+        menu = ("Avena con fruta", "Pollo con arroz y ensalada", "Pescado con verduras")
+        return '\n\n'.join(
+            f"{day} {n}\n" + '\n'.join(f"{meal}: {dish}" for meal, dish in zip(meals, menu))
+            for n in range(1, 8)
+        )
+
+    def _chat(self, prompt):
+        if 'Agua recomendada' in prompt:
+            return "Agua recomendada: 2750ml"
+        if 'Recommended water' in prompt:
+            return "Recommended water: 2750ml"
+        if 'Proteína: 150g' in prompt:
+            return "Calorías: 2000\nProteína: 150g\nCarbohidratos: 250g\nGrasa: 67g"
+        if 'Protein: 150g' in prompt:
+            return "Calories: 2000\nProtein: 150g\nCarbohydrates: 250g\nFat: 67g"
+        return "Respuesta de prueba del backend fake: come variado y mantente hidratado."
+
+
+BACKENDS = {
+    'gemini': GeminiBackend,
+    'fake': FakeBackend,
+}
+
+
+def get_backend(name=None):
+    """Backend configurado en AI_BACKEND (una instancia por proceso)"""
+    name = name or settings.AI_BACKEND
+    backend = _backends.get(name)
+    if backend is None:
+        if name not in BACKENDS:
+            raise ValueError(f"AI_BACKEND desconocido: {name}")
+        with _lock:
+            backend = _backends.get(name)
+            if backend is None:
+                backend = BACKENDS[name]()
+                _backends[name] = backend
+    return backend
@@ -0,0 +1,72 @@
+import os
+import threading
+from contextlib import contextmanager
+
+import httpx
+from django.conf import settings
+from google import genai
+from google.genai import types
+
+_lock = threading.Lock()
+_clients = {}
+_slots = {}
+
+
+def get_client(api_key=None):
+    """
+    Cliente de Gemini compartido por todo el proceso.
+
+    Reutilizarlo mantiene vivas las conexiones HTTP (keep-alive) entre
+    solicitudes, así que solo la primera paga la configuración y el TLS.
+    """
+    api_key = api_key or os.environ.get('GEMINI_API_KEY')
+    if not api_key:
+        raise ValueError("GEMINI_API_KEY no configurado")
+
+    client = _clients.get(api_key)
+    if client is not None:
+        return client
+
+    with _lock:
+        client = _clients.get(api_key)
+        if client is None:
+            client = genai.Client(
+                api_key=api_key,
+                http_options=types.HttpOptions(
+                    timeout=settings.GEMINI_REQUEST_TIMEOUT_MS,
+                    client_args={
+                        'limits': httpx.Limits(
+                            max_connections=settings.GEMINI_MAX_CONNECTIONS,
+                            max_keepalive_connections=settings.GEMINI_MAX_CONNECTIONS,
+                        ),
+                    },
+                ),
+            )
+            _clients[api_key] = client
+    return client
+
+
+def _slot_for(model):
+    semaphore = _slots.get(model)
+    if semaphore is None:
+        with _lock:
+            semaphore = _slots.get(model)
+            if semaphore is None:
+                limit = settings.GEMINI_MODEL_CONCURRENCY.get(
+                    model, settings.GEMINI_MAX_CONCURRENCY
+                )
+                semaphore = threading.BoundedSemaphore(limit)
+                _slots[model] = semaphore
+    return semaphore
+
+
+@contextmanager
+def model_slot(model):
+    """Limita las llamadas simultáneas a un mismo modelo dentro del proceso"""
+    semaphore = _slot_for(model)
+    if not semaphore.acquire(timeout=settings.GEMINI_SLOT_TIMEOUT_SECONDS):
+        raise TimeoutError(f"Demasiadas solicitudes simultáneas al modelo {model}")
+    try:
+        yield
+    finally:
+        semaphore.release()
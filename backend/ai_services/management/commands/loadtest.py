@@ -0,0 +1,153 @@
+import io
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from django.core.management.base import BaseCommand, CommandError
+from PIL import Image
+
+ENDPOINTS = ('register', 'mealplan', 'chat')
+
+
+def percentile(samples, percent):
+    """Percentil por rango más cercano sobre una lista ya ordenada"""
+    if not samples:
+        return 0
+    rank = math.ceil(percent / 100 * len(samples))
+    return samples[max(0, rank - 1)]
+
+
+def _image_bytes(index, unique):
+    """JPEG pequeño; con unique cada solicitud usa otros colores y evita la caché"""
+    image = Image.new('RGB', (640, 480), (180, 120, 60))
+    if unique:
+        # Un píxel suelto se pierde al reducir la imagen: se pinta una franja entera
+        color = ((index * 37) % 256, (index * 91) % 256, (index * 53) % 256)
+        top = (index * 16) % 480
+        image.paste(color, (0, top, 640, top + 16))
+        image.paste((index // 256 % 256, index % 256, 200), (0, 0, 32, 32))
+    buffer = io.BytesIO()
+    image.save(buffer, format='JPEG', quality=90)
+    return buffer.getvalue()
+
+
+class Command(BaseCommand):
+    help = (
+        "Prueba de carga de crear registro, generar plan y chat contra un servidor en marcha. "
+        "Arranca el servidor con AI_BACKEND=fake para no llamar a Gemini."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--base-url', default='http://127.0.0.1:8000')
+        parser.add_argument('--email', help="Usuario con el que iniciar sesión")
+        parser.add_argument('--password')
+        parser.add_argument('--token', help="Token JWT de acceso (en lugar de email/contraseña)")
+        parser.add_argument('--endpoints', default=','.join(ENDPOINTS),
+                            help=f"Lista separada por comas: {', '.join(ENDPOINTS)}")
+        parser.add_argument('--concurrency', type=int, default=10)
+        parser.add_argument('--requests', type=int, default=50, help="Solicitudes por endpoint")
+        parser.add_argument('--timeout', type=float, default=120)
+        parser.add_argument('--wait-analysis', action='store_true',
+                            help="Medir crear registro hasta que el análisis termina (no solo el 202)")
+        parser.add_argument('--same-image', action='store_true',
+                            help="Enviar siempre la misma imagen (mide aciertos de caché)")
+
+    def handle(self, *args, **options):
+        endpoints = [e.strip() for e in options['endpoints'].split(',') if e.strip()]
+        unknown = set(endpoints) - set(ENDPOINTS)
+        if unknown:
+            raise CommandError(f"Endpoints desconocidos: {', '.join(sorted(unknown))}")
+
+        self.base_url = options['base_url'].rstrip('/')
+        self.timeout = options['timeout']
+        self.options = options
+        self.token = options['token'] or self._login(options['email'], options['password'])
+        self._local = threading.local()
+
+        self.stdout.write(
+            f"{'endpoint':<10}{'ok':>6}{'err':>6}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'req/s':>9}"
+        )
+        for endpoint in endpoints:
+            self._run(endpoint)
+
+    def _login(self, email, password):
+        if not email or not password:
+            raise CommandError("Usa --token o --email y --password")
+        response = requests.post(
+            f'{self.base_url}/api/auth/login/',
+            json={'email': email, 'password': password},
+            timeout=self.timeout,
+        )
+        if response.status_code != 200:
+            raise CommandError(f"Login fallido ({response.status_code}): {response.text[:200]}")
+        return response.json()['tokens']['access']
+
+    def _session(self):
+        # Una sesión por hilo para reutilizar conexiones sin compartir estado
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = requests.Session()
+            session.headers['Authorization'] = f'Bearer {self.token}'
+            self._local.session = session
+        return session
+
+    def _call(self, endpoint, index):
+        session = self._session()
+        start = time.perf_counter()
+        try:
+            if endpoint == 'register':
+                response = session.post(
+                    f'{self.base_url}/api/registers/create/',
+                    files={'image': (f'load_{index}.jpg', _image_bytes(index, not self.options['same_image']), 'image/jpeg')},
+                    data={'description': 'prueba de carga'},
+                    timeout=self.timeout,
+                )
+                ok = response.status_code in (201, 202)
+                if ok and self.options['wait_analysis']:
+                    ok = self._wait_analysis(session, response.json()['register']['id'])
+            elif endpoint == 'mealplan':
+                response = session.post(
+                    f'{self.base_url}/api/mealplan/generate/',
+                    json={'language': 'es'},
+                    timeout=self.timeout,
+                )
+                ok = response.status_code == 200
+            else:
+                response = session.post(
+                    f'{self.base_url}/api/chatbot/chat/',
+                    json={'message': 'genera mis metas nutricionales', 'language': 'es'},
+                    timeout=self.timeout,
+                )
+                ok = response.status_code == 200
+        except requests.RequestException:
+            ok = False
+        return ok, (time.perf_counter() - start) * 1000
+
+    def _wait_analysis(self, session, register_id):
+        deadline = time.monotonic() + self.timeout
+        while time.monotonic() < deadline:
+            response = session.get(f'{self.base_url}/api/registers/{register_id}/', timeout=self.timeout)
+            if response.status_code != 200:
+                return False
+            register_status = response.json()['status']
+            if register_status != 'analyzing':
+                return register_status == 'completed'
+            time.sleep(0.2)
+        return False
+
+    def _run(self, endpoint):
+        total = self.options['requests']
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.options['concurrency']) as executor:
+            outcomes = list(executor.map(lambda i: self._call(endpoint, i), range(total)))
+        wall = time.perf_counter() - started
+
+        latencies = sorted(ms for ok, ms in outcomes if ok)
+        errors = total - len(latencies)
+        self.stdout.write(
+            f"{endpoint:<10}{len(latencies):>6}{errors:>6}"
+            f"{percentile(latencies, 50):>10.0f}{percentile(latencies, 95):>10.0f}"
+            f"{percentile(latencies, 99):>10.0f}{len(latencies) / wall:>9.1f}"
+        )
@@ -0,0 +1,42 @@
+from django.test import SimpleTestCase, override_settings
+
+from .backends import GeminiBackend
+from .clients import _slot_for
+
+
+class _Chunk:
+    def __init__(self, text):
+        self.text = text
+
+
+class _Models:
+    def generate_content_stream(self, **kwargs):
+        for text in ('a', 'b', 'c'):
+            yield _Chunk(text)
+
+
+class _Client:
+    models = _Models()
+
+
+@override_settings(GEMINI_MODEL_CONCURRENCY={'stream-test': 1})
+class GeminiStreamSlotTests(SimpleTestCase):
+    def setUp(self):
+        self.backend = GeminiBackend.__new__(GeminiBackend)
+        self.backend.client = _Client()
+        self.slot = _slot_for('stream-test')
+
+    def test_slot_is_held_for_the_whole_stream(self):
+        stream = self.backend.generate_stream('stream-test', [])
+        self.assertEqual(next(stream), 'a')
+        self.assertFalse(self.slot.acquire(blocking=False))
+        self.assertEqual(list(stream), ['b', 'c'])
+        self.assertTrue(self.slot.acquire(blocking=False))
+        self.slot.release()
+
+    def test_closing_the_generator_releases_the_slot(self):
+        stream = self.backend.generate_stream('stream-test', [])
+        next(stream)
+        stream.close()
+        self.assertTrue(self.slot.acquire(blocking=False))
+        self.slot.release()
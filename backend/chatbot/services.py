@@ -1,17 +1,13 @@
-from google import genai
+from contextlib import closing
 from google.genai import types
+from ai_services.backends import get_backend
 from .models import Conversation, Message
-import os
 import json
 import re
 
 class ChatbotService:
     def __init__(self):
-        self.api_key = os.environ.get("GEMINI_API_KEY")
-        if not self.api_key:
-            raise Exception("GEMINI_API_KEY no encontrada")
-        
-        self.client = genai.Client(api_key=self.api_key)
+        self.backend = get_backend()
         self.model = "gemini-2.0-flash-exp"
         
     def get_user_context(self, user):
@@ -205,14 +201,16 @@ Usuario: {user_message}"""
                 max_output_tokens=2000,
             )
             
+            # closing() libera el cupo del modelo aunque la lectura se interrumpa
             response_text = ""
-            for chunk in self.client.models.generate_content_stream(
-                model=self.model,
-                contents=contents,
+            with closing(self.backend.generate_stream(
+                self.model,
+                contents,
                 config=config,
-            ):
-                if hasattr(chunk, 'text') and chunk.text:
-                    response_text += chunk.text
+                task='chat',
+            )) as stream:
+                for text in stream:
+                    response_text += text
             
             # Guardar según tipo de solicitud
             water_check = any(keyword in user_message.lower() for keyword in water_keywords)
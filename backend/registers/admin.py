@@ -1,5 +1,8 @@
 from django.contrib import admin
-from .models import FoodRegister, FoodItem
+from .models import FoodRegister, FoodItem, AnalysisJob, AnalysisCacheEntry, DailyNutritionRollup
 # Admin básico sin personalización
 admin.site.register(FoodRegister)
 admin.site.register(FoodItem)
+admin.site.register(AnalysisJob)
+admin.site.register(AnalysisCacheEntry)
+admin.site.register(DailyNutritionRollup)
@@ -0,0 +1,185 @@
+import hashlib
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+from PIL import Image
+
+from .models import AnalysisCacheEntry, AnalysisCacheStats
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_description(description):
+    """Normaliza la descripción para que variaciones triviales compartan caché"""
+    return ' '.join((description or '').lower().split())
+
+
+def perceptual_hash(image):
+    """dHash de 64 bits: tolera recompresiones y cambios menores de tamaño"""
+    small = image.convert('L').resize((9, 8), Image.Resampling.BOX)
+    pixels = list(small.getdata())
+    bits = 0
+    for row in range(8):
+        for col in range(8):
+            left = pixels[row * 9 + col]
+            right = pixels[row * 9 + col + 1]
+            bits = (bits << 1) | int(left > right)
+    return f'{bits:016x}'
+
+
+def color_signature(image):
+    """Color medio RGB de una cuadrícula 4x4 (96 caracteres hex)"""
+    small = image.convert('RGB').resize((4, 4), Image.Resampling.BOX)
+    return ''.join(f'{channel:02x}' for pixel in small.getdata() for channel in pixel)
+
+
+def hamming_distance(first, second):
+    return bin(int(first, 16) ^ int(second, 16)).count('1')
+
+
+def color_distance(first, second):
+    """Máxima diferencia por canal entre dos firmas de color"""
+    return max(
+        abs(int(first[i:i + 2], 16) - int(second[i:i + 2], 16))
+        for i in range(0, len(first), 2)
+    )
+
+
+def perceptually_similar(fingerprint, entry):
+    """Misma foto recodificada: dHash cercano y los mismos colores por zona"""
+    if not entry['color_signature'] or len(entry['color_signature']) != len(fingerprint['color_signature']):
+        return False
+    return (
+        hamming_distance(fingerprint['perceptual_hash'], entry['perceptual_hash'])
+        <= settings.ANALYSIS_CACHE_PERCEPTUAL_MAX_DISTANCE
+        and color_distance(fingerprint['color_signature'], entry['color_signature'])
+        <= settings.ANALYSIS_CACHE_COLOR_TOLERANCE
+    )
+
+
+class AnalysisCache:
+    """Caché persistente (en BD) de análisis de Gemini con TTL y desalojo LRU"""
+
+    def __init__(self, model_name):
+        self.model_name = model_name
+        self.enabled = settings.ANALYSIS_CACHE_ENABLED
+        self.ttl = timedelta(seconds=settings.ANALYSIS_CACHE_TTL_SECONDS)
+
+    def fingerprint(self, prepared, user_description=""):
+        """Calcula las claves de caché de una imagen ya preparada"""
+        content_hash = hashlib.sha256(prepared.data).hexdigest()
+        description = normalize_description(user_description)
+        key = hashlib.sha256(
+            f'{content_hash}|{description}|{self.model_name}'.encode('utf-8')
+        ).hexdigest()
+        return {
+            'key': key,
+            'content_hash': content_hash,
+            'perceptual_hash': perceptual_hash(prepared.image),
+            'color_signature': color_signature(prepared.image),
+            'description': description,
+        }
+
+    def _perceptual_match(self, fingerprint, fresh_since):
+        """
+        Misma foto recodificada: distinto SHA-256 pero dHash a poca distancia de
+        Hamming y colores parecidos. El dHash solo ve forma y brillo, así que sin
+        la comparación de color platos distintos con la misma silueta coincidirían.
+        """
+        candidates = AnalysisCacheEntry.objects.filter(
+            model_name=self.model_name,
+            description=fingerprint['description'],
+            created_at__gte=fresh_since
+        ).exclude(color_signature='').order_by('-last_used_at').values(
+            'id', 'perceptual_hash', 'color_signature', 'result'
+        )[:settings.ANALYSIS_CACHE_PERCEPTUAL_CANDIDATES]
+        return next((entry for entry in candidates if perceptually_similar(fingerprint, entry)), None)
+
+    def get(self, fingerprint, allow_perceptual=True):
+        """
+        Retorna el resultado cacheado o None (no cuenta el acierto/fallo).
+        Con allow_perceptual=False solo vale la misma imagen byte a byte.
+        """
+        if not self.enabled:
+            return None
+
+        fresh_since = timezone.now() - self.ttl
+        entry = AnalysisCacheEntry.objects.filter(
+            key=fingerprint['key'],
+            created_at__gte=fresh_since
+        ).values('id', 'result').first()
+
+        if entry is None and allow_perceptual and settings.ANALYSIS_CACHE_PERCEPTUAL_MATCH:
+            entry = self._perceptual_match(fingerprint, fresh_since)
+
+        if entry is None:
+            return None
+
+        AnalysisCacheEntry.objects.filter(id=entry['id']).update(
+            hits=F('hits') + 1,
+            last_used_at=timezone.now()
+        )
+        return entry['result']
+
+    def set(self, fingerprint, result):
+        if not self.enabled:
+            return
+
+        AnalysisCacheEntry.objects.update_or_create(
+            key=fingerprint['key'],
+            defaults={
+                'content_hash': fingerprint['content_hash'],
+                'perceptual_hash': fingerprint['perceptual_hash'],
+                'color_signature': fingerprint['color_signature'],
+                'description': fingerprint['description'],
+                'model_name': self.model_name,
+                'result': result,
+                'created_at': timezone.now(),
+                'last_used_at': timezone.now(),
+            }
+        )
+
+    @staticmethod
+    def evict():
+        """
+        Elimina entradas vencidas y las menos usadas por encima del límite.
+        Recorre la tabla, así que no se llama en cada escritura: lo ejecuta
+        el worker de análisis cada ANALYSIS_CACHE_EVICT_INTERVAL_SECONDS.
+        """
+        ttl = timedelta(seconds=settings.ANALYSIS_CACHE_TTL_SECONDS)
+        AnalysisCacheEntry.objects.filter(
+            created_at__lt=timezone.now() - ttl
+        ).delete()
+
+        excess = AnalysisCacheEntry.objects.count() - settings.ANALYSIS_CACHE_MAX_ENTRIES
+        if excess > 0:
+            oldest = AnalysisCacheEntry.objects.order_by('last_used_at').values_list('id', flat=True)[:excess]
+            AnalysisCacheEntry.objects.filter(id__in=list(oldest)).delete()
+
+    @staticmethod
+    def record_hit():
+        AnalysisCacheStats.objects.get_or_create(pk=1)
+        AnalysisCacheStats.objects.filter(pk=1).update(hits=F('hits') + 1)
+
+    @staticmethod
+    def record_miss():
+        AnalysisCacheStats.objects.get_or_create(pk=1)
+        AnalysisCacheStats.objects.filter(pk=1).update(misses=F('misses') + 1)
+
+    @staticmethod
+    def stats():
+        """Contadores acumulados para medir las llamadas a Gemini ahorradas"""
+        counters = AnalysisCacheStats.objects.filter(pk=1).first()
+        hits = counters.hits if counters else 0
+        misses = counters.misses if counters else 0
+        lookups = hits + misses
+        return {
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': round(hits / lookups * 100, 1) if lookups else 0,
+            'entries': AnalysisCacheEntry.objects.count(),
+            'saved_model_calls': hits,
+        }
@@ -0,0 +1,146 @@
+import hashlib
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.dateparse import parse_date
+from rest_framework.filters import BaseFilterBackend
+
+from .rollups import day_bounds, local_date, user_timezone
+
+
+def _parse(value):
+    try:
+        return parse_date(value) if value else None
+    except ValueError:
+        return None
+
+
+def filter_created_between(queryset, start_day=None, end_day=None, tz=None):
+    """
+    Filtra por días locales [start_day, end_day] como rango semiabierto de
+    datetimes sobre created_at (usa los índices; __date no puede).
+    """
+    if start_day:
+        queryset = queryset.filter(created_at__gte=day_bounds(start_day, tz)[0])
+    if end_day:
+        queryset = queryset.filter(created_at__lt=day_bounds(end_day, tz)[1])
+    return queryset
+
+
+def period_range(period, today):
+    """Días (inicio, fin) de un período predefinido; None si no se reconoce"""
+    if period == 'today':
+        return today, today
+    if period == 'yesterday':
+        yesterday = today - timedelta(days=1)
+        return yesterday, yesterday
+    if period == 'this_week':
+        return today - timedelta(days=today.weekday()), None
+    if period == 'last_week':
+        start_last_week = today - timedelta(days=today.weekday() + 7)
+        end_last_week = today - timedelta(days=today.weekday() + 1)
+        return start_last_week, end_last_week
+    if period == 'this_month':
+        return today.replace(day=1), None
+    if period == 'last_month':
+        # Último día del mes pasado y primer día de ese mes
+        end_last_month = today.replace(day=1) - timedelta(days=1)
+        return end_last_month.replace(day=1), end_last_month
+    return None
+
+
+def date_range(params, tz=None):
+    """
+    Combina date, start_date, end_date y period en un único rango semiabierto
+    [inicio, fin) de datetimes en la zona horaria dada. Cada extremo puede ser None.
+    """
+    today = local_date(tz=tz)
+    filter_date = _parse(params.get('date'))
+    period = params.get('period')
+
+    days = [
+        (filter_date, filter_date) if filter_date else None,
+        (_parse(params.get('start_date')), _parse(params.get('end_date'))),
+        period_range(period, today) if period else None,
+    ]
+
+    start = end = None
+    for start_day, end_day in filter(None, days):
+        if start_day:
+            bound = day_bounds(start_day, tz)[0]
+            start = bound if start is None else max(start, bound)
+        if end_day:
+            bound = day_bounds(end_day, tz)[1]
+            end = bound if end is None else min(end, bound)
+    return start, end
+
+
+def filter_registers_by_date(queryset, params, tz=None):
+    """Aplica los filtros de fecha de la API como un solo rango sobre created_at"""
+    start, end = date_range(params, tz)
+    if start is not None:
+        queryset = queryset.filter(created_at__gte=start)
+    if end is not None:
+        queryset = queryset.filter(created_at__lt=end)
+    return queryset
+
+
+def _version_key(user_id):
+    return f'registers:version:{user_id}'
+
+
+def registers_version(user_id):
+    """Versión de los registros del usuario; cambia con cada alta, edición o borrado"""
+    version = cache.get(_version_key(user_id))
+    if version is None:
+        # Un valor nuevo (y no 1) evita reutilizar respuestas si la clave se desaloja
+        version = time.time_ns()
+        cache.add(_version_key(user_id), version, None)
+        version = cache.get(_version_key(user_id), version)
+    return version
+
+
+def bump_registers_version(user_id):
+    """Invalida las respuestas cacheadas de los listados del usuario"""
+    cache.set(_version_key(user_id), time.time_ns(), None)
+
+
+class RegisterDateFilter(BaseFilterBackend):
+    """
+    Filtros date, start_date, end_date y period de los registros, evaluados en
+    la zona horaria del usuario como un único rango semiabierto.
+    """
+
+    def get_range(self, request):
+        return date_range(request.query_params, user_timezone(request.user))
+
+    def filter_queryset(self, request, queryset, view):
+        return filter_registers_by_date(queryset, request.query_params, user_timezone(request.user))
+
+    def cache_key(self, request, view):
+        """
+        Clave de caché de la respuesta si el rango ya terminó (ayer, semana o
+        mes pasado, fechas anteriores a hoy); None si aún puede cambiar o si
+        la caché no es compartida entre procesos (REGISTERS_LIST_CACHE_ENABLED).
+        """
+        if not settings.REGISTERS_LIST_CACHE_ENABLED:
+            return None
+        start, end = self.get_range(request)
+        tz = user_timezone(request.user)
+        if end is None or end > day_bounds(local_date(tz=tz), tz)[0]:
+            return None
+
+        params = '&'.join(
+            f'{name}={value}'
+            for name, values in sorted(request.query_params.lists())
+            for value in values
+        )
+        digest = hashlib.sha256(
+            f'{request.get_host()}|{start}|{end}|{params}'.encode('utf-8')
+        ).hexdigest()
+        return (
+            f'registers:list:{view.__class__.__name__}:{request.user.id}:'
+            f'{registers_version(request.user.id)}:{digest}'
+        )
@@ -0,0 +1,99 @@
+import io
+import os
+from collections import namedtuple
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+PreparedImage = namedtuple('PreparedImage', ['data', 'mime_type', 'image'])
+
+MIME_TYPES = {
+    'JPEG': 'image/jpeg',
+    'WEBP': 'image/webp',
+}
+
+
+def prepare_image(image_file, max_side=None, image_format=None, quality=None):
+    """
+    Decodifica la imagen a resolución reducida y la recodifica compacta.
+
+    En JPEG se usa draft mode para que el decodificador escale 1/2, 1/4 u 1/8
+    directamente, sin materializar nunca el bitmap completo en memoria.
+    """
+    max_side = max_side or settings.GEMINI_IMAGE_MAX_SIDE
+    image_format = (image_format or settings.GEMINI_IMAGE_FORMAT).upper()
+    quality = quality or settings.GEMINI_IMAGE_QUALITY
+    if image_format not in MIME_TYPES:
+        raise ValueError(f"Formato de imagen no soportado: {image_format}")
+
+    if hasattr(image_file, 'seek'):
+        image_file.seek(0)
+
+    with Image.open(image_file) as source:
+        # Debe llamarse antes de cargar los píxeles; no hace nada fuera de JPEG
+        source.draft('RGB', (max_side, max_side))
+        image = ImageOps.exif_transpose(source)
+
+    if image.mode != 'RGB':
+        image = image.convert('RGB')
+
+    # reducing_gap aplica reduce() entero antes del filtro fino
+    image.thumbnail((max_side, max_side), Image.Resampling.LANCZOS, reducing_gap=2.0)
+
+    buffer = io.BytesIO()
+    image.save(buffer, format=image_format, quality=quality, optimize=image_format == 'JPEG')
+
+    return PreparedImage(buffer.getvalue(), MIME_TYPES[image_format], image)
+
+
+def _encode_webp(image, quality):
+    buffer = io.BytesIO()
+    image.save(buffer, format='WEBP', quality=quality, method=4)
+    return buffer.getvalue()
+
+
+def render_derivatives(image_file):
+    """
+    Genera los derivados WEBP {'medium': bytes, 'thumbnail': bytes} decodificando
+    la imagen una sola vez: la miniatura se reduce a partir del tamaño medio.
+    """
+    quality = settings.IMAGE_DERIVATIVE_QUALITY
+    medium = prepare_image(image_file, settings.IMAGE_MEDIUM_MAX_SIDE, 'WEBP', quality)
+
+    thumbnail = medium.image.copy()
+    side = settings.IMAGE_THUMBNAIL_MAX_SIDE
+    thumbnail.thumbnail((side, side), Image.Resampling.LANCZOS, reducing_gap=2.0)
+
+    return {
+        'medium': medium.data,
+        'thumbnail': _encode_webp(thumbnail, quality),
+    }
+
+
+def save_derivatives(food_register, derivatives):
+    """Guarda los derivados en el almacenamiento y en el registro"""
+    stem = os.path.splitext(os.path.basename(food_register.image.name))[0]
+    # Al regenerar, los archivos anteriores se reemplazan en lugar de acumularse
+    for field in (food_register.image_medium, food_register.image_thumbnail):
+        if field:
+            field.delete(save=False)
+    food_register.image_medium.save(f'{stem}_medium.webp', ContentFile(derivatives['medium']), save=False)
+    food_register.image_thumbnail.save(f'{stem}_thumb.webp', ContentFile(derivatives['thumbnail']), save=False)
+    # update() no emite post_save: los derivados no cambian resúmenes, caché
+    # de listas ni índice de búsqueda
+    type(food_register).objects.filter(id=food_register.id).update(
+        image_medium=food_register.image_medium.name,
+        image_thumbnail=food_register.image_thumbnail.name,
+        updated_at=timezone.now(),
+    )
+
+
+def generate_image_derivatives(food_register):
+    """Crea la miniatura y el tamaño medio de la foto de un registro"""
+    # Se lee el archivo ya guardado (no el subido, que la vista puede seguir usando)
+    image = food_register.image
+    with image.storage.open(image.name, 'rb') as image_file:
+        derivatives = render_derivatives(image_file)
+    save_derivatives(food_register, derivatives)
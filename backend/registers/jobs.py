@@ -0,0 +1,212 @@
+import logging
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .cache import AnalysisCache
+from .imaging import generate_image_derivatives
+from .models import AnalysisJob, FoodRegister
+from .service import GeminiAnalyzer, save_analysis_result
+
+logger = logging.getLogger(__name__)
+
+
+def enqueue_analysis(food_register):
+    """Encola el análisis de un registro para que lo procese el worker"""
+    return AnalysisJob.objects.create(
+        food_register=food_register,
+        max_attempts=settings.ANALYSIS_MAX_ATTEMPTS,
+    )
+
+
+def enqueue_derivatives(food_register):
+    """Encola solo la miniatura y el tamaño medio (registro ya analizado)"""
+    return AnalysisJob.objects.create(food_register=food_register, task='derivatives', max_attempts=1)
+
+
+def _generate_derivatives(food_register):
+    """Miniatura y tamaño medio; un fallo no debe impedir el análisis"""
+    if food_register.image_thumbnail:
+        return True
+    try:
+        generate_image_derivatives(food_register)
+        return True
+    except Exception as e:
+        logger.warning(f"No se generaron derivados del registro {food_register.id}: {str(e)}")
+        return False
+
+
+def _stale(now):
+    """En ejecución con el lock vencido (el worker murió o se colgó)"""
+    stale = now - timedelta(seconds=settings.ANALYSIS_JOB_TIMEOUT_SECONDS)
+    return Q(status='running', locked_at__lt=stale)
+
+
+def _claimable(now):
+    """Trabajos pendientes listos o vencidos que aún tienen intentos"""
+    return (
+        Q(status='pending', run_after__lte=now) |
+        (_stale(now) & Q(attempts__lt=F('max_attempts')))
+    )
+
+
+def _fail_register(food_register_id, reason):
+    FoodRegister.objects.filter(id=food_register_id).update(
+        status='failed',
+        ai_description=f'Error: {reason}',
+        failure_reason=reason,
+        updated_at=timezone.now(),
+    )
+
+
+def fail_exhausted_jobs(now=None):
+    """
+    Marca como fallidos los trabajos vencidos sin intentos restantes, para que
+    un trabajo que tumba o cuelga al worker no se reclame indefinidamente.
+    """
+    now = now or timezone.now()
+    reason = 'El análisis superó el tiempo límite en todos los intentos'
+    exhausted = list(
+        AnalysisJob.objects.filter(_stale(now), attempts__gte=F('max_attempts'))
+        .values_list('id', 'food_register_id', 'task')
+    )
+    for job_id, food_register_id, task in exhausted:
+        failed = AnalysisJob.objects.filter(_stale(now), id=job_id).update(
+            status='failed', last_error=reason, updated_at=now,
+        )
+        if failed and task == 'analysis':
+            logger.warning(f"Análisis fallido (job {job_id}): {reason}")
+            _fail_register(food_register_id, reason)
+    return len(exhausted)
+
+
+def claim_next_job():
+    """Reclama atómicamente el siguiente trabajo disponible (o None)"""
+    now = timezone.now()
+    fail_exhausted_jobs(now)
+    candidates = list(
+        AnalysisJob.objects.filter(_claimable(now))
+        .order_by('run_after', 'id')
+        .values_list('id', flat=True)[:10]
+    )
+    for job_id in candidates:
+        # El UPDATE condicionado evita que dos workers tomen el mismo trabajo
+        claimed = AnalysisJob.objects.filter(_claimable(now), id=job_id).update(
+            status='running',
+            locked_at=now,
+            attempts=F('attempts') + 1,
+        )
+        if claimed:
+            return AnalysisJob.objects.select_related('food_register').get(id=job_id)
+    return None
+
+
+def run_job(job):
+    """Ejecuta un trabajo reclamado y programa reintentos con backoff exponencial"""
+    food_register = job.food_register
+    if job.task == 'derivatives':
+        generated = _generate_derivatives(food_register)
+        job.status = 'done' if generated else 'failed'
+        job.save(update_fields=['status', 'updated_at'])
+        return generated
+
+    # Los derivados salen de la foto guardada y no dependen del análisis
+    _generate_derivatives(food_register)
+    try:
+        analyzer = GeminiAnalyzer()
+        gemini_data = analyzer.analyze_food_image(
+            food_register.image,
+            food_register.description
+        )
+        with transaction.atomic():
+            save_analysis_result(food_register, gemini_data)
+            job.status = 'done'
+            job.last_error = ''
+            job.save(update_fields=['status', 'last_error', 'updated_at'])
+        return True
+
+    except Exception as e:
+        reason = str(e)
+        logger.warning(f"Análisis fallido (job {job.id}, intento {job.attempts}): {reason}")
+        job.last_error = reason
+
+        if job.attempts < job.max_attempts:
+            delay = settings.ANALYSIS_RETRY_BACKOFF_SECONDS * (2 ** (job.attempts - 1))
+            job.status = 'pending'
+            job.run_after = timezone.now() + timedelta(seconds=delay)
+            job.save(update_fields=['status', 'run_after', 'last_error', 'updated_at'])
+            return False
+
+        job.status = 'failed'
+        job.save(update_fields=['status', 'last_error', 'updated_at'])
+        _fail_register(food_register.id, reason)
+        return False
+
+
+class AnalysisWorkerPool:
+    """Pool local de hilos que consume la cola de análisis guardada en la BD"""
+
+    def __init__(self, concurrency=None, poll_interval=None):
+        self.concurrency = concurrency or settings.ANALYSIS_WORKER_CONCURRENCY
+        self.poll_interval = poll_interval or settings.ANALYSIS_WORKER_POLL_INTERVAL
+        self._stop = threading.Event()
+        self._threads = []
+        self._maintenance_lock = threading.Lock()
+        self._next_maintenance = 0
+
+    def start(self):
+        for i in range(self.concurrency):
+            thread = threading.Thread(
+                target=self._loop,
+                name=f'analysis-worker-{i}',
+                daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def maintain(self):
+        """Tareas periódicas (una vez por intervalo entre todos los hilos)"""
+        with self._maintenance_lock:
+            if time.monotonic() < self._next_maintenance:
+                return
+            self._next_maintenance = time.monotonic() + settings.ANALYSIS_CACHE_EVICT_INTERVAL_SECONDS
+        try:
+            AnalysisCache.evict()
+        except Exception as e:
+            logger.error(f"Error depurando la caché de análisis: {str(e)}")
+
+    def run_once(self):
+        """Procesa los trabajos disponibles y retorna cuántos se ejecutaron"""
+        self.maintain()
+        processed = 0
+        while True:
+            job = claim_next_job()
+            if job is None:
+                return processed
+            run_job(job)
+            processed += 1
+
+    def _loop(self):
+        while not self._stop.is_set():
+            close_old_connections()
+            try:
+                self.maintain()
+                job = claim_next_job()
+                if job is not None:
+                    run_job(job)
+                    continue
+            except Exception as e:
+                logger.error(f"Error en el worker de análisis: {str(e)}")
+            finally:
+                close_old_connections()
+            self._stop.wait(self.poll_interval)
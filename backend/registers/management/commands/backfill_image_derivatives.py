@@ -0,0 +1,65 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from registers.imaging import render_derivatives, save_derivatives
+from registers.models import FoodRegister
+
+
+def _render(register_id, image_name):
+    """Corre en un proceso del pool: solo decodifica y codifica (sin BD)"""
+    try:
+        with default_storage.open(image_name, 'rb') as image_file:
+            return register_id, render_derivatives(image_file), None
+    except Exception as e:
+        return register_id, None, str(e)
+
+
+class Command(BaseCommand):
+    help = "Genera miniatura y tamaño medio WEBP de las fotos de registros existentes"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=multiprocessing.cpu_count())
+        parser.add_argument('--batch-size', type=int, default=200,
+                            help="Registros que se envían al pool en cada tanda")
+        parser.add_argument('--user', type=int, action='append', dest='users',
+                            help="ID de usuario (se puede repetir); por defecto todos")
+        parser.add_argument('--force', action='store_true',
+                            help="Regenerar aunque el registro ya tenga derivados")
+
+    def handle(self, *args, **options):
+        registers = FoodRegister.objects.exclude(image='').order_by('id')
+        if options['users']:
+            registers = registers.filter(user_id__in=options['users'])
+        if not options['force']:
+            registers = registers.filter(image_thumbnail='')
+
+        pending = list(registers.values_list('id', 'image'))
+        self.stdout.write(f"{len(pending)} registros sin derivados")
+
+        # Los procesos hijos no deben heredar conexiones abiertas
+        connections.close_all()
+        context = multiprocessing.get_context('fork')
+
+        done = failed = 0
+        with ProcessPoolExecutor(max_workers=options['workers'], mp_context=context) as pool:
+            for start in range(0, len(pending), options['batch_size']):
+                batch = pending[start:start + options['batch_size']]
+                futures = [pool.submit(_render, register_id, image) for register_id, image in batch]
+                registers_by_id = FoodRegister.objects.in_bulk([register_id for register_id, _ in batch])
+
+                for future in as_completed(futures):
+                    register_id, derivatives, error = future.result()
+                    if error:
+                        failed += 1
+                        self.stderr.write(f"Registro {register_id}: {error}")
+                        continue
+                    save_derivatives(registers_by_id[register_id], derivatives)
+                    done += 1
+
+                self.stdout.write(f"{done + failed}/{len(pending)}")
+
+        self.stdout.write(self.style.SUCCESS(f"{done} registros con derivados, {failed} fallidos"))
@@ -0,0 +1,27 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from registers.models import FoodRegister
+from registers.rollups import rebuild_user_rollups
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = "Reconstruye la tabla de resúmenes nutricionales diarios a partir de los registros"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, action='append', dest='users',
+                            help="ID de usuario (se puede repetir); por defecto todos")
+
+    def handle(self, *args, **options):
+        user_ids = options['users'] or (
+            FoodRegister.objects.values_list('user_id', flat=True).distinct().order_by('user_id')
+        )
+
+        users = days = 0
+        for user_id in user_ids:
+            days += rebuild_user_rollups(user_id)
+            users += 1
+
+        self.stdout.write(self.style.SUCCESS(f"{days} días reconstruidos para {users} usuarios"))
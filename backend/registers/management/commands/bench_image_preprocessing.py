@@ -0,0 +1,96 @@
+import io
+import multiprocessing
+import os
+import resource
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand
+from PIL import Image
+
+from registers.imaging import prepare_image
+
+
+def legacy_prepare(image_file):
+    """Ruta anterior de GeminiAnalyzer._prepare_image (decodificación completa)"""
+    image = Image.open(image_file)
+    if image.mode != 'RGB':
+        image = image.convert('RGB')
+    if image.width > 2048 or image.height > 2048:
+        image.thumbnail((2048, 2048), Image.Resampling.LANCZOS)
+    return image
+
+
+def _measure(method, path, max_side, image_format, queue):
+    """Corre en un proceso aparte para que el pico de RSS sea solo suyo"""
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    with open(path, 'rb') as image_file:
+        if method == 'legacy':
+            image = legacy_prepare(image_file)
+            image.load()
+            payload = len(image.tobytes())
+        else:
+            payload = len(prepare_image(image_file, max_side, image_format).data)
+    elapsed = time.perf_counter() - start
+    rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    queue.put((elapsed, max(0, rss_after - rss_before), payload))
+
+
+def _synthetic_image(directory, index, width, height):
+    """Foto sintética con ruido (comprime como una foto real, no como un color plano)"""
+    noise = Image.effect_noise((width // 4, height // 4), 64).resize((width, height))
+    image = Image.merge('RGB', (noise, noise.rotate(90, expand=False), noise.transpose(Image.Transpose.FLIP_LEFT_RIGHT)))
+    path = os.path.join(directory, f'synthetic_{index}.jpg')
+    exif = Image.Exif()
+    exif[0x0112] = 6  # Orientación: rotar 90°
+    image.save(path, format='JPEG', quality=92, exif=exif)
+    return path
+
+
+class Command(BaseCommand):
+    help = "Compara tiempo y pico de memoria del preprocesado de imágenes (anterior vs. draft mode)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('paths', nargs='*', help="Imágenes a procesar")
+        parser.add_argument('--synthetic', type=int, default=3,
+                            help="Imágenes sintéticas a generar si no se pasan rutas")
+        parser.add_argument('--size', default='4032x3024',
+                            help="Tamaño de las imágenes sintéticas (ancho x alto)")
+        parser.add_argument('--max-side', type=int, default=None)
+        parser.add_argument('--format', default=None, help="JPEG o WEBP")
+        parser.add_argument('--repeat', type=int, default=3)
+
+    def handle(self, *args, **options):
+        with tempfile.TemporaryDirectory() as directory:
+            paths = options['paths']
+            if not paths:
+                width, height = (int(v) for v in options['size'].lower().split('x'))
+                paths = [
+                    _synthetic_image(directory, i, width, height)
+                    for i in range(options['synthetic'])
+                ]
+
+            context = multiprocessing.get_context('fork')
+            results = {'legacy': [], 'draft': []}
+
+            for path in paths:
+                for method in results:
+                    for _ in range(options['repeat']):
+                        queue = context.Queue()
+                        process = context.Process(
+                            target=_measure,
+                            args=(method, path, options['max_side'], options['format'], queue)
+                        )
+                        process.start()
+                        results[method].append(queue.get())
+                        process.join()
+
+        self.stdout.write(f"{len(paths)} imágenes x {options['repeat']} repeticiones")
+        self.stdout.write(f"{'ruta':<8}{'ms/imagen':>12}{'pico RSS (MB)':>16}{'payload (KB)':>16}")
+        for method, samples in results.items():
+            elapsed = sum(s[0] for s in samples) / len(samples) * 1000
+            peak = max(s[1] for s in samples) / 1024
+            payload = sum(s[2] for s in samples) / len(samples) / 1024
+            self.stdout.write(f"{method:<8}{elapsed:>12.1f}{peak:>16.1f}{payload:>16.1f}")
+        self.stdout.write("El payload 'legacy' es el bitmap RGB que recibía el SDK antes de codificarlo.")
@@ -0,0 +1,148 @@
+import random
+import time
+import uuid
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Count, Sum
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from registers.models import FoodRegister
+from registers.rollups import (
+    TOTAL_FIELDS, daily_totals, day_bounds, rebuild_user_rollups, sum_daily_rows
+)
+from registers.views import period_summary
+
+User = get_user_model()
+
+
+class _Rollback(Exception):
+    pass
+
+
+def legacy_period(user, start, end):
+    """Ruta anterior: instancias completas agrupadas en un dict y un aggregate aparte"""
+    registers = FoodRegister.objects.filter(
+        user=user,
+        created_at__date__gte=start,
+        created_at__date__lte=end,
+        status='completed'
+    )
+    daily_data = {}
+    for register in registers:
+        day = register.created_at.date()
+        data = daily_data.setdefault(day, dict.fromkeys(['count', *TOTAL_FIELDS], 0))
+        for name, column in TOTAL_FIELDS.items():
+            data[name] += getattr(register, column) or 0
+        data['count'] += 1
+    totals = registers.aggregate(
+        count=Count('id'),
+        **{name: Sum(column) for name, column in TOTAL_FIELDS.items()}
+    )
+    return daily_data, totals
+
+
+def grouped_period(user, start, end):
+    """GROUP BY por día en la base de datos; totales sumados sobre las filas"""
+    start_at, _ = day_bounds(start)
+    _, end_at = day_bounds(end)
+    rows = list(daily_totals(
+        FoodRegister.objects.filter(
+            user=user,
+            status='completed',
+            created_at__gte=start_at,
+            created_at__lt=end_at
+        )
+    ))
+    return {row['day']: row for row in rows}, sum_daily_rows(rows)
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide consultas y latencia de period_summary con un usuario sintético "
+        "(los datos se crean en una transacción que se revierte al final). "
+        "La equivalencia y el número de consultas se prueban en registers.tests"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--registers', type=int, default=10000)
+        parser.add_argument('--days', type=int, default=365)
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self._run(options)
+                raise _Rollback()
+        except _Rollback:
+            pass
+
+    def _seed(self, user, registers, days):
+        now = timezone.now()
+        rng = random.Random(42)
+        objs = FoodRegister.objects.bulk_create([
+            FoodRegister(
+                user=user,
+                image='food_images/bench.jpg',
+                ai_confidence=0.9,
+                total_calories=rng.uniform(100, 900),
+                total_protein=rng.uniform(5, 60),
+                total_carbs=rng.uniform(10, 120),
+                total_fat=rng.uniform(2, 50),
+                total_fiber=rng.uniform(0, 10),
+                total_sugar=rng.uniform(0, 30),
+                total_sodium=rng.uniform(50, 1500),
+                estimated_weight=rng.uniform(100, 600),
+                status='completed',
+            )
+            for _ in range(registers)
+        ], batch_size=500)
+
+        # created_at es auto_now_add: se reparte en el período después de insertar
+        for index, register in enumerate(objs):
+            register.created_at = now - timedelta(days=index % days, minutes=index % 600)
+        FoodRegister.objects.bulk_update(objs, ['created_at'], batch_size=500)
+        rebuild_user_rollups(user.id)
+
+    def _measure(self, label, func, repeat):
+        timings = []
+        for _ in range(repeat):
+            with CaptureQueriesContext(connection) as queries:
+                start = time.perf_counter()
+                func()
+                timings.append((time.perf_counter() - start) * 1000)
+        timings.sort()
+        self.stdout.write(f"{label:<22}{len(queries):>10}{timings[len(timings) // 2]:>14.1f}{timings[0]:>12.1f}")
+
+    def _run(self, options):
+        user = User.objects.create_user(
+            username=f'bench_{uuid.uuid4().hex[:8]}',
+            email=f'bench_{uuid.uuid4().hex[:8]}@example.com',
+            password=uuid.uuid4().hex,
+        )
+        self.stdout.write(f"Creando {options['registers']} registros en {options['days']} días...")
+        self._seed(user, options['registers'], options['days'])
+
+        end = timezone.localdate()
+        start = end - timedelta(days=options['days'] - 1)
+
+        factory = APIRequestFactory()
+
+        def view():
+            request = factory.get('/api/registers/period-summary/', {
+                'period': 'custom',
+                'start_date': start.isoformat(),
+                'end_date': end.isoformat(),
+            })
+            force_authenticate(request, user=user)
+            response = period_summary(request)
+            assert response.status_code == 200, response.data
+
+        self.stdout.write(f"{'ruta':<22}{'consultas':>10}{'p50 ms':>14}{'min ms':>12}")
+        self._measure('anterior (instancias)', lambda: legacy_period(user, start, end), options['repeat'])
+        self._measure('GROUP BY por día', lambda: grouped_period(user, start, end), options['repeat'])
+        self._measure('endpoint (resúmenes)', view, options['repeat'])
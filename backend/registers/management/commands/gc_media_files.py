@@ -0,0 +1,98 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand
+
+from registers.filters import bump_registers_version
+from registers.models import FoodRegister
+from registers.storage import FILE_FIELDS, food_image_storage, referenced_names
+
+
+def _format_bytes(size):
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if size < 1024 or unit == 'GB':
+            return f'{size:.1f} {unit}'
+        size /= 1024
+
+
+class Command(BaseCommand):
+    help = (
+        "Elimina las fotos de registros que ya no referencia ningún registro y reporta "
+        "el espacio recuperado. Con --migrate-legacy pasa antes los archivos con nombre "
+        "uuid al almacenamiento por contenido (las copias idénticas quedan en una)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help="Solo reportar, no borrar")
+        parser.add_argument('--grace-hours', type=float, default=24,
+                            help="No borrar archivos más recientes (subidas en curso)")
+        parser.add_argument('--migrate-legacy', action='store_true')
+
+    def handle(self, *args, **options):
+        if options['migrate_legacy']:
+            self._migrate_legacy(options['dry_run'])
+
+        storage = food_image_storage
+        root = storage.path('food_images')
+        # Instantánea para descartar rápido los archivos en uso; cada candidato
+        # se vuelve a revisar bajo el lock del almacenamiento antes de borrarlo
+        referenced = referenced_names()
+        grace_seconds = options['grace_hours'] * 3600
+        cutoff = time.time() - grace_seconds
+
+        scanned = removed = reclaimed = kept_bytes = 0
+        for directory, _, filenames in os.walk(root):
+            for filename in filenames:
+                path = os.path.join(directory, filename)
+                name = os.path.relpath(path, storage.location).replace(os.sep, '/')
+                stat = os.stat(path)
+                scanned += 1
+
+                if name in referenced or stat.st_mtime > cutoff:
+                    kept_bytes += stat.st_size
+                    continue
+
+                if options['dry_run'] or storage.delete_if_unused(name, grace_seconds):
+                    removed += 1
+                    reclaimed += stat.st_size
+                else:
+                    kept_bytes += stat.st_size
+
+        verb = "se borrarían" if options['dry_run'] else "borrados"
+        self.stdout.write(f"{scanned} archivos revisados; en uso {_format_bytes(kept_bytes)}")
+        self.stdout.write(self.style.SUCCESS(
+            f"{removed} archivos huérfanos {verb}: {_format_bytes(reclaimed)} recuperados"
+        ))
+
+    def _migrate_legacy(self, dry_run):
+        """Renombra por hash los archivos anteriores y actualiza los registros que los usan"""
+        storage = food_image_storage
+        legacy = set()
+        for row in FoodRegister.objects.values_list(*FILE_FIELDS).iterator(chunk_size=2000):
+            legacy.update(name for name in row if name and not name.startswith(storage.prefix + '/'))
+
+        migrated = 0
+        users = set()
+        for name in sorted(legacy):
+            if not storage.exists(name):
+                self.stderr.write(f"No existe: {name}")
+                continue
+            if dry_run:
+                migrated += 1
+                continue
+
+            with storage.open(name, 'rb') as content:
+                new_name = storage.save(name, content)
+
+            for field in FILE_FIELDS:
+                registers = FoodRegister.objects.filter(**{field: name})
+                users.update(registers.values_list('user_id', flat=True))
+                # update() evita las señales: los totales no cambian
+                registers.update(**{field: new_name})
+            migrated += 1
+
+        # Las URLs cambian: invalida los listados cacheados
+        for user_id in users:
+            bump_registers_version(user_id)
+
+        self.stdout.write(f"{migrated} archivos migrados al almacenamiento por contenido")
@@ -0,0 +1,47 @@
+import signal
+import threading
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from registers.jobs import AnalysisWorkerPool
+
+
+class Command(BaseCommand):
+    help = "Procesa la cola de análisis de imágenes con un pool local de workers"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--concurrency', type=int, default=settings.ANALYSIS_WORKER_CONCURRENCY,
+            help="Número de hilos que analizan en paralelo"
+        )
+        parser.add_argument(
+            '--poll-interval', type=float, default=settings.ANALYSIS_WORKER_POLL_INTERVAL,
+            help="Segundos de espera cuando la cola está vacía"
+        )
+        parser.add_argument(
+            '--once', action='store_true',
+            help="Procesa los trabajos pendientes y termina"
+        )
+
+    def handle(self, *args, **options):
+        pool = AnalysisWorkerPool(
+            concurrency=options['concurrency'],
+            poll_interval=options['poll_interval'],
+        )
+
+        if options['once']:
+            processed = pool.run_once()
+            self.stdout.write(self.style.SUCCESS(f"{processed} trabajos procesados"))
+            return
+
+        stop = threading.Event()
+        signal.signal(signal.SIGTERM, lambda *_: stop.set())
+        signal.signal(signal.SIGINT, lambda *_: stop.set())
+
+        self.stdout.write(f"Worker de análisis iniciado con {pool.concurrency} hilos")
+        pool.start()
+        stop.wait()
+
+        self.stdout.write("Deteniendo worker de análisis...")
+        pool.stop(timeout=settings.ANALYSIS_JOB_TIMEOUT_SECONDS)
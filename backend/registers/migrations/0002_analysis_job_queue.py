@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:13
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('registers', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='foodregister',
+            name='failure_reason',
+            field=models.TextField(blank=True, help_text='Motivo del fallo cuando el análisis termina en error'),
+        ),
+        migrations.CreateModel(
+            name='AnalysisJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('pending', 'Pendiente'), ('running', 'En ejecución'), ('done', 'Terminado'), ('failed', 'Fallido')], default='pending', max_length=20)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('max_attempts', models.PositiveIntegerField(default=3)),
+                ('run_after', models.DateTimeField(default=django.utils.timezone.now, help_text='No se ejecuta antes de esta fecha (usado para el backoff)')),
+                ('locked_at', models.DateTimeField(blank=True, null=True)),
+                ('last_error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('food_register', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='analysis_jobs', to='registers.foodregister')),
+            ],
+            options={
+                'verbose_name': 'Trabajo de Análisis',
+                'verbose_name_plural': 'Trabajos de Análisis',
+                'ordering': ['run_after', 'id'],
+                'indexes': [models.Index(fields=['status', 'run_after'], name='registers_job_queue_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:15
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('registers', '0002_analysis_job_queue'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AnalysisCacheStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hits', models.PositiveBigIntegerField(default=0)),
+                ('misses', models.PositiveBigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Estadísticas de Caché',
+                'verbose_name_plural': 'Estadísticas de Caché',
+            },
+        ),
+        migrations.CreateModel(
+            name='AnalysisCacheEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(help_text='SHA-256 de (hash de contenido, descripción normalizada, modelo)', max_length=64, unique=True)),
+                ('content_hash', models.CharField(help_text='SHA-256 de la imagen preparada', max_length=64)),
+                ('perceptual_hash', models.CharField(help_text='dHash de 64 bits de la imagen', max_length=16)),
+                ('description', models.TextField(blank=True, help_text='Descripción del usuario normalizada')),
+                ('model_name', models.CharField(max_length=50)),
+                ('result', models.JSONField()),
+                ('hits', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('last_used_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'verbose_name': 'Análisis en Caché',
+                'verbose_name_plural': 'Análisis en Caché',
+                'indexes': [models.Index(fields=['perceptual_hash', 'model_name'], name='registers_cache_phash_idx'), models.Index(fields=['last_used_at'], name='registers_cache_lru_idx')],
+            },
+        ),
+    ]
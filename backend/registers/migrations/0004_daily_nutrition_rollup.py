@@ -0,0 +1,81 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:20
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+
+def backfill_rollups(apps, schema_editor):
+    FoodRegister = apps.get_model('registers', 'FoodRegister')
+    DailyNutritionRollup = apps.get_model('registers', 'DailyNutritionRollup')
+
+    rows = (
+        FoodRegister.objects
+        .filter(status='completed')
+        .annotate(day=TruncDate('created_at', tzinfo=timezone.get_current_timezone()))
+        .values('user_id', 'day')
+        .annotate(
+            count=Count('id'),
+            calories=Sum('total_calories'),
+            protein=Sum('total_protein'),
+            carbs=Sum('total_carbs'),
+            fat=Sum('total_fat'),
+            fiber=Sum('total_fiber'),
+            sugar=Sum('total_sugar'),
+            sodium=Sum('total_sodium'),
+        )
+        .order_by()
+    )
+    DailyNutritionRollup.objects.bulk_create([
+        DailyNutritionRollup(
+            user_id=row['user_id'],
+            date=row['day'],
+            count=row['count'],
+            calories=row['calories'] or 0,
+            protein=row['protein'] or 0,
+            carbs=row['carbs'] or 0,
+            fat=row['fat'] or 0,
+            fiber=row['fiber'] or 0,
+            sugar=row['sugar'] or 0,
+            sodium=row['sodium'] or 0,
+        )
+        for row in rows
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('registers', '0003_analysis_cache'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyNutritionRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(help_text='Día local del usuario')),
+                ('calories', models.FloatField(default=0)),
+                ('protein', models.FloatField(default=0)),
+                ('carbs', models.FloatField(default=0)),
+                ('fat', models.FloatField(default=0)),
+                ('fiber', models.FloatField(default=0)),
+                ('sugar', models.FloatField(default=0)),
+                ('sodium', models.FloatField(default=0)),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='nutrition_rollups', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Resumen Nutricional Diario',
+                'verbose_name_plural': 'Resúmenes Nutricionales Diarios',
+                'ordering': ['date'],
+                'constraints': [models.UniqueConstraint(fields=('user', 'date'), name='registers_rollup_user_date_uniq')],
+            },
+        ),
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
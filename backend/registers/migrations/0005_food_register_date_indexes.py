@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:23
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('registers', '0004_daily_nutrition_rollup'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='foodregister',
+            index=models.Index(fields=['user', 'created_at'], name='registers_user_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='foodregister',
+            index=models.Index(fields=['user', 'status', 'created_at'], name='registers_user_status_idx'),
+        ),
+    ]
@@ -0,0 +1,91 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:28
+
+from django.db import migrations, models
+
+
+DERIVED_FIELDS = [
+    'protein_percent', 'carbs_percent', 'fat_percent',
+    'protein_per_cal', 'carbs_per_cal', 'fat_per_cal',
+]
+
+
+def backfill_derived_fields(apps, schema_editor):
+    """Mismas fórmulas que FoodRegister/FoodItem.update_derived_fields"""
+    FoodRegister = apps.get_model('registers', 'FoodRegister')
+    FoodItem = apps.get_model('registers', 'FoodItem')
+
+    batch = []
+    registers = FoodRegister.objects.only(
+        'id', 'total_calories', 'total_protein', 'total_carbs', 'total_fat'
+    )
+    for register in registers.iterator(chunk_size=1000):
+        total_macros = register.total_protein + register.total_carbs + register.total_fat
+        for macro in ['protein', 'carbs', 'fat']:
+            value = getattr(register, f'total_{macro}')
+            setattr(register, f'{macro}_percent',
+                    round(value / total_macros * 100, 1) if total_macros > 0 else 0)
+            setattr(register, f'{macro}_per_cal',
+                    round(value / register.total_calories * 100, 2) if register.total_calories > 0 else 0)
+        batch.append(register)
+        if len(batch) == 1000:
+            FoodRegister.objects.bulk_update(batch, DERIVED_FIELDS)
+            batch = []
+    FoodRegister.objects.bulk_update(batch, DERIVED_FIELDS)
+
+    batch = []
+    items = FoodItem.objects.filter(quantity_unit='gramos', estimated_quantity__gt=0).only(
+        'id', 'calories', 'estimated_quantity'
+    )
+    for item in items.iterator(chunk_size=1000):
+        item.calories_per_100g = round((item.calories / item.estimated_quantity) * 100, 1)
+        batch.append(item)
+        if len(batch) == 1000:
+            FoodItem.objects.bulk_update(batch, ['calories_per_100g'])
+            batch = []
+    FoodItem.objects.bulk_update(batch, ['calories_per_100g'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('registers', '0005_food_register_date_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='fooditem',
+            name='calories_per_100g',
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='foodregister',
+            name='carbs_per_cal',
+            field=models.FloatField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='foodregister',
+            name='carbs_percent',
+            field=models.FloatField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='foodregister',
+            name='fat_per_cal',
+            field=models.FloatField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='foodregister',
+            name='fat_percent',
+            field=models.FloatField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='foodregister',
+            name='protein_per_cal',
+            field=models.FloatField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='foodregister',
+            name='protein_percent',
+            field=models.FloatField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_derived_fields, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:29
+
+import registers.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('registers', '0006_stored_nutrition_derivations'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='foodregister',
+            name='image_medium',
+            field=models.ImageField(blank=True, upload_to=registers.models.food_image_derivative_path),
+        ),
+        migrations.AddField(
+            model_name='foodregister',
+            name='image_thumbnail',
+            field=models.ImageField(blank=True, upload_to=registers.models.food_image_derivative_path),
+        ),
+    ]
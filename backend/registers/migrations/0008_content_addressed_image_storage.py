@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:31
+
+import registers.models
+import registers.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('registers', '0007_food_image_derivatives'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='foodregister',
+            name='image',
+            field=models.ImageField(storage=registers.storage.get_food_image_storage, upload_to=registers.models.food_image_upload_path),
+        ),
+        migrations.AlterField(
+            model_name='foodregister',
+            name='image_medium',
+            field=models.ImageField(blank=True, storage=registers.storage.get_food_image_storage, upload_to=registers.models.food_image_derivative_path),
+        ),
+        migrations.AlterField(
+            model_name='foodregister',
+            name='image_thumbnail',
+            field=models.ImageField(blank=True, storage=registers.storage.get_food_image_storage, upload_to=registers.models.food_image_derivative_path),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:33
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('registers', '0008_content_addressed_image_storage'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='foodregister',
+            index=models.Index(fields=['status', 'updated_at', 'id'], name='registers_status_updated_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('registers', '0009_food_register_export_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='analysiscacheentry',
+            name='color_signature',
+            field=models.CharField(blank=True, help_text='Color medio por zona (4x4) para validar coincidencias por dHash', max_length=96),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('registers', '0010_analysis_cache_color_signature'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='analysisjob',
+            name='task',
+            field=models.CharField(choices=[('analysis', 'Análisis y derivados de imagen'), ('derivatives', 'Solo derivados de imagen')], default='analysis', max_length=20),
+        ),
+    ]
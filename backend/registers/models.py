@@ -1,8 +1,10 @@
 from django.db import models
 from django.contrib.auth import get_user_model
 from django.core.validators import MinValueValidator, MaxValueValidator
+from django.utils import timezone
 import uuid
 import os
+from .storage import get_food_image_storage
 User = get_user_model()
 
 
@@ -11,11 +13,22 @@ def food_image_upload_path(instance, filename):
     filename = f"{uuid.uuid4()}.{ext}"
     return os.path.join('food_images', str(instance.user.id), filename)
 
+def food_image_derivative_path(instance, filename):
+    return os.path.join('food_images', str(instance.user.id), 'derivatives', filename)
+
 class FoodRegister(models.Model):
 
     objects = None
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='food_registers')
-    image = models.ImageField(upload_to=food_image_upload_path)
+    # Almacenamiento por contenido: el nombre final es el hash del archivo
+    image = models.ImageField(upload_to=food_image_upload_path, storage=get_food_image_storage)
+    # Versiones WEBP comprimidas de image (ver imaging.generate_image_derivatives)
+    image_thumbnail = models.ImageField(
+        upload_to=food_image_derivative_path, storage=get_food_image_storage, blank=True
+    )
+    image_medium = models.ImageField(
+        upload_to=food_image_derivative_path, storage=get_food_image_storage, blank=True
+    )
     description = models.TextField(
         max_length=500,
         blank=True,
@@ -89,6 +102,18 @@ class FoodRegister(models.Model):
         choices=STATUS_CHOICES,
         default='analyzing'
     )
+    failure_reason = models.TextField(
+        blank=True,
+        help_text="Motivo del fallo cuando el análisis termina en error"
+    )
+    
+    # Valores derivados de los totales, calculados al guardar (ver update_derived_fields)
+    protein_percent = models.FloatField(default=0, editable=False)
+    carbs_percent = models.FloatField(default=0, editable=False)
+    fat_percent = models.FloatField(default=0, editable=False)
+    protein_per_cal = models.FloatField(default=0, editable=False)
+    carbs_per_cal = models.FloatField(default=0, editable=False)
+    fat_per_cal = models.FloatField(default=0, editable=False)
     
 
     created_at = models.DateTimeField(auto_now_add=True)
@@ -98,32 +123,59 @@ class FoodRegister(models.Model):
         ordering = ['-created_at']
         verbose_name = "Registro de Comida"
         verbose_name_plural = "Registros de Comida"
+        indexes = [
+            # Listados y resúmenes: usuario + rango semiabierto de created_at
+            models.Index(fields=['user', 'created_at'], name='registers_user_created_idx'),
+            models.Index(fields=['user', 'status', 'created_at'], name='registers_user_status_idx'),
+            # Exportación externa incremental: orden (updated_at, id) de los completados
+            models.Index(fields=['status', 'updated_at', 'id'], name='registers_status_updated_idx'),
+        ]
     
     def __str__(self):
         return f"{self.user.email} - {self.created_at.strftime('%Y-%m-%d %H:%M')} - {self.total_calories:.0f} cal"
     
+    DERIVED_FIELDS = [
+        'protein_percent', 'carbs_percent', 'fat_percent',
+        'protein_per_cal', 'carbs_per_cal', 'fat_per_cal',
+    ]
+    DERIVED_FROM = ['total_calories', 'total_protein', 'total_carbs', 'total_fat']
+    
+    def update_derived_fields(self):
+        """Recalcula la distribución de macros y la densidad nutricional"""
+        total_macros = self.total_protein + self.total_carbs + self.total_fat
+        for macro in ['protein', 'carbs', 'fat']:
+            value = getattr(self, f'total_{macro}')
+            setattr(self, f'{macro}_percent',
+                    round(value / total_macros * 100, 1) if total_macros > 0 else 0)
+            setattr(self, f'{macro}_per_cal',
+                    round(value / self.total_calories * 100, 2) if self.total_calories > 0 else 0)
+    
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None:
+            self.update_derived_fields()
+        elif set(update_fields) & set(self.DERIVED_FROM):
+            self.update_derived_fields()
+            kwargs['update_fields'] = {*update_fields, *self.DERIVED_FIELDS}
+        super().save(*args, **kwargs)
+    
     @property
     def nutrition_density(self):
-        """Calcula la densidad nutricional (nutrientes por caloría)"""
-        if self.total_calories > 0:
-            return {
-                'protein_per_cal': round(self.total_protein / self.total_calories * 100, 2),
-                'carbs_per_cal': round(self.total_carbs / self.total_calories * 100, 2),
-                'fat_per_cal': round(self.total_fat / self.total_calories * 100, 2),
-            }
-        return {'protein_per_cal': 0, 'carbs_per_cal': 0, 'fat_per_cal': 0}
+        """Densidad nutricional (nutrientes por caloría)"""
+        return {
+            'protein_per_cal': self.protein_per_cal,
+            'carbs_per_cal': self.carbs_per_cal,
+            'fat_per_cal': self.fat_per_cal,
+        }
     
     @property
     def macros_distribution(self):
-        """Calcula la distribución porcentual de macronutrientes"""
-        total_macros = self.total_protein + self.total_carbs + self.total_fat
-        if total_macros > 0:
-            return {
-                'protein_percent': round((self.total_protein / total_macros) * 100, 1),
-                'carbs_percent': round((self.total_carbs / total_macros) * 100, 1),
-                'fat_percent': round((self.total_fat / total_macros) * 100, 1),
-            }
-        return {'protein_percent': 0, 'carbs_percent': 0, 'fat_percent': 0}
+        """Distribución porcentual de macronutrientes"""
+        return {
+            'protein_percent': self.protein_percent,
+            'carbs_percent': self.carbs_percent,
+            'fat_percent': self.fat_percent,
+        }
     
     def get_nutrition_summary(self):
         """Retorna un resumen nutricional completo"""
@@ -187,6 +239,9 @@ class FoodItem(models.Model):
         help_text="Confianza del reconocimiento de este alimento específico"
     )
     
+    # Derivado al guardar; None si la cantidad no está en gramos
+    calories_per_100g = models.FloatField(null=True, blank=True, editable=False)
+    
     
     created_at = models.DateTimeField(auto_now_add=True)
     
@@ -198,9 +253,141 @@ class FoodItem(models.Model):
     def __str__(self):
         return f"{self.name} - {self.estimated_quantity}{self.quantity_unit} - {self.calories:.0f} cal"
     
-    @property
-    def calories_per_100g(self):
+    def update_derived_fields(self):
         """Calcula calorías por 100g para comparación"""
         if self.quantity_unit == "gramos" and self.estimated_quantity > 0:
-            return round((self.calories / self.estimated_quantity) * 100, 1)
-        return None
\ No newline at end of file
+            self.calories_per_100g = round((self.calories / self.estimated_quantity) * 100, 1)
+        else:
+            self.calories_per_100g = None
+    
+    def save(self, *args, **kwargs):
+        self.update_derived_fields()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = {*update_fields, 'calories_per_100g'}
+        super().save(*args, **kwargs)
+
+
+class AnalysisJob(models.Model):
+    """Trabajo de análisis en cola para un registro (procesado por el worker)"""
+
+    STATUS_CHOICES = [
+        ('pending', 'Pendiente'),
+        ('running', 'En ejecución'),
+        ('done', 'Terminado'),
+        ('failed', 'Fallido'),
+    ]
+
+    TASK_CHOICES = [
+        ('analysis', 'Análisis y derivados de imagen'),
+        ('derivatives', 'Solo derivados de imagen'),
+    ]
+
+    food_register = models.ForeignKey(
+        FoodRegister,
+        on_delete=models.CASCADE,
+        related_name='analysis_jobs'
+    )
+    task = models.CharField(max_length=20, choices=TASK_CHOICES, default='analysis')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=3)
+    run_after = models.DateTimeField(
+        default=timezone.now,
+        help_text="No se ejecuta antes de esta fecha (usado para el backoff)"
+    )
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['run_after', 'id']
+        indexes = [
+            models.Index(fields=['status', 'run_after'], name='registers_job_queue_idx'),
+        ]
+        verbose_name = "Trabajo de Análisis"
+        verbose_name_plural = "Trabajos de Análisis"
+
+    def __str__(self):
+        return f"Job {self.id} - registro {self.food_register_id} - {self.status}"
+
+
+class AnalysisCacheEntry(models.Model):
+    """Resultado de Gemini cacheado por imagen, descripción y modelo"""
+
+    key = models.CharField(
+        max_length=64,
+        unique=True,
+        help_text="SHA-256 de (hash de contenido, descripción normalizada, modelo)"
+    )
+    content_hash = models.CharField(max_length=64, help_text="SHA-256 de la imagen preparada")
+    perceptual_hash = models.CharField(max_length=16, help_text="dHash de 64 bits de la imagen")
+    color_signature = models.CharField(
+        max_length=96,
+        blank=True,
+        help_text="Color medio por zona (4x4) para validar coincidencias por dHash"
+    )
+    description = models.TextField(blank=True, help_text="Descripción del usuario normalizada")
+    model_name = models.CharField(max_length=50)
+    result = models.JSONField()
+    hits = models.PositiveIntegerField(default=0)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_used_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['perceptual_hash', 'model_name'], name='registers_cache_phash_idx'),
+            models.Index(fields=['last_used_at'], name='registers_cache_lru_idx'),
+        ]
+        verbose_name = "Análisis en Caché"
+        verbose_name_plural = "Análisis en Caché"
+
+    def __str__(self):
+        return f"{self.key[:12]} - {self.model_name} - {self.hits} hits"
+
+
+class AnalysisCacheStats(models.Model):
+    """Contadores globales de aciertos y fallos de la caché de análisis"""
+
+    hits = models.PositiveBigIntegerField(default=0)
+    misses = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Estadísticas de Caché"
+        verbose_name_plural = "Estadísticas de Caché"
+
+    def __str__(self):
+        return f"{self.hits} hits / {self.misses} misses"
+
+
+class DailyNutritionRollup(models.Model):
+    """Totales nutricionales por usuario y día local (solo registros completados)"""
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='nutrition_rollups')
+    date = models.DateField(help_text="Día local del usuario")
+
+    calories = models.FloatField(default=0)
+    protein = models.FloatField(default=0)
+    carbs = models.FloatField(default=0)
+    fat = models.FloatField(default=0)
+    fiber = models.FloatField(default=0)
+    sugar = models.FloatField(default=0)
+    sodium = models.FloatField(default=0)
+    count = models.PositiveIntegerField(default=0)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['date']
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'date'], name='registers_rollup_user_date_uniq'),
+        ]
+        verbose_name = "Resumen Nutricional Diario"
+        verbose_name_plural = "Resúmenes Nutricionales Diarios"
+
+    def __str__(self):
+        return f"{self.user_id} - {self.date} - {self.calories:.0f} cal"
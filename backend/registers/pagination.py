@@ -0,0 +1,12 @@
+from rest_framework.pagination import CursorPagination
+
+
+class FoodRegisterCursorPagination(CursorPagination):
+    """
+    Paginación por cursor sobre (created_at, id): cada página es un rango del
+    índice (user, created_at) y no un OFFSET que crece con la profundidad.
+    """
+    ordering = ('-created_at', '-id')
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
@@ -0,0 +1,119 @@
+from datetime import datetime, time, timedelta
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import DailyNutritionRollup, FoodRegister
+
+# Columna del registro -> columna del resumen diario
+TOTAL_FIELDS = {
+    'calories': 'total_calories',
+    'protein': 'total_protein',
+    'carbs': 'total_carbs',
+    'fat': 'total_fat',
+    'fiber': 'total_fiber',
+    'sugar': 'total_sugar',
+    'sodium': 'total_sodium',
+}
+
+
+def user_timezone(user):
+    """Zona horaria del usuario (la del servidor si no tiene o no es válida)"""
+    name = getattr(user, 'timezone', '')
+    if name:
+        try:
+            return ZoneInfo(name)
+        except (ZoneInfoNotFoundError, ValueError):
+            pass
+    return timezone.get_default_timezone()
+
+
+def local_date(value=None, tz=None):
+    """Día local al que pertenece un instante (por defecto, hoy)"""
+    return timezone.localdate(value, timezone=tz)
+
+
+def day_bounds(day, tz=None):
+    """Rango [inicio, fin) del día local como datetimes con zona horaria"""
+    tz = tz or timezone.get_current_timezone()
+    start = timezone.make_aware(datetime.combine(day, time.min), tz)
+    end = timezone.make_aware(datetime.combine(day + timedelta(days=1), time.min), tz)
+    return start, end
+
+
+def refresh_daily_rollup(user_id, day, tz=None):
+    """Recalcula el resumen de un usuario en un día (solo lee los registros de ese día)"""
+    start, end = day_bounds(day, tz)
+    totals = FoodRegister.objects.filter(
+        user_id=user_id,
+        status='completed',
+        created_at__gte=start,
+        created_at__lt=end,
+    ).aggregate(
+        count=Count('id'),
+        **{name: Sum(column) for name, column in TOTAL_FIELDS.items()}
+    )
+
+    if not totals['count']:
+        DailyNutritionRollup.objects.filter(user_id=user_id, date=day).delete()
+        return None
+
+    rollup, _ = DailyNutritionRollup.objects.update_or_create(
+        user_id=user_id,
+        date=day,
+        defaults={name: totals[name] or 0 for name in ['count', *TOTAL_FIELDS]},
+    )
+    return rollup
+
+
+def daily_totals(registers, tz=None):
+    """
+    Agrupa los registros por día local en la base de datos (GROUP BY sobre la
+    fecha truncada). Retorna filas {'day', 'count', 'calories', ...}.
+    """
+    return (
+        registers
+        .annotate(day=TruncDate('created_at', tzinfo=tz or timezone.get_current_timezone()))
+        .values('day')
+        .annotate(
+            count=Count('id'),
+            **{name: Sum(column) for name, column in TOTAL_FIELDS.items()}
+        )
+        .order_by('day')
+    )
+
+
+def sum_daily_rows(rows):
+    """Totales de un período a partir de sus filas diarias (sin otra consulta)"""
+    totals = dict.fromkeys(['count', *TOTAL_FIELDS], 0)
+    for row in rows:
+        for name in totals:
+            totals[name] += row[name] or 0
+    return totals
+
+
+def rebuild_user_rollups(user_id):
+    """Reconstruye todos los resúmenes de un usuario con una consulta agrupada"""
+    user = get_user_model().objects.only('timezone').get(id=user_id)
+    rows = daily_totals(
+        FoodRegister.objects.filter(user_id=user_id, status='completed'),
+        user_timezone(user)
+    )
+    rollups = [
+        DailyNutritionRollup(
+            user_id=user_id,
+            date=row['day'],
+            count=row['count'],
+            **{name: row[name] or 0 for name in TOTAL_FIELDS}
+        )
+        for row in rows
+    ]
+
+    with transaction.atomic():
+        DailyNutritionRollup.objects.filter(user_id=user_id).delete()
+        DailyNutritionRollup.objects.bulk_create(rollups)
+    return len(rollups)
@@ -30,18 +30,47 @@ class FoodRegisterSerializer(serializers.ModelSerializer):
     macros_distribution = serializers.ReadOnlyField()
     # Agregar esto para asegurar URL completa de imagen
     image_url = serializers.SerializerMethodField()
+    thumbnail_url = serializers.SerializerMethodField()
+    medium_url = serializers.SerializerMethodField()
+    
+    # Campos costosos que con fields= solo se incluyen si se piden en expand=
+    EXPANDABLE_FIELDS = ('food_items', 'nutrition_summary', 'macros_distribution')
     
     class Meta:
         model = FoodRegister
-        fields = '__all__'
+        exclude = ['image_thumbnail', 'image_medium']
     
-    def get_image_url(self, obj):
+    def __init__(self, *args, fields=None, expand=None, **kwargs):
+        """
+        fields: campos a incluir (None = todos); expand: campos de
+        EXPANDABLE_FIELDS que se agregan aunque no estén en fields.
+        """
+        super().__init__(*args, **kwargs)
+        if fields is None:
+            return
+        
+        allowed = set(fields) | (set(expand or ()) & set(self.EXPANDABLE_FIELDS))
+        for name in list(self.fields):
+            if name not in allowed:
+                self.fields.pop(name)
+    
+    def _absolute_url(self, image):
         request = self.context.get('request')
-        if obj.image and request:
-            return request.build_absolute_uri(obj.image.url)
-        elif obj.image:
-            return obj.image.url
+        if image and request:
+            return request.build_absolute_uri(image.url)
+        elif image:
+            return image.url
         return None
+    
+    def get_image_url(self, obj):
+        return self._absolute_url(obj.image)
+    
+    def get_thumbnail_url(self, obj):
+        """Miniatura WEBP; None si aún no se generó"""
+        return self._absolute_url(obj.image_thumbnail)
+    
+    def get_medium_url(self, obj):
+        return self._absolute_url(obj.image_medium)
 
 class FoodRegisterUpdateSerializer(serializers.ModelSerializer):
     class Meta:
@@ -1,52 +1,155 @@
-import google.generativeai as genai
 import os
 import json
 import logging
-from PIL import Image
+from django.db import transaction
+from google.genai import types
+from ai_services.backends import get_backend
+from .cache import AnalysisCache
+from .imaging import prepare_image
+from .models import FoodItem
 
 logger = logging.getLogger(__name__)
 
+REGISTER_TOTAL_FIELDS = [
+    'total_calories', 'total_protein', 'total_carbs', 'total_fat',
+    'total_fiber', 'total_sugar', 'total_sodium', 'estimated_weight',
+]
+ITEM_NUMERIC_FIELDS = [
+    'estimated_quantity', 'calories', 'protein', 'carbs', 'fat',
+    'fiber', 'sugar', 'sodium',
+]
+
+
+def _non_negative(value, field):
+    try:
+        number = float(value if value is not None else 0)
+    except (TypeError, ValueError):
+        raise ValueError(f"Campo {field} inválido: {value!r}")
+    return max(0.0, number)
+
+
+def validate_analysis_data(gemini_data):
+    """Valida y normaliza el resultado completo antes de escribir nada"""
+    if not isinstance(gemini_data, dict):
+        raise ValueError("Resultado de análisis inválido")
+    
+    for field in ['ai_description', 'ai_confidence', 'total_calories', 'food_items']:
+        if field not in gemini_data:
+            raise ValueError(f"Campo {field} faltante")
+    if not isinstance(gemini_data['food_items'], list):
+        raise ValueError("Campo food_items debe ser una lista")
+    
+    data = {
+        'ai_description': str(gemini_data['ai_description']),
+        'ai_confidence': min(1.0, _non_negative(gemini_data['ai_confidence'], 'ai_confidence')),
+    }
+    for field in REGISTER_TOTAL_FIELDS:
+        data[field] = _non_negative(gemini_data.get(field), field)
+    
+    items = []
+    for index, item_data in enumerate(gemini_data['food_items']):
+        if not isinstance(item_data, dict) or not item_data.get('name'):
+            raise ValueError(f"Alimento {index} sin nombre")
+        item = {
+            'name': str(item_data['name'])[:200],
+            'category': str(item_data.get('category') or 'Otro')[:100],
+            'quantity_unit': str(item_data.get('quantity_unit') or 'gramos')[:20],
+            'confidence': min(1.0, _non_negative(item_data.get('confidence', 0.5), 'confidence')),
+        }
+        for field in ITEM_NUMERIC_FIELDS:
+            item[field] = _non_negative(item_data.get(field), field)
+        items.append(item)
+    
+    data['food_items'] = items
+    return data
+
+
+def save_analysis_result(food_register, gemini_data, **extra_fields):
+    """Escribe el registro y todos sus alimentos en una sola transacción"""
+    data = validate_analysis_data(gemini_data)
+    items = data.pop('food_items')
+    
+    fields = {**data, **extra_fields, 'status': 'completed', 'failure_reason': ''}
+    for field, value in fields.items():
+        setattr(food_register, field, value)
+    
+    with transaction.atomic():
+        food_register.save(update_fields=[*fields, 'updated_at'])
+        food_register.food_items.all().delete()
+        food_items = [FoodItem(food_register=food_register, **item) for item in items]
+        # bulk_create no llama a save(): los derivados se calculan aquí
+        for food_item in food_items:
+            food_item.update_derived_fields()
+        FoodItem.objects.bulk_create(food_items)
+    
+    return food_register
+
 class GeminiAnalyzer:
     """Servicio simple para analizar imágenes con Gemini"""
     
     def __init__(self):
-        api_key = os.getenv('GEMINI_API_KEY')
-        if not api_key:
-            raise ValueError("GEMINI_API_KEY no configurado")
-        
-        genai.configure(api_key=api_key)
-        self.model = genai.GenerativeModel('gemini-2.0-flash-exp')
+        self.backend = get_backend()
+        self.model_name = 'gemini-2.0-flash-exp'
+        self.cache = AnalysisCache(self.model_name)
     
-    def analyze_food_image(self, image_file, user_description=""):
+    def analyze_food_image(self, image_file, user_description="", use_cache=True):
         """Analiza imagen y retorna datos nutricionales"""
         try:
             # Preparar imagen
-            image = self._prepare_image(image_file)
+            prepared = self._prepare_image(image_file)
+            
+            # Buscar un análisis previo de la misma imagen
+            fingerprint = self.cache.fingerprint(prepared, user_description)
+            if use_cache:
+                cached = self.cache.get(fingerprint)
+                if cached is not None:
+                    self.cache.record_hit()
+                    return cached
+                self.cache.record_miss()
             
             # Crear prompt
             prompt = self._create_prompt(user_description)
             
             # Llamar a Gemini
-            response = self.model.generate_content([prompt, image])
+            response_text = self.backend.generate(
+                self.model_name,
+                [
+                    prompt,
+                    types.Part.from_bytes(data=prepared.data, mime_type=prepared.mime_type)
+                ],
+                task='food_analysis'
+            )
             
             # Procesar respuesta
-            return self._process_response(response.text)
+            data = self._process_response(response_text)
+            self.cache.set(fingerprint, data)
+            return data
             
         except Exception as e:
             logger.error(f"Error Gemini: {str(e)}")
             raise Exception(f"Error al analizar imagen: {str(e)}")
     
-    def _prepare_image(self, image_file):
-        """Prepara imagen para Gemini"""
-        image = Image.open(image_file)
-        if image.mode != 'RGB':
-            image = image.convert('RGB')
-        
-        # Redimensionar si es muy grande
-        if image.width > 2048 or image.height > 2048:
-            image.thumbnail((2048, 2048), Image.Resampling.LANCZOS)
+    def get_cached_analysis(self, image_file, user_description=""):
+        """Retorna el análisis cacheado de la imagen o None, sin llamar a Gemini"""
+        try:
+            prepared = self._prepare_image(image_file)
+            # Al crear solo se reutiliza la misma imagen exacta; las coincidencias
+            # perceptuales quedan para el worker
+            cached = self.cache.get(self.cache.fingerprint(prepared, user_description), allow_perceptual=False)
+        except Exception as e:
+            logger.warning(f"Error consultando caché de análisis: {str(e)}")
+            return None
+        finally:
+            if hasattr(image_file, 'seek'):
+                image_file.seek(0)
         
-        return image
+        if cached is not None:
+            self.cache.record_hit()
+        return cached
+    
+    def _prepare_image(self, image_file):
+        """Prepara imagen para Gemini (reducida y recodificada)"""
+        return prepare_image(image_file)
     
     def _create_prompt(self, user_description):
         """Crea el prompt para Gemini"""
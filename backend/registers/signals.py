@@ -0,0 +1,38 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import FoodRegister
+from .filters import bump_registers_version
+from .rollups import local_date, refresh_daily_rollup, user_timezone
+from .storage import FILE_FIELDS
+
+
+def _refresh(register):
+    tz = user_timezone(register.user)
+    refresh_daily_rollup(register.user_id, local_date(register.created_at, tz), tz)
+    bump_registers_version(register.user_id)
+
+
+@receiver(post_save, sender=FoodRegister)
+def update_rollup_on_save(sender, instance, **kwargs):
+    """Completar, editar o re-analizar un registro actualiza su resumen diario"""
+    _refresh(instance)
+
+
+@receiver(post_delete, sender=FoodRegister)
+def update_rollup_on_delete(sender, instance, **kwargs):
+    _refresh(instance)
+
+
+@receiver(post_delete, sender=FoodRegister)
+def delete_unused_files(sender, instance, **kwargs):
+    """Borra las fotos del registro que ningún otro registro comparte"""
+    files = [getattr(instance, field) for field in FILE_FIELDS if getattr(instance, field)]
+
+    def delete_files():
+        for file in files:
+            file.storage.delete(file.name)
+
+    # Solo si el borrado se confirma; el almacenamiento revisa las referencias
+    transaction.on_commit(delete_files)
@@ -0,0 +1,132 @@
+import hashlib
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: solo se serializa dentro del proceso
+    fcntl = None
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.db.models import Q
+
+# Campos de FoodRegister que guardan archivos en este almacenamiento
+FILE_FIELDS = ['image', 'image_thumbnail', 'image_medium']
+
+
+def content_hash(content):
+    """SHA-256 del archivo leyendo por bloques (deja el puntero al inicio)"""
+    digest = hashlib.sha256()
+    if hasattr(content, 'seek'):
+        content.seek(0)
+    for chunk in content.chunks() if hasattr(content, 'chunks') else iter(lambda: content.read(64 * 1024), b''):
+        digest.update(chunk)
+    if hasattr(content, 'seek'):
+        content.seek(0)
+    return digest.hexdigest()
+
+
+def references(name):
+    """Cantidad de registros que apuntan al archivo (en cualquiera de sus campos)"""
+    from .models import FoodRegister
+
+    query = Q()
+    for field in FILE_FIELDS:
+        query |= Q(**{field: name})
+    return FoodRegister.objects.filter(query).count()
+
+
+def referenced_names():
+    """Todos los archivos referenciados por algún registro"""
+    from .models import FoodRegister
+
+    names = set()
+    for row in FoodRegister.objects.values_list(*FILE_FIELDS).iterator(chunk_size=2000):
+        names.update(name for name in row if name)
+    return names
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    Nombra cada archivo por el hash de su contenido: la misma foto subida dos
+    veces (o por distintos usuarios) se guarda una sola vez. Un archivo solo
+    se borra cuando ningún registro lo referencia y no se escribió ni
+    reutilizó hace poco (una subida en curso aún no tiene su registro).
+    """
+
+    prefix = 'food_images/sha256'
+    lock_name = '.food_images.lock'
+
+    def __init__(self, **kwargs):
+        # El nombre depende solo del contenido: dos escrituras concurrentes del
+        # mismo archivo escriben los mismos bytes, así que se permite sobrescribir
+        kwargs.setdefault('allow_overwrite', True)
+        super().__init__(**kwargs)
+        self._thread_lock = threading.Lock()
+
+    @contextmanager
+    def _lock(self):
+        """Lock entre procesos (flock) que serializa reutilizar y borrar archivos"""
+        with self._thread_lock:
+            if fcntl is None:
+                yield
+                return
+            os.makedirs(self.location, exist_ok=True)
+            with open(self.path(self.lock_name), 'a') as handle:
+                fcntl.flock(handle, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(handle, fcntl.LOCK_UN)
+
+    def hashed_name(self, name, content):
+        digest = content_hash(content)
+        extension = os.path.splitext(name)[1].lower()
+        return f'{self.prefix}/{digest[:2]}/{digest[2:4]}/{digest}{extension}'
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+
+        name = self.hashed_name(name, content)
+        with self._lock():
+            if self.exists(name):
+                # Mismo contenido ya almacenado: se reutiliza y se renueva su
+                # fecha para que un borrado concurrente respete la gracia
+                os.utime(self.path(name))
+                return name
+        return super().save(name, content, max_length)
+
+    def delete(self, name):
+        if name:
+            self.delete_if_unused(name, settings.MEDIA_DELETE_GRACE_SECONDS)
+
+    def delete_if_unused(self, name, grace_seconds):
+        """
+        Borra el archivo si ningún registro lo referencia y lleva más de
+        grace_seconds sin escribirse. Referencias, fecha y borrado se revisan
+        bajo el mismo lock que save, así que una subida concurrente del mismo
+        contenido no pierde el archivo. Retorna True si se borró.
+        """
+        with self._lock():
+            try:
+                modified = os.path.getmtime(self.path(name))
+            except FileNotFoundError:
+                return False
+            if time.time() - modified < grace_seconds or references(name):
+                return False
+            super().delete(name)
+            return True
+
+
+food_image_storage = ContentAddressedStorage()
+
+
+def get_food_image_storage():
+    return food_image_storage
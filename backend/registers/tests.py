@@ -1,3 +1,397 @@
-from django.test import TestCase
+import io
+import os
+import re
+import tempfile
+import time
+from datetime import timedelta
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.db.models import Count, Sum
+from django.db.models.signals import post_save
+from django.http import QueryDict
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from PIL import Image, ImageDraw
+from rest_framework.test import APIClient
+
+from ExternalApi.export import filter_export
+from .cache import AnalysisCache
+from .filters import filter_created_between, filter_registers_by_date
+from .imaging import prepare_image
+from .jobs import AnalysisWorkerPool, claim_next_job
+from .models import AnalysisCacheEntry, AnalysisJob, DailyNutritionRollup, FoodItem, FoodRegister
+from .rollups import TOTAL_FIELDS, daily_totals, local_date, rebuild_user_rollups, sum_daily_rows
+from .storage import ContentAddressedStorage
+
+User = get_user_model()
+
+
+def create_register(user, **fields):
+    values = dict(
+        image='food_images/test.jpg', ai_confidence=0.9, total_calories=400, total_protein=20,
+        total_carbs=50, total_fat=10, estimated_weight=300, status='completed',
+    )
+    values.update(fields)
+    return FoodRegister.objects.create(user=user, **values)
+
+
+@override_settings(ANALYSIS_JOB_TIMEOUT_SECONDS=60)
+class AnalysisJobClaimTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='jobs', email='jobs@example.com', password='x')
+        self.register = create_register(self.user, status='analyzing')
+        self.stale_lock = timezone.now() - timedelta(seconds=120)
+
+    def test_stale_job_with_attempts_left_is_reclaimed(self):
+        job = AnalysisJob.objects.create(
+            food_register=self.register, status='running', attempts=1, max_attempts=3, locked_at=self.stale_lock,
+        )
+        claimed = claim_next_job()
+        self.assertEqual(claimed.id, job.id)
+        self.assertEqual(claimed.attempts, 2)
+
+    def test_stale_job_without_attempts_is_failed(self):
+        job = AnalysisJob.objects.create(
+            food_register=self.register, status='running', attempts=3, max_attempts=3, locked_at=self.stale_lock,
+        )
+        self.assertIsNone(claim_next_job())
+        job.refresh_from_db()
+        self.register.refresh_from_db()
+        self.assertEqual(job.status, 'failed')
+        self.assertEqual(self.register.status, 'failed')
+
+
+def circle_image(color, quality=90):
+    image = Image.new('RGB', (640, 480), (255, 255, 255))
+    ImageDraw.Draw(image).ellipse((170, 90, 470, 390), fill=color)
+    buffer = io.BytesIO()
+    image.save(buffer, format='JPEG', quality=quality)
+    buffer.seek(0)
+    return buffer
+
+
+@override_settings(ANALYSIS_CACHE_ENABLED=True, ANALYSIS_CACHE_PERCEPTUAL_MATCH=True)
+class AnalysisCachePerceptualTests(TestCase):
+    def setUp(self):
+        self.cache = AnalysisCache('test-model')
+        self.orange = self.cache.fingerprint(prepare_image(circle_image((240, 140, 30))))
+        self.cache.set(self.orange, {'total_calories': 62})
+
+    def test_recompressed_image_reuses_entry(self):
+        recompressed = self.cache.fingerprint(prepare_image(circle_image((240, 140, 30), quality=60)))
+        self.assertNotEqual(recompressed['key'], self.orange['key'])
+        self.assertEqual(self.cache.get(recompressed), {'total_calories': 62})
+        self.assertIsNone(self.cache.get(recompressed, allow_perceptual=False))
+
+    def test_same_shape_with_other_colors_does_not_match(self):
+        for color in [(40, 160, 60), (110, 70, 30)]:
+            fingerprint = self.cache.fingerprint(prepare_image(circle_image(color)))
+            self.assertIsNone(self.cache.get(fingerprint))
+
+    @override_settings(ANALYSIS_CACHE_PERCEPTUAL_MATCH=False)
+    def test_perceptual_match_can_be_disabled(self):
+        recompressed = self.cache.fingerprint(prepare_image(circle_image((240, 140, 30), quality=60)))
+        self.assertIsNone(self.cache.get(recompressed))
+
+
+@override_settings(ANALYSIS_CACHE_ENABLED=True, ANALYSIS_CACHE_MAX_ENTRIES=2)
+class AnalysisCacheEvictionTests(TestCase):
+    def test_set_does_not_evict_and_evict_trims_least_used(self):
+        cache = AnalysisCache('test-model')
+        fingerprints = [cache.fingerprint(prepare_image(circle_image((i * 60, 100, 100)))) for i in range(3)]
+        with CaptureQueriesContext(connection) as queries:
+            for fingerprint in fingerprints:
+                cache.set(fingerprint, {'total_calories': 1})
+        self.assertFalse([query for query in queries if 'COUNT(' in query['sql'] or 'DELETE' in query['sql']])
+        self.assertEqual(AnalysisCacheEntry.objects.count(), 3)
+
+        AnalysisCache.evict()
+        self.assertEqual(
+            set(AnalysisCacheEntry.objects.values_list('key', flat=True)),
+            {fingerprints[1]['key'], fingerprints[2]['key']},
+        )
+
+
+class RegisterListCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='lists', email='lists@example.com', password='x')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.day = (timezone.localdate() - timedelta(days=3)).isoformat()
+
+    def _list_ids(self):
+        response = self.client.get('/api/registers/', {'date': self.day})
+        return [row['id'] for row in response.data['results']]
+
+    def _move_to_day(self, register):
+        # update() no emite señales: simula un cambio hecho por otro proceso
+        FoodRegister.objects.filter(id=register.id).update(
+            created_at=timezone.now() - timedelta(days=3)
+        )
+
+    @override_settings(REGISTERS_LIST_CACHE_ENABLED=False)
+    def test_closed_period_is_not_cached_without_shared_cache(self):
+        register = create_register(self.user)
+        self.assertEqual(self._list_ids(), [])
+        self._move_to_day(register)
+        self.assertEqual(self._list_ids(), [register.id])
+
+    @override_settings(REGISTERS_LIST_CACHE_ENABLED=True)
+    def test_closed_period_is_cached_with_shared_cache(self):
+        register = create_register(self.user)
+        self.assertEqual(self._list_ids(), [])
+        self._move_to_day(register)
+        self.assertEqual(self._list_ids(), [])
+
+
+# Recorridos completos de la tabla según el motor
+FULL_SCAN = {
+    'sqlite': re.compile(r'\bSCAN (registers_foodregister|registers_dailynutritionrollup)\b(?! USING)'),
+    'postgresql': re.compile(r'Seq Scan on (registers_foodregister|registers_dailynutritionrollup)'),
+}
+
+
+class RegisterQueryPlanTests(TestCase):
+    """Las consultas por usuario y rango de fechas usan los índices compuestos (EXPLAIN)"""
+
+    def _plans(self, user_id):
+        today = local_date()
+        base = FoodRegister.objects.filter(user_id=user_id).order_by('-created_at', '-id')
+
+        def listing(**params):
+            query = QueryDict(mutable=True)
+            query.update(params)
+            return filter_registers_by_date(base, query)
+
+        completed = FoodRegister.objects.filter(user_id=user_id, status='completed')
+        return [
+            ('lista', listing(), 'registers_user_created_idx'),
+            ('lista ?date', listing(date=today.isoformat()), 'registers_user_created_idx'),
+            ('lista ?period=this_month', listing(period='this_month'), 'registers_user_created_idx'),
+            ('lista ?start_date&end_date', listing(start_date=today.replace(day=1).isoformat(),
+                                                  end_date=today.isoformat()), 'registers_user_created_idx'),
+            ('resumen del día (recalcular)', filter_created_between(completed, today, today),
+             'registers_user_status_idx'),
+            ('admin: registros de un usuario', FoodRegister.objects.filter(user_id=user_id).order_by('-created_at'),
+             'registers_user_created_idx'),
+            ('resumen de período', DailyNutritionRollup.objects.filter(
+                user_id=user_id, date__gte=today.replace(day=1), date__lte=today
+            ), None),  # Restricción única (user, date); SQLite la nombra sqlite_autoindex_*
+            ('externo: exportación incremental', filter_export(
+                FoodRegister.objects.filter(status='completed'), cursor=(timezone.now(), 0)
+            ), 'registers_status_updated_idx'),
+        ]
+
+    def test_register_queries_use_indexes(self):
+        if connection.vendor not in FULL_SCAN:
+            self.skipTest(f"Motor no soportado: {connection.vendor}")
+        if connection.vendor == 'postgresql':
+            # Con tablas pequeñas el planner prefiere Seq Scan; se fuerza a
+            # elegir índice para comprobar que existe uno utilizable
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL enable_seqscan = off')
+
+        for label, queryset, index in self._plans(user_id=1):
+            with self.subTest(label):
+                plan = queryset.explain()
+                self.assertNotRegex(plan, FULL_SCAN[connection.vendor])
+                if index:
+                    self.assertIn(index, plan)
+
+
+class RegisterQueryCountTests(TestCase):
+    """Los endpoints que listan registros hacen un número constante de consultas"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='counts', email='counts@example.com', password='x')
+        registers = FoodRegister.objects.bulk_create([
+            FoodRegister(
+                user=cls.user, image='food_images/check.jpg', ai_confidence=0.9, total_calories=400,
+                total_protein=20, total_carbs=50, total_fat=10, estimated_weight=300, status='completed',
+            )
+            for _ in range(30)
+        ])
+        FoodItem.objects.bulk_create([
+            FoodItem(
+                food_register=register, name=name, category='Prueba', estimated_quantity=100,
+                calories=200, protein=10, carbs=25, fat=5, confidence=0.9,
+            )
+            for register in registers
+            for name in ('Arroz', 'Pollo')
+        ])
+        cls.register = registers[0]
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def assertQueries(self, expected, url, params=None):
+        with self.assertNumQueries(expected):
+            response = self.client.get(url, params or {})
+            self.assertEqual(response.status_code, 200)
+            if response.streaming:
+                # Las consultas ocurren al transmitir el cuerpo
+                b''.join(response.streaming_content)
+
+    def test_list(self):
+        self.assertQueries(1, '/api/registers/')
+
+    def test_list_with_food_items(self):
+        self.assertQueries(2, '/api/registers/', {'expand': 'food_items'})
+        self.assertQueries(2, '/api/registers/', {'fields': 'id,food_items,nutrition_summary'})
+        self.assertQueries(2, '/api/registers/', {'period': 'this_month', 'expand': 'food_items,macros_distribution'})
+
+    def test_detail(self):
+        self.assertQueries(2, f'/api/registers/{self.register.id}/')
+
+    def test_external_export(self):
+        self.assertQueries(2, '/api/External/food_registers/')
+        self.assertQueries(2, '/api/External/food_registers/', {'export': 'csv'})
+
+
+class PeriodSummaryTests(TestCase):
+    """El GROUP BY por día coincide con sumar las instancias una por una"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='period', email='period@example.com', password='x')
+        registers = FoodRegister.objects.bulk_create([
+            FoodRegister(
+                user=cls.user, image='food_images/check.jpg', ai_confidence=0.9, total_calories=100 + i * 7.5,
+                total_protein=5 + i, total_carbs=20 + i % 9, total_fat=3 + i % 4, total_fiber=i % 3,
+                total_sugar=i % 5, total_sodium=50 * (i % 6), estimated_weight=300, status='completed',
+            )
+            for i in range(40)
+        ])
+        # created_at es auto_now_add: se reparte en el período después de insertar
+        now = timezone.now()
+        for index, register in enumerate(registers):
+            register.created_at = now - timedelta(days=index % 10, minutes=index * 37)
+        FoodRegister.objects.bulk_update(registers, ['created_at'])
+        rebuild_user_rollups(cls.user.id)
+        cls.end = timezone.localdate()
+        cls.start = cls.end - timedelta(days=13)
+
+    def registers(self):
+        return FoodRegister.objects.filter(user=self.user, status='completed')
+
+    def test_daily_totals_match_instances(self):
+        expected = {}
+        for register in self.registers():
+            day = expected.setdefault(local_date(register.created_at), dict.fromkeys(['count', *TOTAL_FIELDS], 0))
+            day['count'] += 1
+            for name, column in TOTAL_FIELDS.items():
+                day[name] += getattr(register, column) or 0
+
+        with self.assertNumQueries(1):
+            rows = list(daily_totals(self.registers()))
+        self.assertEqual([row['day'] for row in rows], sorted(expected))
+        for row in rows:
+            for name, value in expected[row['day']].items():
+                self.assertAlmostEqual(row[name], value, places=6)
+
+        totals = self.registers().aggregate(
+            count=Count('id'), **{name: Sum(column) for name, column in TOTAL_FIELDS.items()}
+        )
+        for name, value in sum_daily_rows(rows).items():
+            self.assertAlmostEqual(value, totals[name], places=6)
+
+    def test_endpoint_reads_rollups_in_one_query(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        params = {'period': 'custom', 'start_date': self.start.isoformat(), 'end_date': self.end.isoformat()}
+        with self.assertNumQueries(1):
+            response = client.get('/api/registers/period-summary/', params)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['daily_summary']), 14)
+        self.assertEqual(response.data['total_count'], 40)
+        calories = self.registers().aggregate(total=Sum('total_calories'))['total']
+        self.assertAlmostEqual(response.data['period_totals']['calories'], round(calories, 1))
+
+
+class ContentAddressedStorageTests(TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.storage = ContentAddressedStorage(location=self.directory.name)
+        self.name = self.storage.save('foto.jpg', ContentFile(b'misma foto'))
+        self._age(self.name)
+
+    def _age(self, name, seconds=7200):
+        old = time.time() - seconds
+        os.utime(self.storage.path(name), (old, old))
+
+    def test_reusing_a_file_renews_its_grace_period(self):
+        self.assertEqual(self.storage.save('otra.jpg', ContentFile(b'misma foto')), self.name)
+        self.assertFalse(self.storage.delete_if_unused(self.name, grace_seconds=3600))
+        self.assertTrue(self.storage.exists(self.name))
+
+    def test_unreferenced_old_file_is_deleted(self):
+        self.assertTrue(self.storage.delete_if_unused(self.name, grace_seconds=3600))
+        self.assertFalse(self.storage.exists(self.name))
+
+    def test_referenced_file_is_kept(self):
+        user = User.objects.create_user(username='storage', email='storage@example.com', password='x')
+        create_register(user, image=self.name)
+        self.assertFalse(self.storage.delete_if_unused(self.name, grace_seconds=3600))
+        self.assertTrue(self.storage.exists(self.name))
+
+
+class BatchCreateTests(TestCase):
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        overrides = override_settings(MEDIA_ROOT=media.name, AI_BACKEND='fake')
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        self.user = User.objects.create_user(username='batch', email='batch@example.com', password='x')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_batch_enqueues_one_job_per_valid_image(self):
+        images = [
+            SimpleUploadedFile(f'plato_{i}.jpg', circle_image(color).getvalue(), content_type='image/jpeg')
+            for i, color in enumerate([(240, 140, 30), (40, 160, 60)])
+        ]
+        images.append(SimpleUploadedFile('roto.jpg', b'no es una imagen', content_type='image/jpeg'))
+        response = self.client.post('/api/registers/batch-create/', {'images': images}, format='multipart')
+
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual((response.data['accepted'], response.data['rejected']), (2, 1))
+        register_ids = [result['register_id'] for result in response.data['results'] if result['success']]
+        self.assertEqual(
+            sorted(AnalysisJob.objects.values_list('food_register_id', flat=True)), sorted(register_ids)
+        )
+        self.assertIn('errors', response.data['results'][2])
+
+    def test_worker_generates_derivatives_without_save_signals(self):
+        image = SimpleUploadedFile('plato.jpg', circle_image((240, 140, 30)).getvalue(), content_type='image/jpeg')
+        response = self.client.post('/api/registers/create/', {'image': image}, format='multipart')
+        self.assertEqual(response.status_code, 202)
+        register = FoodRegister.objects.get(id=response.data['register']['id'])
+        self.assertFalse(register.image_thumbnail)
+
+        saves = []
+
+        def record_save(sender, instance, update_fields=None, **kwargs):
+            saves.append(update_fields)
+
+        post_save.connect(record_save, sender=FoodRegister)
+        self.addCleanup(post_save.disconnect, record_save, sender=FoodRegister)
+        AnalysisWorkerPool(concurrency=1).run_once()
+
+        register.refresh_from_db()
+        self.assertEqual(register.status, 'completed')
+        self.assertTrue(register.image_thumbnail)
+        self.assertTrue(register.image_medium)
+        # Solo el guardado del análisis emite la señal; los derivados usan update()
+        self.assertFalse(any(fields and 'image_thumbnail' in fields for fields in saves))
+        self.assertEqual(len(saves), 1)
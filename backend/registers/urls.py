@@ -6,6 +6,7 @@ app_name = 'registers'
 urlpatterns = [
     path('', views.FoodRegisterListView.as_view(), name='list'),
     path('create/', views.FoodRegisterCreateView.as_view(), name='create'),
+    path('batch-create/', views.batch_create_registers, name='batch-create'),
     path('<int:pk>/', views.FoodRegisterDetailView.as_view(), name='detail'),
     
     path('daily-summary/', views.daily_summary, name='daily-summary'),
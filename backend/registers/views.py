@@ -1,21 +1,72 @@
+import logging
+from django.conf import settings
 from django.shortcuts import render
 from rest_framework import status, generics, permissions
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
-from django.db.models import Sum, Count
+from django.core.cache import cache
+from django.db import transaction
 from datetime import datetime, date, timedelta
 from django.utils.dateparse import parse_date
-from .models import FoodRegister, FoodItem
+from .models import FoodRegister, DailyNutritionRollup
 from .serializers import (
     FoodRegisterCreateSerializer,
     FoodRegisterSerializer,
     FoodRegisterUpdateSerializer
 )
-from .service import GeminiAnalyzer
+from .service import GeminiAnalyzer, save_analysis_result
+from .jobs import enqueue_analysis, enqueue_derivatives
+from .filters import RegisterDateFilter
+from .pagination import FoodRegisterCursorPagination
+from .rollups import TOTAL_FIELDS, local_date, sum_daily_rows, user_timezone
 
 
+logger = logging.getLogger(__name__)
+
+def _cached_analysis(image, description):
+    """Análisis guardado de la misma foto (None si no hay o no hay Gemini)"""
+    try:
+        analyzer = GeminiAnalyzer()
+    except ValueError:
+        return None
+    return analyzer.get_cached_analysis(image, description)
+
+def _create_register(user, image, description):
+    """
+    Crea el registro en estado 'analyzing' y encola su análisis; si la misma
+    foto ya fue analizada se completa sin pasar por la cola. Los derivados de
+    la imagen los genera siempre el worker.
+    Retorna (registro, si quedó completo).
+    """
+    cached = _cached_analysis(image, description)
+    
+    with transaction.atomic():
+        # Crear registro inicial; el worker lo completa en segundo plano
+        food_register = FoodRegister.objects.create(
+            user=user,
+            image=image,
+            description=description,
+            status='analyzing',
+            # Valores temporales
+            ai_description='Analizando...',
+            ai_confidence=0,
+            total_calories=0,
+            total_protein=0,
+            total_carbs=0,
+            total_fat=0,
+            estimated_weight=0
+        )
+        
+        if cached is not None:
+            save_analysis_result(food_register, cached)
+            enqueue_derivatives(food_register)
+        else:
+            enqueue_analysis(food_register)
+    
+    return food_register, cached is not None
+
 class FoodRegisterCreateView(generics.CreateAPIView):
-    """Crear registro con análisis de Gemini"""
+    """Crear registro y encolar su análisis con Gemini"""
     serializer_class = FoodRegisterCreateSerializer
     permission_classes = [permissions.IsAuthenticated]
     
@@ -23,225 +74,128 @@ class FoodRegisterCreateView(generics.CreateAPIView):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         
-        try:
-            # Crear registro inicial
-            food_register = FoodRegister.objects.create(
-                user=request.user,
-                image=serializer.validated_data['image'],
-                description=serializer.validated_data.get('description', ''),
-                status='analyzing',
-                # Valores temporales
-                ai_description='Analizando...',
-                ai_confidence=0,
-                total_calories=0,
-                total_protein=0,
-                total_carbs=0,
-                total_fat=0,
-                estimated_weight=0
-            )
-            
-            # Analizar con Gemini
-            analyzer = GeminiAnalyzer()
-            gemini_data = analyzer.analyze_food_image(
-                food_register.image, 
-                food_register.description
-            )
-            print(gemini_data)
-            # Actualizar registro con datos de Gemini
-            food_register.ai_description = gemini_data['ai_description']
-            food_register.ai_confidence = gemini_data['ai_confidence']
-            food_register.total_calories = gemini_data['total_calories']
-            food_register.total_protein = gemini_data['total_protein']
-            food_register.total_carbs = gemini_data['total_carbs']
-            food_register.total_fat = gemini_data['total_fat']
-            food_register.total_fiber = gemini_data['total_fiber']
-            food_register.total_sugar = gemini_data['total_sugar']
-            food_register.total_sodium = gemini_data['total_sodium']
-            food_register.estimated_weight = gemini_data['estimated_weight']
-            food_register.status = 'completed'
-            food_register.save()
-            
-            # Crear items individuales
-            for item_data in gemini_data['food_items']:
-                FoodItem.objects.create(
-                    food_register=food_register,
-                    name=item_data['name'],
-                    category=item_data['category'],
-                    estimated_quantity=item_data['estimated_quantity'],
-                    quantity_unit=item_data['quantity_unit'],
-                    calories=item_data['calories'],
-                    protein=item_data['protein'],
-                    carbs=item_data['carbs'],
-                    fat=item_data['fat'],
-                    fiber=item_data['fiber'],
-                    sugar=item_data['sugar'],
-                    sodium=item_data['sodium'],
-                    confidence=item_data['confidence']
-                )
-            
+        food_register, completed = _create_register(
+            request.user,
+            serializer.validated_data['image'],
+            serializer.validated_data.get('description', ''),
+        )
+        
+        if completed:
             return Response({
                 'message': 'Imagen analizada exitosamente',
                 'register': FoodRegisterSerializer(food_register, context={'request': request}).data
             }, status=status.HTTP_201_CREATED)
-            
-        except Exception as e:
-            # Marcar como fallido si algo sale mal
-            if 'food_register' in locals():
-                food_register.status = 'failed'
-                food_register.ai_description = f'Error: {str(e)}'
-                food_register.save()
-            
-            return Response({
-                'error': 'Error al analizar imagen',
-                'details': str(e)
-            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        return Response({
+            'message': 'Imagen recibida, análisis en proceso',
+            'register': FoodRegisterSerializer(food_register, context={'request': request}).data
+        }, status=status.HTTP_202_ACCEPTED)
+
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+def batch_create_registers(request):
+    """
+    Crear varios registros a la vez. Cada imagen válida queda en la cola de
+    análisis (como en la creación individual) y la respuesta no espera a Gemini.
+    """
+    images = request.FILES.getlist('images')
+    descriptions = request.data.getlist('descriptions') if hasattr(request.data, 'getlist') else []
+    
+    if not images:
+        return Response({'error': 'Se requiere al menos una imagen en "images"'}, 
+                       status=status.HTTP_400_BAD_REQUEST)
+    if len(images) > settings.REGISTERS_BATCH_MAX_IMAGES:
+        return Response({'error': f'Máximo {settings.REGISTERS_BATCH_MAX_IMAGES} imágenes por lote'}, 
+                       status=status.HTTP_400_BAD_REQUEST)
+    
+    # Validar y crear cada registro por separado: un error no invalida el lote
+    results = []
+    for index, image in enumerate(images):
+        description = descriptions[index] if index < len(descriptions) else ''
+        serializer = FoodRegisterCreateSerializer(data={'image': image, 'description': description})
+        if not serializer.is_valid():
+            results.append({'index': index, 'success': False, 'errors': serializer.errors})
+            continue
+        
+        food_register, completed = _create_register(
+            request.user,
+            serializer.validated_data['image'],
+            serializer.validated_data.get('description', ''),
+        )
+        results.append({
+            'index': index,
+            'success': True,
+            'register_id': food_register.id,
+            'analyzed': completed,
+            'register': FoodRegisterSerializer(food_register, context={'request': request}).data
+        })
+    
+    accepted = sum(1 for result in results if result['success'])
+    return Response({
+        'message': 'Imágenes recibidas, análisis en proceso',
+        'results': results,
+        'accepted': accepted,
+        'rejected': len(results) - accepted,
+    }, status=status.HTTP_202_ACCEPTED if accepted else status.HTTP_400_BAD_REQUEST)
+
+def _csv_param(value):
+    return [item.strip() for item in value.split(',') if item.strip()] if value else []
 
 class FoodRegisterListView(generics.ListAPIView):
-    """Listar registros del usuario con filtros de fecha"""
+    """
+    Listar registros del usuario con filtros de fecha.
+    
+    Por defecto cada fila es ligera (default_fields); ?fields=a,b elige los
+    campos y ?expand=food_items,... agrega los anidados.
+    """
     serializer_class = FoodRegisterSerializer
     permission_classes = [permissions.IsAuthenticated]
+    filter_backends = [RegisterDateFilter]
+    pagination_class = FoodRegisterCursorPagination
+    default_fields = ('id', 'created_at', 'status', 'total_calories', 'thumbnail_url')
     
     def get_queryset(self):
-        queryset = FoodRegister.objects.filter(user=self.request.user).order_by('-created_at')
-        
-        # Filtro por fecha específica
-        date_filter = self.request.query_params.get('date', None)
-        if date_filter:
-            try:
-                filter_date = parse_date(date_filter)
-                queryset = queryset.filter(created_at__date=filter_date)
-            except ValueError:
-                pass
-        
-        # Filtro por rango de fechas
-        start_date = self.request.query_params.get('start_date', None)
-        end_date = self.request.query_params.get('end_date', None)
-        
-        if start_date:
-            try:
-                start = parse_date(start_date)
-                queryset = queryset.filter(created_at__date__gte=start)
-            except ValueError:
-                pass
-                
-        if end_date:
-            try:
-                end = parse_date(end_date)
-                queryset = queryset.filter(created_at__date__lte=end)
-            except ValueError:
-                pass
-        
-        # Filtro por período predefinido
-        period = self.request.query_params.get('period', None)
-        if period:
-            today = date.today()
-            
-            if period == 'today':
-                queryset = queryset.filter(created_at__date=today)
-            elif period == 'yesterday':
-                yesterday = today - timedelta(days=1)
-                queryset = queryset.filter(created_at__date=yesterday)
-            elif period == 'this_week':
-                start_week = today - timedelta(days=today.weekday())
-                queryset = queryset.filter(created_at__date__gte=start_week)
-            elif period == 'last_week':
-                start_last_week = today - timedelta(days=today.weekday() + 7)
-                end_last_week = today - timedelta(days=today.weekday() + 1)
-                queryset = queryset.filter(
-                    created_at__date__gte=start_last_week,
-                    created_at__date__lte=end_last_week
-                )
-            elif period == 'this_month':
-                start_month = today.replace(day=1)
-                queryset = queryset.filter(created_at__date__gte=start_month)
-            elif period == 'last_month':
-                # Primer día del mes pasado
-                if today.month == 1:
-                    start_last_month = today.replace(year=today.year-1, month=12, day=1)
-                else:
-                    start_last_month = today.replace(month=today.month-1, day=1)
-                
-                # Último día del mes pasado
-                end_last_month = today.replace(day=1) - timedelta(days=1)
-                
-                queryset = queryset.filter(
-                    created_at__date__gte=start_last_month,
-                    created_at__date__lte=end_last_month
-                )
-        
+        queryset = FoodRegister.objects.filter(user=self.request.user).order_by('-created_at', '-id')
+        options = self.get_field_options()
+        if 'food_items' in options['fields'] or 'food_items' in options['expand']:
+            # Una consulta para los alimentos de toda la página (no una por fila)
+            queryset = queryset.prefetch_related('food_items')
         return queryset
+    
+    def get_field_options(self):
+        params = self.request.query_params
+        return {
+            'fields': _csv_param(params.get('fields')) or self.default_fields,
+            'expand': _csv_param(params.get('expand')),
+        }
+    
+    def get_serializer(self, *args, **kwargs):
+        for name, value in self.get_field_options().items():
+            kwargs.setdefault(name, value)
+        return super().get_serializer(*args, **kwargs)
+    
+    def list(self, request, *args, **kwargs):
+        # Los períodos cerrados no cambian salvo que el usuario edite sus
+        # registros (lo que cambia la versión incluida en la clave)
+        cache_key = RegisterDateFilter().cache_key(request, self)
+        if cache_key:
+            cached = cache.get(cache_key)
+            if cached is not None:
+                return Response(cached)
+        
+        response = super().list(request, *args, **kwargs)
+        if cache_key and response.status_code == status.HTTP_200_OK:
+            cache.set(cache_key, response.data, settings.REGISTERS_LIST_CACHE_TTL_SECONDS)
+        return response
 
 class FoodRegisterDetailView(generics.RetrieveUpdateDestroyAPIView):
     """Ver, actualizar o eliminar registro"""
     serializer_class = FoodRegisterSerializer
     permission_classes = [permissions.IsAuthenticated]
+    filter_backends = [RegisterDateFilter]
     
     def get_queryset(self):
-        queryset = FoodRegister.objects.filter(user=self.request.user).order_by('-created_at')
-        #filtro por fecha especifica
-        date_filter= self.request.query_params.get('date', None)
-        if date_filter:
-            try:
-                filter_date = parse_date(date_filter)
-                queryset = queryset.filter(created_at__date=filter_date)
-            except ValueError:
-                pass
-        start_date = self.request.query_params.get('start_date', None)
-        end_date = self.request.query_params.get('end_date', None)
-
-        #filtro por fecha de inicio y fin
-        if start_date:
-            try:
-                start = parse_date(start_date)
-                queryset = queryset.filter(created_at__date__gte=start)
-            except ValueError:
-                pass
-        if end_date:
-            try:
-                end = parse_date(end_date)
-                queryset = queryset.filter(created_at__date__lte=end)
-            except ValueError:
-                pass
-
-        #filtro por periodo definido
-        period = self.request.query_params.get('period', None)
-
-        if period:
-            today = date.today()
-            if period == 'today':
-                queryset = queryset.filter(created_at__date=today)
-            elif period == 'yesterday':
-                yesterday = today - timedelta(days=1)
-                queryset = queryset.filter(created_at__date=yesterday)
-            elif period == 'this_week':
-                start_week = today - timedelta(days=today.weekday())
-                queryset = queryset.filter(created_at__date__gte=start_week)
-            elif period == 'last_week':
-                start_last_week = today - timedelta(days=today.weekday() + 7)
-                end_last_week = today - timedelta(days=today.weekday() + 1)
-                queryset = queryset.filter(
-                    created_at__date__gte=start_last_week,
-                    created_at__date__lte=end_last_week
-                )
-            elif period == 'this_month':
-                start_month = today.replace(day=1)
-                queryset = queryset.filter(created_at__date__gte=start_month)
-            elif period == 'last_month':
-                # Primer día del mes pasado
-                if today.month == 1:
-                    start_last_month = today.replace(year=today.year-1, month=12, day=1)
-                else:
-                    start_last_month = today.replace(month=today.month-1, day=1)
-                
-                # Último día del mes pasado
-                end_last_month = today.replace(day=1) - timedelta(days=1)
-                
-                queryset = queryset.filter(
-                    created_at__date__gte=start_last_month,
-                    created_at__date__lte=end_last_month
-                )
-        
-        return queryset
+        return FoodRegister.objects.filter(user=self.request.user).prefetch_related('food_items').order_by('-created_at')
 
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
@@ -254,18 +208,17 @@ def daily_summary(request):
         try:
             target_date = parse_date(date_param)
         except ValueError:
-            target_date = date.today()
+            target_date = local_date(tz=user_timezone(request.user))
     else:
-        target_date = date.today()
+        target_date = local_date(tz=user_timezone(request.user))
     
-    # Obtener registros del día específico
-    registers = FoodRegister.objects.filter(
+    # Resumen precalculado del día
+    rollup = DailyNutritionRollup.objects.filter(
         user=request.user,
-        created_at__date=target_date,
-        status='completed'
-    )
+        date=target_date
+    ).first()
     
-    if not registers.exists():
+    if rollup is None:
         return Response({
             'date': target_date,
             'message': f'No hay registros para el {target_date}',
@@ -276,17 +229,16 @@ def daily_summary(request):
             'count': 0
         })
     
-    # Calcular totales
-    totals = registers.aggregate(
-        calories=Sum('total_calories'),
-        protein=Sum('total_protein'),
-        carbs=Sum('total_carbs'),
-        fat=Sum('total_fat'),
-        fiber=Sum('total_fiber'),
-        sugar=Sum('total_sugar'),
-        sodium=Sum('total_sodium'),
-        count=Count('id')
-    )
+    totals = {
+        'calories': rollup.calories,
+        'protein': rollup.protein,
+        'carbs': rollup.carbs,
+        'fat': rollup.fat,
+        'fiber': rollup.fiber,
+        'sugar': rollup.sugar,
+        'sodium': rollup.sodium,
+        'count': rollup.count
+    }
     
     # Comparar con objetivos del usuario
     user = request.user
@@ -338,7 +290,7 @@ def period_summary(request):
     end_date_param = request.GET.get('end_date')
     period = request.GET.get('period', 'week')  # week, month, custom
     
-    today = date.today()
+    today = local_date(tz=user_timezone(request.user))
     
     # Determinar fechas según el período
     if period == 'week':
@@ -366,44 +318,17 @@ def period_summary(request):
         return Response({'error': 'Período inválido'}, 
                        status=status.HTTP_400_BAD_REQUEST)
     
-    # Obtener registros del período
-    registers = FoodRegister.objects.filter(
-        user=request.user,
-        created_at__date__gte=start_date,
-        created_at__date__lte=end_date,
-        status='completed'
-    )
-    
-    # Agrupar por día
-    daily_data = {}
-    for register in registers:
-        day = register.created_at.date()
-        if day not in daily_data:
-            daily_data[day] = {
-                'calories': 0, 'protein': 0, 'carbs': 0, 'fat': 0,
-                'fiber': 0, 'sugar': 0, 'sodium': 0, 'count': 0
-            }
-        
-        daily_data[day]['calories'] += register.total_calories or 0
-        daily_data[day]['protein'] += register.total_protein or 0
-        daily_data[day]['carbs'] += register.total_carbs or 0
-        daily_data[day]['fat'] += register.total_fat or 0
-        daily_data[day]['fiber'] += register.total_fiber or 0
-        daily_data[day]['sugar'] += register.total_sugar or 0
-        daily_data[day]['sodium'] += register.total_sodium or 0
-        daily_data[day]['count'] += 1
-    
-    # Calcular totales del período
-    period_totals = registers.aggregate(
-        calories=Sum('total_calories'),
-        protein=Sum('total_protein'),
-        carbs=Sum('total_carbs'),
-        fat=Sum('total_fat'),
-        fiber=Sum('total_fiber'),
-        sugar=Sum('total_sugar'),
-        sodium=Sum('total_sodium'),
-        count=Count('id')
+    # Resúmenes diarios precalculados del período: una sola consulta con solo
+    # las columnas necesarias; los totales se suman sobre esas mismas filas
+    rows = list(
+        DailyNutritionRollup.objects.filter(
+            user=request.user,
+            date__gte=start_date,
+            date__lte=end_date
+        ).values('date', 'count', *TOTAL_FIELDS)
     )
+    daily_data = {row['date']: row for row in rows}
+    period_totals = sum_daily_rows(rows)
     
     # Formatear datos diarios
     daily_summary = []
@@ -435,13 +360,13 @@ def period_summary(request):
         'end_date': end_date,
         'daily_summary': daily_summary,
         'period_totals': {
-            'calories': round(period_totals['calories'] or 0, 1),
-            'protein': round(period_totals['protein'] or 0, 1),
-            'carbs': round(period_totals['carbs'] or 0, 1),
-            'fat': round(period_totals['fat'] or 0, 1),
-            'fiber': round(period_totals['fiber'] or 0, 1),
-            'sugar': round(period_totals['sugar'] or 0, 1),
-            'sodium': round(period_totals['sodium'] or 0, 1),
+            'calories': round(period_totals['calories'], 1),
+            'protein': round(period_totals['protein'], 1),
+            'carbs': round(period_totals['carbs'], 1),
+            'fat': round(period_totals['fat'], 1),
+            'fiber': round(period_totals['fiber'], 1),
+            'sugar': round(period_totals['sugar'], 1),
+            'sodium': round(period_totals['sodium'], 1),
         },
         'total_count': period_totals['count'],
         'days_in_period': (end_date - start_date).days + 1,
@@ -468,44 +393,12 @@ def reanalyze_register(request, register_id):
         
         gemini_data = analyzer.analyze_food_image(
             food_register.image, 
-            new_description
+            new_description,
+            use_cache=request.data.get('force') not in (True, 'true', '1')
         )
         
-        # Eliminar items anteriores
-        food_register.food_items.all().delete()
-        
-        # Actualizar registro
-        food_register.description = new_description
-        food_register.ai_description = gemini_data['ai_description']
-        food_register.ai_confidence = gemini_data['ai_confidence']
-        food_register.total_calories = gemini_data['total_calories']
-        food_register.total_protein = gemini_data['total_protein']
-        food_register.total_carbs = gemini_data['total_carbs']
-        food_register.total_fat = gemini_data['total_fat']
-        food_register.total_fiber = gemini_data['total_fiber']
-        food_register.total_sugar = gemini_data['total_sugar']
-        food_register.total_sodium = gemini_data['total_sodium']
-        food_register.estimated_weight = gemini_data['estimated_weight']
-        food_register.status = 'completed'
-        food_register.save()
-        
-        # Crear nuevos items
-        for item_data in gemini_data['food_items']:
-            FoodItem.objects.create(
-                food_register=food_register,
-                name=item_data['name'],
-                category=item_data['category'],
-                estimated_quantity=item_data['estimated_quantity'],
-                quantity_unit=item_data['quantity_unit'],
-                calories=item_data['calories'],
-                protein=item_data['protein'],
-                carbs=item_data['carbs'],
-                fat=item_data['fat'],
-                fiber=item_data['fiber'],
-                sugar=item_data['sugar'],
-                sodium=item_data['sodium'],
-                confidence=item_data['confidence']
-            )
+        # Reemplazar resultado e items en una sola transacción
+        save_analysis_result(food_register, gemini_data, description=new_description)
         
         return Response({
             'message': 'Re-análisis exitoso',
@@ -9,6 +9,9 @@ python manage.py migrate --noinput
 echo "Collecting static files..."
 python manage.py collectstatic --noinput
 
+echo "Starting analysis worker..."
+python manage.py run_analysis_worker &
+
 echo "Starting Gunicorn on port ${PORT:-8000}..."
 exec gunicorn FikaFood.wsgi:application \
     --bind 0.0.0.0:${PORT:-8000} \
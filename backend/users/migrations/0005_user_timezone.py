@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0004_user_water_goal_user_water_method'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='timezone',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+    ]
@@ -1,5 +1,6 @@
 from django.contrib.auth.models import AbstractUser
 from django.db import models
+from django.db.models.functions import Lower
 from datetime import date
 
 
@@ -81,6 +82,10 @@ class User(AbstractUser):
     water_goal = models.IntegerField(null=True, blank=True)
     water_method = models.CharField(max_length=10, choices=[('manual', 'Manual'), ('ai', 'IA')], null=True, blank=True)
 
+    # ===== ZONA HORARIA =====
+    # Nombre IANA (p. ej. "America/Bogota"); vacío usa settings.TIME_ZONE
+    timezone = models.CharField(max_length=64, blank=True, default='')
+
     # ===== METADATOS =====
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -89,6 +94,13 @@ class User(AbstractUser):
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['username', 'first_name', 'last_name']
     
+    class Meta(AbstractUser.Meta):
+        # Búsqueda por prefijo sin distinguir mayúsculas (ExternalApi: lista de usuarios)
+        indexes = [
+            models.Index(Lower(field), name=f'users_{field}_lower_idx')
+            for field in ['username', 'email', 'first_name', 'last_name']
+        ]
+    
     def __str__(self):
         return f"{self.email} - {self.first_name} {self.last_name}"
     
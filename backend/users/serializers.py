@@ -1,3 +1,4 @@
+from zoneinfo import available_timezones
 from rest_framework import serializers
 from django.contrib.auth import authenticate
 from django.contrib.auth.password_validation import validate_password
@@ -69,7 +70,7 @@ class UserProfileSerializer(serializers.ModelSerializer):
             'date_of_birth', 'age', 'weight', 'height', 'gender', 'activity_level',
             'objective', 'dietary_preference', 'additional_restrictions', 'dietary_info',
             'calories_goal', 'protein_goal', 'carbs_goal', 'fat_goal', 'goals_method', 'has_nutrition_goals',
-            'water_goal', 'water_method', 'has_water_goal',
+            'water_goal', 'water_method', 'has_water_goal', 'timezone',
             'is_superuser', 'created_at', 'updated_at'
         )
         read_only_fields = ('id', 'email', 'created_at', 'updated_at', 'is_superuser')
@@ -86,8 +87,13 @@ class UserUpdateSerializer(serializers.ModelSerializer):
             'weight', 'height', 'gender', 'activity_level',
             'objective', 'dietary_preference', 'additional_restrictions',
             'calories_goal', 'protein_goal', 'carbs_goal', 'fat_goal', 'goals_method',
-            'water_goal', 'water_method'
+            'water_goal', 'water_method', 'timezone'
         )
+    
+    def validate_timezone(self, value):
+        if value and value not in available_timezones():
+            raise serializers.ValidationError("Zona horaria inválida")
+        return value
 
 class UserSerializer(serializers.ModelSerializer):
     is_superuser = serializers.BooleanField(read_only=True)
@@ -5,6 +5,8 @@ from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework_simplejwt.tokens import RefreshToken
 from django.contrib.auth import authenticate
+from registers.filters import bump_registers_version
+from registers.rollups import rebuild_user_rollups
 from .models import User
 from .serializers import (
     UserRegistrationSerializer, 
@@ -74,7 +76,12 @@ class UserProfileView(generics.RetrieveUpdateAPIView):
         serializer = UserUpdateSerializer(instance, data=request.data, partial=partial)
         
         if serializer.is_valid():
+            previous_timezone = instance.timezone
             serializer.save()
+            if instance.timezone != previous_timezone:
+                # Los resúmenes diarios dependen del día local del usuario
+                rebuild_user_rollups(instance.id)
+                bump_registers_version(instance.id)
             return Response({
                 'message': 'Perfil actualizado exitosamente',
                 'user': UserProfileSerializer(instance).data
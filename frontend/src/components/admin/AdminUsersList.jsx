@@ -18,7 +18,7 @@ const AdminUsersList = () => {
       setLoading(true);
       const response = await adminService.getAllUsers({ page: currentPage });
       setUsers(response.data.results || response.data);
-      setTotalPages(Math.ceil(response.data.count / 10) || 1);
+      setTotalPages(response.data.total_pages || 1);
     } catch (error) {
       console.error('Error loading users:', error);
     } finally {
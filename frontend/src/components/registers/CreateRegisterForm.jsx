@@ -48,11 +48,19 @@ const CreateRegisterForm = ({ onSuccess }) => {
       const result = await registerService.createRegister(submitData);
 
       if (result.success) {
+        // El análisis corre en segundo plano; esperar a que termine
+        const analysis = await registerService.waitForAnalysis(result.data.register.id);
+
+        if (analysis.success && analysis.data.status === 'failed') {
+          setError(analysis.data.failure_reason || t('registers.form.errorCreating'));
+          return;
+        }
+
         setFormData({ image: null, description: '' });
         setImagePreview(null);
         
         if (onSuccess) {
-          onSuccess(result.data);
+          onSuccess({ ...result.data, register: analysis.success ? analysis.data : result.data.register });
         }
       } else {
         setError(result.error?.message || t('registers.form.errorCreating'));
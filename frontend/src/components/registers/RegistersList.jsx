@@ -146,7 +146,7 @@ const RegistersList = ({ refreshTrigger, dateFilter = { period: 'today' } }) =>
                     <div className="col-span-12 sm:col-span-2">
                       <div className="w-full h-16 rounded-lg overflow-hidden shadow-sm">
                         <img 
-                          src={register.image} 
+                          src={register.thumbnail_url || register.image} 
                           alt={t('registers.list.registeredFood')}
                           className="w-full h-full object-cover"
                         />
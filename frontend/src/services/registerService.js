@@ -1,5 +1,12 @@
 import api from './api';
 
+// Campos que muestra la lista de registros (la API devuelve filas ligeras por defecto)
+const LIST_FIELDS = [
+  'id', 'created_at', 'status', 'image', 'thumbnail_url', 'description', 'ai_description',
+  'ai_confidence', 'estimated_weight', 'total_calories', 'total_protein',
+  'total_carbs', 'total_fat', 'total_fiber', 'total_sugar', 'total_sodium'
+].join(',');
+
 class RegisterService {
   /**
    * Crear un nuevo registro de comida
@@ -44,6 +51,11 @@ class RegisterService {
       if (filters.period) {
         params.append('period', filters.period);
       }
+      if (filters.cursor) {
+        params.append('cursor', filters.cursor);
+      }
+      params.append('fields', filters.fields || LIST_FIELDS);
+      params.append('expand', filters.expand || 'food_items');
 
       const url = `/registers/${params.toString() ? `?${params.toString()}` : ''}`;
       const response = await api.get(url);
@@ -132,6 +144,26 @@ class RegisterService {
     }
   }
 
+  /**
+   * Esperar a que termine el análisis en segundo plano de un registro
+   */
+  async waitForAnalysis(id, { interval = 2000, timeout = 120000 } = {}) {
+    const deadline = Date.now() + timeout;
+
+    while (Date.now() < deadline) {
+      const result = await this.getRegister(id);
+      if (!result.success || result.data.status !== 'analyzing') {
+        return result;
+      }
+      await new Promise((resolve) => setTimeout(resolve, interval));
+    }
+
+    return {
+      success: false,
+      error: { message: 'El análisis está tardando más de lo esperado' }
+    };
+  }
+
   /**
    * Utility para formatear fechas
    */